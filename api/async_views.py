@@ -0,0 +1,106 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework import exceptions, status
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .permissions import StoreOwnerPermission
+
+"""
+Base class for the async variants of hot read endpoints, served under ASGI.
+
+DRF's APIView is sync only, so under uvicorn every request to it runs in a
+thread. `AsyncAPIView` keeps the parts of the DRF contract these endpoints
+rely on and runs them on the event loop. It wraps the request in a DRF
+`Request`, so `query_params` and the shared helpers keep working. It
+authenticates bearer tokens with `CachedJWTAuthentication.aauthenticate`,
+checks `StoreOwnerPermission`, and renders `Response` objects with the JSON
+renderer. Other credentials (session, basic) fall back to DRF's
+authenticators in a thread.
+
+An async view only implements the methods worth running on the event loop.
+Every other method goes to `sync_view`, the DRF view for the same route, run
+through sync_to_async. Writes that need a transaction stay there, because
+Django's async ORM cannot hold one.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIView(View):
+    sync_view = None
+    store_owner_exempt_methods = ()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.jwt_authentication = CachedJWTAuthentication()
+        self.permission = StoreOwnerPermission()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Like APIView: CSRF only applies to session authentication, which enforces it itself
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if handler is None:
+            if self.sync_view is None or request.method.lower() not in self.http_method_names:
+                return self.http_method_not_allowed(request, *args, **kwargs)
+            return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+
+        request = Request(
+            request,
+            parsers=[JSONParser(), FormParser(), MultiPartParser()],
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        )
+        try:
+            await self.authenticate(request)
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            await self.permission.ahas_permission(request, self)
+            response = await handler(request, *args, **kwargs)
+        except exceptions.APIException as e:
+            response = Response({"detail": e.detail}, status=e.status_code)
+            if isinstance(e, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response.status_code = status.HTTP_401_UNAUTHORIZED
+                response['WWW-Authenticate'] = self.jwt_authentication.authenticate_header(request)
+        return render(response)
+
+    async def authenticate(self, request):
+        result = await self.jwt_authentication.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+        else:
+            # Session and basic credentials, including the session's CSRF check
+            await sync_to_async(lambda: request.user)()
+
+
+def render(response):
+    """
+    Turn a DRF Response into a plain HttpResponse with its JSON body.
+
+    Rendering here keeps the work on the event loop; a DRF Response left for
+    the handler would be rendered through sync_to_async.
+    """
+    if not isinstance(response, Response):
+        return response
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = JSONRenderer.media_type
+    response.renderer_context = {}
+    content = response.rendered_content
+    rendered = HttpResponse(content, status=response.status_code)
+    for header, value in response.items():
+        rendered[header] = value
+    if not content:
+        del rendered['Content-Type']
+    return rendered
@@ -0,0 +1,123 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import db_router
+
+"""
+JWT authentication that resolves the token's user from the cache.
+
+The stock `JWTAuthentication` loads the User row on every request. Here the
+loaded user is cached for AUTH_USER_CACHE_TTL seconds under a key that
+includes a per-user version. Saving or deleting a user bumps that version
+(see api/signals.py), so a deactivation, password change or profile edit is
+seen on the very next request rather than after the TTL. Writes that bypass
+model signals, such as queryset.update(), only take effect once the TTL runs out.
+"""
+
+
+def user_version_key(user_id):
+    return f"auth:user-version:{user_id}"
+
+
+def get_user_version(user_id):
+    version = cache.get(user_version_key(user_id))
+    if version is None:
+        # Seeded from the clock so an evicted version never repeats an older one
+        cache.add(user_version_key(user_id), time.time_ns(), None)
+        version = cache.get(user_version_key(user_id))
+    return version
+
+
+async def aget_user_version(user_id):
+    version = await cache.aget(user_version_key(user_id))
+    if version is None:
+        await cache.aadd(user_version_key(user_id), time.time_ns(), None)
+        version = await cache.aget(user_version_key(user_id))
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Drop the cached user for every worker, e.g. after the user was saved.
+    """
+    try:
+        cache.incr(user_version_key(user_id))
+    except ValueError:
+        cache.add(user_version_key(user_id), time.time_ns(), None)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}:{get_user_version(user_id)}"
+
+
+async def auser_cache_key(user_id):
+    return f"auth:user:{user_id}:{await aget_user_version(user_id)}"
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        """
+        Return the token's user from the cache, loading and caching it on a miss.
+        """
+        user_id = self.get_user_id(validated_token)
+        db_router.identify(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+            return user
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        `authenticate` for async views.
+
+        Returns:
+            tuple: (user, validated_token), or None when the request carries no bearer token.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        db_router.identify(user_id)
+        key = await auser_cache_key(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user = self.check_user(user, validated_token)
+            await cache.aset(key, user, settings.AUTH_USER_CACHE_TTL)
+            return user
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
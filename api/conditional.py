@@ -0,0 +1,178 @@
+import hashlib
+
+from django.db.models import Count, IntegerField, Max, Subquery, Value
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+"""
+Conditional GET (ETag / Last-Modified) for read endpoints.
+
+A response's validators are derived from the rows it is built from, not from
+its body: the max(updated_at) and row count of the main queryset, plus the
+same pair for every related queryset nested into the payload. All of them are
+computed in one aggregate query (related sets as scalar subqueries), so a
+poll that comes back `304 Not Modified` costs that single indexed query and
+no serialization.
+
+Paginated lists fingerprint only the page being asked for: `window=True`
+takes the page's slice from the paginator and reads the (pk, updated_at) of
+its rows, the same short index range the page itself is read from, so
+revalidating costs the same on a store with 50 orders or 500k. Rows nested
+into each item, such as an order's customer, are followed through their
+updated_at lookup (e.g. 'customer__updated_at') in that same query. Product lists
+skip this and use the catalog version, see api/products/cache.py.
+
+The count is what catches deletions, which leave no newer updated_at behind.
+Last-Modified cannot see deletions, so clients should prefer If-None-Match;
+If-Modified-Since is only honoured when no ETag is sent, as RFC 9110 requires.
+"""
+
+
+def _scalar(queryset, aggregate):
+    # Grouping by a constant aggregates the whole queryset into one row
+    return Subquery(
+        queryset.order_by()
+        .annotate(_all=Value(1, output_field=IntegerField()))
+        .values('_all')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def _aggregates(related):
+    aggregates = {'last_0': Max('updated_at'), 'count_0': Count('pk')}
+    for i, rel in enumerate(related, start=1):
+        aggregates[f'last_{i}'] = Max(_scalar(rel, Max('updated_at')))
+        aggregates[f'count_{i}'] = Max(_scalar(rel, Count('pk')))
+    return aggregates
+
+
+def _summarize(values, related_count):
+    lasts = [values[f'last_{i}'] for i in range(related_count + 1) if values[f'last_{i}']]
+    state = '|'.join(str(values[key]) for key in sorted(values))
+    return state, max(lasts) if lasts else None, values['count_0']
+
+
+def fingerprint(queryset, *related):
+    """
+    Compute the validators of a response in one aggregate query.
+
+    Args:
+        queryset (QuerySet): The rows the response is built from, they must have `updated_at`.
+        *related (QuerySet): Rows nested into the response, e.g. a product's images.
+
+    Returns:
+        tuple: (state, last_modified, count) where state is a string that changes
+        whenever any of the rows change and last_modified is the newest updated_at.
+    """
+    values = queryset.order_by().aggregate(**_aggregates(related))
+    return _summarize(values, len(related))
+
+
+async def afingerprint(queryset, *related):
+    values = await queryset.order_by().aaggregate(**_aggregates(related))
+    return _summarize(values, len(related))
+
+
+def _summarize_window(rows):
+    state = '|'.join(':'.join(str(value) for value in row) for row in rows)
+    stamps = [stamp for row in rows for stamp in row[1:] if stamp]
+    return state, max(stamps, default=None), len(rows)
+
+
+def window_fingerprint(queryset, *related):
+    """
+    Compute the validators of one page from its rows.
+
+    Args:
+        queryset (QuerySet): The page's slice, e.g. from `KeysetPaginator.get_page_queryset`.
+        *related (str): updated_at lookups of rows nested into each item, e.g. 'customer__updated_at'.
+
+    Returns:
+        tuple: (state, last_modified, count) as from `fingerprint`. The state
+        lists every row's id, so a row moving into or out of the page changes it.
+    """
+    return _summarize_window(list(queryset.values_list('pk', 'updated_at', *related)))
+
+
+async def awindow_fingerprint(queryset, *related):
+    return _summarize_window([row async for row in queryset.values_list('pk', 'updated_at', *related)])
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        # Weak comparison, a W/ prefix from an intermediary still matches
+        return '*' in etags or any(tag.removeprefix('W/') == etag for tag in etags)
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since and last_modified:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+def conditional_response(request, build, queryset, *related, detail=False, window=False):
+    """
+    Answer 304 when the client's validators still match, otherwise build the response.
+
+    Usage:
+        products = Product.objects.filter(id=product_id, store_id=store_id)
+        return conditional_response(request, lambda: self.retrieve_product(...), products,
+                                    Image.objects.filter(product__in=products), detail=True)
+
+    Args:
+        request (Request): The incoming request, its full path is part of the ETag.
+        build (callable): Builds the full Response when the client is out of date.
+        queryset (QuerySet): The rows the response is built from.
+        *related (QuerySet): Rows nested into the response. With `window`,
+            the updated_at lookups of rows nested into each item instead.
+        detail (bool): Never answer 304 for an empty queryset, so a missing
+            object still gets its 404 from `build`.
+        window (bool): `queryset` is one page's slice, see `window_fingerprint`.
+
+    Returns:
+        Response: A 304 without a body, or the built response carrying ETag and Last-Modified.
+    """
+    state, last_modified, count = window_fingerprint(queryset, *related) if window else fingerprint(queryset, *related)
+    etag = _etag(request, state)
+
+    if (count or not detail) and is_not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return _with_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, build, queryset, *related, detail=False, window=False):
+    """
+    `conditional_response` for async views, `build` is a coroutine function.
+    """
+    if window:
+        state, last_modified, count = await awindow_fingerprint(queryset, *related)
+    else:
+        state, last_modified, count = await afingerprint(queryset, *related)
+    etag = _etag(request, state)
+
+    if (count or not detail) and is_not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = await build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return _with_validators(response, etag, last_modified)
+
+
+def _etag(request, state):
+    return quote_etag(hashlib.md5(f"{request.get_full_path()}|{state}".encode()).hexdigest())
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -8,7 +8,8 @@ from rest_framework.permissions import IsAuthenticated
 
 import logging
 
-from api.models import Store, Customer
+from api.models import Customer
+from api.permissions import StoreOwnerPermission
 from api.serializers import (
     CustomerSerializer
 )
@@ -16,13 +17,10 @@ from api.serializers import (
 logger = logging.getLogger(__name__)
 
 class CustomerView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
     def get(self, request, store_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-
-            customers = Customer.objects.filter(store=store)
+            customers = Customer.objects.filter(store_id=store_id)
             serializer = CustomerSerializer(customers, many=True)
 
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -34,9 +32,6 @@ class CustomerView(APIView):
 
     def post(self, request, store_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-
             first_name = request.data.get('first_name')
             last_name = request.data.get('last_name')
             email = request.data.get('email')
@@ -44,7 +39,7 @@ class CustomerView(APIView):
 
             # Create the customer with the store field
             customer = Customer.objects.create(
-                store=store,
+                store_id=store_id,
                 first_name=first_name,
                 last_name=last_name,
                 email=email,
@@ -60,13 +55,10 @@ class CustomerView(APIView):
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CustomerDetailView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
     def get(self, request, store_id, customer_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-
-            customer = get_object_or_404(Customer, id=customer_id, store=store)
+            customer = get_object_or_404(Customer, id=customer_id, store_id=store_id)
             serializer = CustomerSerializer(customer)
 
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -77,10 +69,7 @@ class CustomerDetailView(APIView):
 
     def patch(self, request, store_id, customer_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-
-            customer = get_object_or_404(Customer, id=customer_id, store=store)
+            customer = get_object_or_404(Customer, id=customer_id, store_id=store_id)
             data = request.data
 
             serializer = CustomerSerializer(customer, data=data, partial=True)
@@ -96,10 +85,7 @@ class CustomerDetailView(APIView):
 
     def delete(self, request, store_id, customer_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-
-            customer = get_object_or_404(Customer, id=customer_id, store=store)
+            customer = get_object_or_404(Customer, id=customer_id, store_id=store_id)
             customer.delete()
 
             return Response(status=status.HTTP_204_NO_CONTENT)
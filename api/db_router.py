@@ -0,0 +1,254 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import connections, DatabaseError
+from django.utils.connection import ConnectionDoesNotExist
+
+"""
+Read-replica routing with read-your-writes stickiness.
+
+`ReplicaMiddleware` marks each request as it comes in. While a request that
+uses a safe method (GET, HEAD, OPTIONS) is running, `ReplicaRouter` sends
+its reads to one healthy replica from DATABASE_REPLICAS, chosen once per
+request so the request sees a single snapshot. Everything else reads from the
+primary: unsafe methods, code running outside a request (management commands,
+the outbox worker), and the rest of a request once it has written.
+
+A request that writes pins its user to the primary: a `replica-pin:<user_id>`
+entry in the shared cache, kept for REPLICA_PIN_SECONDS. While it exists that
+user's reads stay on the primary, from any device or worker, so a merchant
+always sees their own edits even if the replicas are behind. The user is
+known once `CachedJWTAuthentication` has validated the bearer token and calls
+`identify`, or, for session logins (admin, OIDC), from the session before the
+view runs; the pin is checked when the request's first read after that is
+routed. A write by a user known only to another authentication class is
+pinned from `request.user` once the response is ready.
+
+Each worker checks every replica at most once per REPLICA_HEALTH_CHECK_SECONDS.
+A replica that cannot be reached, or whose replay lag exceeds
+REPLICA_MAX_LAG_SECONDS, is skipped until a later check passes. With no
+healthy replica, reads fall back to the primary.
+"""
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replay lag in seconds, 0 on a primary or when the replica has replayed everything it received
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_lock = threading.Lock()
+_health = {}
+_state = ContextVar('replica_state', default=None)
+
+
+class _RequestState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.alias = None
+        self.wrote = False
+        self.user_id = None
+
+
+def pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def identify(user_id):
+    """
+    Record the authenticated user of the current request, so its reads honour
+    the user's pin and its writes set it.
+
+    Args:
+        user_id (int): The user the request is authenticated as.
+    """
+    state = _state.get()
+    if state is not None and state.user_id != user_id:
+        state.user_id = user_id
+        # Choose again, the user may be pinned to the primary
+        state.alias = None
+
+
+def replica_lag(alias):
+    """
+    Measure a replica's replay lag.
+
+    Returns:
+        float: Seconds the replica is behind the primary.
+
+    Raises:
+        DatabaseError: If the replica cannot be reached.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 0')
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def is_healthy(alias):
+    """
+    Whether a replica is reachable and caught up, re-checked at most once per
+    REPLICA_HEALTH_CHECK_SECONDS in each worker.
+    """
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < settings.REPLICA_HEALTH_CHECK_SECONDS:
+        return checked[1]
+
+    with _lock:
+        checked = _health.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_HEALTH_CHECK_SECONDS:
+            return checked[1]
+        try:
+            lag = replica_lag(alias)
+            healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if not healthy:
+                logger.warning("[REPLICA_LAG] %s is %.1fs behind", alias, lag)
+        except (DatabaseError, ConnectionDoesNotExist) as e:
+            logger.error("[REPLICA_DOWN] %s: %s", alias, e)
+            healthy = False
+        _health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def reset_health():
+    with _lock:
+        _health.clear()
+
+
+def choose_replica():
+    """
+    Pick a healthy replica at random.
+
+    Returns:
+        str: A replica alias, or the primary when none is healthy.
+    """
+    healthy = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+    return random.choice(healthy) if healthy else PRIMARY
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary for the rest of the current request, e.g. before a
+    read that must see a write made by another request a moment ago.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    use_replica = state.use_replica
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = use_replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return PRIMARY
+        if state.alias is None:
+            pinned = state.user_id is not None and cache.get(pin_key(state.user_id))
+            state.alias = PRIMARY if pinned else choose_replica()
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    """
+    Route a request's reads to a replica when it is safe to, and pin users
+    that just wrote to the primary. Place it first so sessions and
+    authentication are routed too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.should_pin(request, state):
+            if state.user_id is None:
+                state.user_id = self.authenticated_user_id(request)
+            if state.user_id is not None:
+                cache.set(pin_key(state.user_id), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM calls in threads see this state
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.should_pin(request, state):
+            if state.user_id is None:
+                state.user_id = await sync_to_async(self.authenticated_user_id)(request)
+            if state.user_id is not None:
+                await cache.aset(pin_key(state.user_id), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Sessions are loaded by now, a session login is identified before the view reads anything
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            user_id = session.get(SESSION_KEY)
+            if user_id is not None:
+                identify(str(user_id))
+        return None
+
+    @staticmethod
+    def start(request):
+        return _RequestState(bool(settings.DATABASE_REPLICAS) and request.method in SAFE_METHODS)
+
+    @staticmethod
+    def should_pin(request, state):
+        return state.wrote or request.method not in SAFE_METHODS
+
+    @staticmethod
+    def authenticated_user_id(request):
+        # DRF hands the user it authenticated back to the Django request
+        user = getattr(request, 'user', None)
+        return str(user.pk) if user is not None and user.is_authenticated else None
@@ -0,0 +1,144 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.models import Order, Product, Customer
+
+"""
+Flat row builders for the bulk export endpoints.
+
+Exports read plain tuples with `values_list(...).iterator(chunk_size=...)`
+instead of going through the nested DRF serializers, so rows are never turned
+into model instances and memory stays flat regardless of how many rows a store
+has. Each resource is described by its columns: the header written to the file
+and the ORM lookup the value is read from.
+"""
+
+EXPORTS = {
+    'orders': {
+        'columns': [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+            ('customer_id', 'customer_id'),
+            ('customer_first_name', 'customer__first_name'),
+            ('customer_last_name', 'customer__last_name'),
+            ('customer_email', 'customer__email'),
+            ('phone', 'phone'),
+            ('address', 'address'),
+            ('is_paid', 'is_paid'),
+            ('is_delivered', 'is_delivered'),
+            ('is_cancelled', 'is_cancelled'),
+            ('delivery_date', 'delivery_date'),
+            ('total_price', 'total_price'),
+        ],
+        'queryset': lambda store_id: Order.objects.filter(store_id=store_id).order_by('created_at', 'id'),
+    },
+    'products': {
+        'columns': [
+            ('id', 'id'),
+            ('sku', 'sku'),
+            ('name', 'name'),
+            ('category_id', 'category_id'),
+            ('category_name', 'category__name'),
+            ('price', 'price'),
+            ('quantity', 'quantity'),
+            ('rating', 'rating'),
+            ('description', 'description'),
+            ('is_archived', 'is_archived'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        ],
+        'queryset': lambda store_id: Product.objects.filter(store_id=store_id).order_by('created_at', 'id'),
+    },
+    'customers': {
+        'columns': [
+            ('id', 'id'),
+            ('first_name', 'first_name'),
+            ('last_name', 'last_name'),
+            ('email', 'email'),
+            ('phone_number', 'phone_number'),
+        ],
+        'queryset': lambda store_id: Customer.objects.filter(store_id=store_id).order_by('id'),
+    },
+}
+
+
+def iter_rows(resource, store_id, chunk_size):
+    """
+    Stream the rows of one export as tuples.
+
+    Args:
+        resource (str): One of the keys of EXPORTS.
+        store_id (UUID): The store whose rows are exported.
+        chunk_size (int): Rows fetched from the database cursor at a time.
+
+    Returns:
+        tuple: The column headers.
+        iterator: The row tuples, in header order.
+    """
+    export = EXPORTS[resource]
+    headers = [header for header, _ in export['columns']]
+    lookups = [lookup for _, lookup in export['columns']]
+    rows = export['queryset'](store_id).values_list(*lookups).iterator(chunk_size=chunk_size)
+    return headers, rows
+
+
+class Echo:
+    """
+    File-like object whose write() hands the line back to the caller, so
+    csv.writer can be used to format rows one at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def render_ndjson(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def render_csv(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+RENDERERS = {
+    'ndjson': (render_ndjson, 'application/x-ndjson'),
+    'csv': (render_csv, 'text/csv'),
+}
+
+
+def buffered(lines, size):
+    """
+    Join rendered lines into chunks of roughly `size` bytes so the response is
+    written in a few large writes instead of one per row.
+    """
+    buffer = []
+    length = 0
+    for line in lines:
+        encoded = line.encode()
+        buffer.append(encoded)
+        length += len(encoded)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    """
+    Gzip a byte stream incrementally, yielding compressed data as it becomes available.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,11 @@
+# urls.py
+
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('<uuid:store_id>/export/orders/', views.ExportView.as_view(resource='orders'), name='export-orders'),
+    path('<uuid:store_id>/export/products/', views.ExportView.as_view(resource='products'), name='export-products'),
+    path('<uuid:store_id>/export/customers/', views.ExportView.as_view(resource='customers'), name='export-customers'),
+]
@@ -0,0 +1,66 @@
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+import logging
+
+from api.permissions import StoreOwnerPermission
+from .rows import RENDERERS, iter_rows, buffered, gzipped
+
+logger = logging.getLogger(__name__)
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Exports pick their output with ?output= and stream it themselves, so an
+    Accept: text/csv header must not be rejected by DRF's renderer negotiation.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class ExportView(APIView):
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    resource = None
+
+    def get(self, request, store_id):
+        try:
+            user = request.user
+            if not user.id:
+                return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
+
+            output = request.query_params.get('output', 'ndjson').lower()
+            if output not in RENDERERS:
+                return Response({"detail": f"Output must be one of {', '.join(RENDERERS)}"}, status=status.HTTP_400_BAD_REQUEST)
+            render, content_type = RENDERERS[output]
+
+            headers, rows = iter_rows(self.resource, store_id, settings.EXPORT_CHUNK_SIZE)
+            stream = buffered(render(headers, rows), settings.EXPORT_BUFFER_BYTES)
+
+            use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if use_gzip:
+                stream = gzipped(stream)
+
+            response = StreamingHttpResponse(stream, content_type=content_type)
+            filename = f"{self.resource}-{timezone.now():%Y%m%d%H%M%S}.{output}"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+
+        except Exception as e:
+            logger.error("[EXPORT_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
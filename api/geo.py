@@ -0,0 +1,149 @@
+import math
+
+"""
+Geohash and great-circle helpers for the nearby-store lookup.
+
+Stores keep a geohash of their coordinates in an indexed column. A radius
+query is answered in two steps: the database narrows the candidates to the
+geohash cells covering the query's bounding box plus a latitude/longitude
+range check, then `haversine_km` computes the exact distance for just those
+candidates. Everything here is plain Python, so no PostGIS is needed.
+"""
+
+EARTH_RADIUS_KM = 6371.0088
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Most cells a radius query may OR together before falling back to a coarser precision
+MAX_COVER_CELLS = 9
+
+
+def encode_geohash(latitude, longitude, precision):
+    """
+    Encode a coordinate as a geohash.
+
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+        precision (int): Number of characters, 9 is about 5 metres.
+
+    Returns:
+        str: The geohash.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    Height and width in degrees of a geohash cell.
+
+    Returns:
+        tuple: (latitude degrees, longitude degrees).
+    """
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Latitude/longitude box containing every point within a radius.
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng). The longitude bounds are
+        None when the box reaches a pole or crosses the antimeridian.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    delta_lng = math.degrees(radius_km / EARTH_RADIUS_KM / math.cos(math.radians(latitude)))
+    min_lng, max_lng = longitude - delta_lng, longitude + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def covering_cells(box, max_precision):
+    """
+    The geohash prefixes of the cells covering a bounding box, at the finest
+    precision that needs no more than MAX_COVER_CELLS of them.
+
+    Args:
+        box (tuple): A box from `bounding_box`.
+        max_precision (int): Precision of the stored geohashes.
+
+    Returns:
+        list: Geohash prefixes, or an empty list when the box cannot be covered
+        (it wraps around the globe or is too large for even one character).
+    """
+    min_lat, max_lat, min_lng, max_lng = box
+    if min_lng is None:
+        return []
+
+    for precision in range(max_precision, 0, -1):
+        cell_lat, cell_lng = cell_size(precision)
+        lat_cells = range(int((min_lat + 90) // cell_lat), int((max_lat + 90) // cell_lat) + 1)
+        lng_cells = range(int((min_lng + 180) // cell_lng), int((max_lng + 180) // cell_lng) + 1)
+        if len(lat_cells) * len(lng_cells) > MAX_COVER_CELLS:
+            continue
+        return sorted({
+            encode_geohash(
+                min((i + 0.5) * cell_lat - 90, 90.0),
+                min((j + 0.5) * cell_lng - 180, 180.0),
+                precision,
+            )
+            for i in lat_cells for j in lng_cells
+        })
+    return []
+
+
+def cell_range(prefix):
+    """
+    The [start, end) string range holding every geohash inside a cell.
+
+    Range bounds rather than LIKE 'prefix%' let a plain btree index serve the
+    lookup on any backend and collation, since both bounds only use geohash
+    characters. `end` is None for the last cell of the alphabet.
+    """
+    chars = list(prefix)
+    while chars:
+        position = BASE32.index(chars[-1])
+        if position + 1 < len(BASE32):
+            chars[-1] = BASE32[position + 1]
+            return prefix, ''.join(chars)
+        chars.pop()
+    return prefix, None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two coordinates in kilometres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
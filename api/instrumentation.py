@@ -0,0 +1,247 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+"""
+Per-request performance metrics: wall time, database queries and time,
+serializer time and outbound provider time.
+
+`RequestMetricsMiddleware` samples REQUEST_METRICS_SAMPLE_RATE of requests.
+For each sampled request it adds a `Server-Timing` header and logs one
+`[REQUEST_METRICS]` line with a JSON record, keyed by URL route rather than
+path so endpoints aggregate. Unsampled requests cost one random number and
+a context variable lookup per query.
+
+Queries are recorded by `record_query`, an execute wrapper installed on
+every database connection when it opens (see api/signals.py). This covers
+replica connections and the threads async views run their ORM calls in.
+Within one request, the same SQL shape run REQUEST_METRICS_N_PLUS_ONE_THRESHOLD
+times or more is logged as a likely N+1 with `[N_PLUS_ONE]`. Serializer time
+comes from `TimedSerializerMixin` and excludes the queries run while
+serializing, such as lazy relation loads. Provider time comes from
+`outbound.track`.
+
+A streaming response, such as an export, does its work while the server
+iterates the body, after the middleware has returned. Its body is wrapped so
+the queries run while producing each chunk are counted, and the record is
+logged, marked `streaming`, once the stream is exhausted or closed. The
+headers have gone out by then, so streaming responses carry no Server-Timing.
+"""
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+# IN lists of any length share a shape
+_PLACEHOLDER_LIST = re.compile(r'\((?:%s, )+%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+        self.outbound_ms = 0.0
+        self.outbound_calls = 0
+        self.statements = Counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def repeated_queries(self):
+        """
+        SQL shapes run at least REQUEST_METRICS_N_PLUS_ONE_THRESHOLD times.
+
+        Returns:
+            list: (shape, count) pairs, most repeated first.
+        """
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[query_shape(sql)] += count
+        threshold = settings.REQUEST_METRICS_N_PLUS_ONE_THRESHOLD
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+def query_shape(sql):
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('(...)', sql)).strip()
+
+
+def current():
+    """
+    The metrics of the request being handled, or None outside a sampled request.
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper that adds each query to the current request's metrics.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_ms += (time.perf_counter() - start) * 1000
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_outbound(provider, elapsed_ms):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.outbound_ms += elapsed_ms
+        metrics.outbound_calls += 1
+
+
+class TimedSerializerMixin:
+    """
+    Count a serializer's `to_representation` time in the request metrics.
+    Nested serializers are part of the outermost one's time.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+        metrics.serializer_depth += 1
+        start, db_ms = time.perf_counter(), metrics.db_ms
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_depth -= 1
+            metrics.serializer_ms += (time.perf_counter() - start) * 1000 - (metrics.db_ms - db_ms)
+
+
+def server_timing(metrics, total_ms):
+    return ', '.join([
+        f'total;dur={total_ms:.1f}',
+        f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+        f'serializer;dur={metrics.serializer_ms:.1f}',
+        f'outbound;dur={metrics.outbound_ms:.1f};desc="{metrics.outbound_calls} calls"',
+    ])
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure a sample of requests, see the module docstring. Place it first so
+    the wall time covers the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def sampled():
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def finish(self, request, response, metrics):
+        if response.streaming:
+            measure = self.ameasure_stream if response.is_async else self.measure_stream
+            response.streaming_content = measure(request, response, metrics, response.streaming_content)
+            return response
+
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, metrics.elapsed_ms())
+        self.log(request, response, metrics)
+        return response
+
+    def measure_stream(self, request, response, metrics, content):
+        chunks = iter(content)
+        try:
+            while True:
+                token = _current.set(metrics)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self.log(request, response, metrics)
+
+    async def ameasure_stream(self, request, response, metrics, content):
+        chunks = aiter(content)
+        try:
+            while True:
+                token = _current.set(metrics)
+                try:
+                    chunk = await anext(chunks)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            self.log(request, response, metrics)
+
+    def log(self, request, response, metrics):
+        total_ms = metrics.elapsed_ms()
+        route = getattr(request.resolver_match, 'route', None) or request.path
+        repeated = metrics.repeated_queries()
+
+        for shape, count in repeated:
+            logger.warning("[N_PLUS_ONE] %s %s ran %d times: %s", request.method, route, count, shape)
+
+        record = {
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'streaming': response.streaming,
+            'total_ms': round(total_ms, 1),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.db_ms, 1),
+            'serializer_ms': round(metrics.serializer_ms, 1),
+            'outbound_calls': metrics.outbound_calls,
+            'outbound_ms': round(metrics.outbound_ms, 1),
+            'repeated_queries': len(repeated),
+        }
+        logger.info("[REQUEST_METRICS] %s", json.dumps(record), extra={'request_metrics': record})
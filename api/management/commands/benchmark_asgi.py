@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Store, Category, Product, Image, Customer, Order
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second and peak memory of the WSGI and ASGI builds on the "
+        "hot read endpoints (product list and detail, store detail, order list). Each build "
+        "runs in its own process at the same concurrency: threads through the WSGI handler, "
+        "asyncio tasks through the ASGI handler. Creates a throwaway store and category and "
+        "deletes them afterwards; run it against Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help="Threads or tasks per build")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per thread or task")
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=50)
+        # Internal: run one build against an existing store and print its results as JSON
+        parser.add_argument('--mode', choices=MODES, help="Run a single build, used by the comparison")
+        parser.add_argument('--store', help="Store to request, used with --mode")
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            if not options['store']:
+                raise CommandError("--mode needs --store")
+            self.stdout.write(json.dumps(self.run(options['mode'], options['store'], options['concurrency'], options['requests'])))
+            return
+
+        user = User.objects.create(username=f"benchmark-asgi-{time.time_ns()}")
+        # Categories are shared by every store and do not go away with the user
+        category = Category.objects.create(name="Benchmark", image_url="https://example.com/benchmark.png", description="Benchmark")
+        try:
+            store = self.create_store(user, category, options['products'], options['orders'])
+            for mode in MODES:
+                result = self.run_build(mode, store.id, options)
+                self.stdout.write(
+                    f"{mode}: {result['requests']} requests, {result['errors']} errors in {result['elapsed']:.2f}s "
+                    f"({result['requests'] / result['elapsed']:.0f} requests/s), peak memory {result['peak_rss_mb']:.1f} MB"
+                )
+        finally:
+            user.delete()
+            category.delete()
+
+    @staticmethod
+    def create_store(user, category, products, orders):
+        store = Store.objects.create(user=user, name="Benchmark store")
+        created = Product.objects.bulk_create([
+            Product(store=store, category=category, name=f"Product {i}", price=1, quantity=10, rating=5, description="Benchmark")
+            for i in range(products)
+        ])
+        Image.objects.bulk_create([Image(product=product, url="https://example.com/product.png") for product in created])
+        customer = Customer.objects.create(store=store, first_name="Benchmark", email="benchmark@example.com")
+        Order.objects.bulk_create([Order(store=store, customer=customer) for _ in range(orders)])
+        return store
+
+    def run_build(self, mode, store_id, options):
+        # A fresh process per build, so the URLconf picks that build's views and peak memory is its own
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi',
+            '--mode', mode, '--store', str(store_id),
+            '--concurrency', str(options['concurrency']), '--requests', str(options['requests']),
+        ]
+        env = {**os.environ, 'GLACE_SERVER_MODE': mode}
+        output = subprocess.run(command, env=env, capture_output=True, text=True)
+        if output.returncode:
+            raise CommandError(f"{mode} build failed:\n{output.stderr}")
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+    def run(self, mode, store_id, concurrency, requests):
+        if settings.SERVER_MODE != mode:
+            raise CommandError(f"Set GLACE_SERVER_MODE={mode} to run the {mode} build")
+
+        store = Store.objects.get(id=store_id)
+        product = Product.objects.filter(store=store).first()
+        urls = [
+            reverse('store-products', kwargs={'store_id': store.id}),
+            reverse('store-product-detail', kwargs={'store_id': store.id, 'product_id': product.id}),
+            reverse('store-detail', kwargs={'store_id': store.id}),
+            reverse('orders', kwargs={'store_id': store.id}),
+        ]
+        headers = {'Authorization': f"Bearer {AccessToken.for_user(store.user)}"}
+        connection.close()
+
+        # DEBUG would keep every query in memory
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            runner = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+            start = time.perf_counter()
+            errors = runner(urls, headers, concurrency, requests)
+            elapsed = time.perf_counter() - start
+
+        return {
+            'requests': concurrency * requests,
+            'errors': errors,
+            'elapsed': elapsed,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    @staticmethod
+    def run_wsgi(urls, headers, concurrency, requests):
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            failed = 0
+            try:
+                for i in range(requests):
+                    if client.get(urls[i % len(urls)], headers=headers).status_code != 200:
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                errors.append(failed)
+
+        workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sum(errors)
+
+    @staticmethod
+    def run_asgi(urls, headers, concurrency, requests):
+        async def worker():
+            client = AsyncClient()
+            failed = 0
+            for i in range(requests):
+                response = await client.get(urls[i % len(urls)], headers=headers)
+                if response.status_code != 200:
+                    failed += 1
+            return failed
+
+        async def main():
+            return sum(await asyncio.gather(*(worker() for _ in range(concurrency))))
+
+        return asyncio.run(main())
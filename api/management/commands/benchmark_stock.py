@@ -0,0 +1,87 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, DatabaseError
+from django.db.models import F
+
+from api.models import Store, Category, Product
+from api.orders.inventory import reserve_stock, InsufficientStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure checkout throughput when many workers buy the same hot product. "
+        "Compares the conditional UPDATE used by checkout with a SELECT FOR UPDATE "
+        "read-modify-write. Creates a throwaway store and category and deletes them afterwards; "
+        "run it against Postgres, SQLite serializes all writers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--checkouts', type=int, default=200, help="Checkouts per thread")
+        parser.add_argument('--stock', type=int, default=None, help="Initial stock, defaults to threads * checkouts")
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username=f"benchmark-stock-{time.time_ns()}")
+        # Categories are shared by every store and do not go away with the user
+        category = Category.objects.create(name="Benchmark", image_url="https://example.com/benchmark.png", description="Benchmark")
+        try:
+            store = Store.objects.create(user=user, name="Benchmark store")
+            stock = options['stock'] or options['threads'] * options['checkouts']
+            product = Product.objects.create(store=store, category=category, name="Hot product", price=1,
+                                             quantity=stock, rating=5, description="Benchmark")
+
+            for mode, checkout in (('conditional update', self.conditional_update), ('select for update', self.select_for_update)):
+                Product.objects.filter(id=product.id).update(quantity=stock)
+                sold, failed, errors, elapsed = self.run(checkout, product.id, options['threads'], options['checkouts'])
+                remaining = Product.objects.get(id=product.id).quantity
+                self.stdout.write(
+                    f"{mode}: {sold} sold, {failed} out of stock, {errors} database errors in {elapsed:.2f}s "
+                    f"({sold / elapsed:.0f} checkouts/s), remaining stock {remaining}"
+                )
+        finally:
+            user.delete()
+            category.delete()
+
+    @staticmethod
+    def conditional_update(product_id):
+        with transaction.atomic():
+            reserve_stock({product_id: 1})
+
+    @staticmethod
+    def select_for_update(product_id):
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(id=product_id)
+            if product.quantity < 1:
+                raise InsufficientStock([product_id])
+            Product.objects.filter(id=product_id).update(quantity=F('quantity') - 1)
+
+    def run(self, checkout, product_id, threads, checkouts):
+        counts = {'sold': 0, 'failed': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(checkouts):
+                    try:
+                        checkout(product_id)
+                        outcome = 'sold'
+                    except InsufficientStock:
+                        outcome = 'failed'
+                    except DatabaseError:
+                        # Lock timeouts and deadlocks
+                        outcome = 'errors'
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return counts['sold'], counts['failed'], counts['errors'], time.perf_counter() - start
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.outbox import process_outbox
+from api.outbound import get_stats
+
+
+class Command(BaseCommand):
+    help = "Deliver queued email and SMS notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help="Number of notifications claimed per batch")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when the outbox is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once no notifications are due instead of polling")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_outbox(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(f"Processed {total} notifications")
+        for provider, stats in get_stats().items():
+            self.stdout.write(
+                f"{provider}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"avg {stats['avg_ms']:.0f}ms, max {stats['max_ms']:.0f}ms"
+            )
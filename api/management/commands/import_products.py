@@ -0,0 +1,40 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Store
+from api.products.importer import import_products, parse_csv, parse_json, RowError
+
+
+class Command(BaseCommand):
+    help = "Upsert a store's products by SKU from a CSV or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('store', help="Id of the store to import into")
+        parser.add_argument('path', help="CSV or JSON file to import")
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help="File format, guessed from the extension by default")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows per transaction, defaults to PRODUCT_IMPORT_CHUNK_SIZE")
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(id=options['store'])
+        except (Store.DoesNotExist, ValidationError):
+            raise CommandError(f"Store not found: {options['store']}")
+
+        file_format = options['format'] or ('json' if options['path'].lower().endswith('.json') else 'csv')
+        with open(options['path'], encoding='utf-8-sig') as f:
+            content = f.read()
+        try:
+            rows = parse_json(content) if file_format == 'json' else parse_csv(content)
+        except (RowError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        report = import_products(store, rows, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Created {report['created']}, updated {report['updated']}, failed {report['failed']}"
+        )
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.orders.rollups import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = "Recompute the StoreDailySales rollup from the order tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', action='append', dest='stores',
+                            help="Only rebuild this store id, may be repeated")
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_sales(options['stores'])
+        self.stdout.write(f"Wrote {rows} daily sales rows")
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'created_at'], name='api_order_store_i_920a07_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'is_paid', 'created_at'], name='api_order_store_i_26b6c7_idx'),
+        ),
+    ]
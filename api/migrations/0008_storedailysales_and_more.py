@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_order_store_created_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreDailySales',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('delivered_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.store')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='storedailysales',
+            constraint=models.UniqueConstraint(fields=('store', 'date'), name='unique_store_daily_sales'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_storedailysales_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='is_cancelled',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_order_is_cancelled'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['store', 'is_archived', 'category', 'created_at'], name='api_product_store_i_b5d419_idx'),
+        ),
+    ]
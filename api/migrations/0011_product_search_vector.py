@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_product_search_gin')
+
+
+def create_search_index(apps, schema_editor):
+    # tsvector and GIN only exist on Postgres; other backends use the substring fallback
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('api', 'Product')
+    config = settings.PRODUCT_SEARCH_CONFIG
+    Product.objects.update(search_vector=(
+        django.contrib.postgres.search.SearchVector('name', weight='A', config=config)
+        + django.contrib.postgres.search.SearchVector('description', weight='B', config=config)
+    ))
+    schema_editor.add_index(Product, SEARCH_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('api', 'Product'), SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_product_catalog_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='product', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
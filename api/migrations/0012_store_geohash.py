@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+from api.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Store = apps.get_model('api', 'Store')
+    stores = list(Store.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude'))
+    for store in stores:
+        store.geohash = encode_geohash(store.latitude, store.longitude, settings.STORE_GEOHASH_PRECISION)
+    Store.objects.bulk_update(stores, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_product_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['geohash'], name='api_store_geohash_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
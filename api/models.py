@@ -1,7 +1,13 @@
 from django.db import models
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.db.models import Sum, F, DecimalField
+from django.utils import timezone
+from django.conf import settings
+
+from .geo import encode_geohash
 
 """
 Models representing entities in the system where a user must own a store to operate:
@@ -30,6 +36,12 @@ Models representing entities in the system where a user must own a store to oper
 
 8. Image:
    - Represents images associated with products or stores.
+
+9. NotificationOutbox:
+   - Represents an email or SMS waiting to be delivered by the outbox worker.
+
+10. StoreDailySales:
+   - Represents a store's order totals for one day, maintained incrementally as orders change.
 """
 
 
@@ -43,6 +55,8 @@ class Store(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Geohash of (latitude, longitude), kept in sync by save() for the nearby-store lookup
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False)
     paybill = models.CharField(max_length=255, null=True, blank=True)
     categories = models.ManyToManyField('Category', related_name='stores', blank=True)
     counties = models.ManyToManyField('County', related_name='stores', blank=True)
@@ -50,6 +64,22 @@ class Store(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude, settings.STORE_GEOHASH_PRECISION)
+        else:
+            self.geohash = None
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['geohash'], name='api_store_geohash_idx'),
+        ]
+
 
 class Category(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -86,12 +116,16 @@ class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     store = models.ForeignKey(Store, related_name='products', on_delete=models.CASCADE)
     category = models.ForeignKey('Category', related_name='products', on_delete=models.CASCADE)
+    # The store's own product code, the upsert key for catalog imports
+    sku = models.CharField(max_length=64, null=True, blank=True)
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField()
     rating = models.IntegerField()
     description = models.TextField()
     is_archived = models.BooleanField(default=False)
+    # Weighted name/description tsvector, maintained by api.products.search.refresh_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -102,6 +136,11 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['store']),
             models.Index(fields=['category']),
+            models.Index(fields=['store', 'is_archived', 'category', 'created_at']),
+            GinIndex(fields=['search_vector'], name='api_product_search_gin'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'sku'], name='unique_store_product_sku'),
         ]
 
 class Customer(models.Model):
@@ -111,6 +150,8 @@ class Customer(models.Model):
     last_name = models.CharField(max_length=255, null=True, blank=True)
     email = models.EmailField(unique=True, null=True, blank=True)
     phone_number = models.CharField(max_length=20, null=True, blank=True)
+    # Orders embed their customer, so order ETags fold this in
+    updated_at = models.DateTimeField(auto_now=True)
   
     def __str__(self):
         return self.first_name
@@ -121,6 +162,7 @@ class Order(models.Model):
     customer = models.ForeignKey(Customer, related_name='orders', on_delete=models.CASCADE)
     is_paid = models.BooleanField(default=False)
     is_delivered = models.BooleanField(default=False)
+    is_cancelled = models.BooleanField(default=False)
     phone = models.CharField(max_length=20, default="")
     address = models.CharField(max_length=255, default="")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -132,6 +174,8 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['store']),
             models.Index(fields=['customer']),
+            models.Index(fields=['store', 'created_at']),
+            models.Index(fields=['store', 'is_paid', 'created_at']),
         ]
 
     def calculate_total_price(self):
@@ -167,3 +211,60 @@ class Image(models.Model):
             models.Index(fields=['product']),
             models.Index(fields=['store']),
         ]
+
+class NotificationOutbox(models.Model):
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_SMS = 'sms'
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, 'Email'),
+        (CHANNEL_SMS, 'SMS'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255, blank=True, default="")
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+class StoreDailySales(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    store = models.ForeignKey(Store, related_name='daily_sales', on_delete=models.CASCADE)
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.store_id} {self.date}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'date'], name='unique_store_daily_sales'),
+        ]
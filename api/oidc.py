@@ -0,0 +1,220 @@
+import json
+import logging
+import threading
+import time
+import urllib.parse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+import jwt
+import requests
+from oidc_provider.models import Client
+
+from . import outbound
+
+"""
+Google sign-in: the authorization URL, the code exchange and local id_token verification.
+
+The token endpoint already returns a signed `id_token` carrying the user's
+profile claims, so it is verified here against Google's published signing
+keys (JWKS) instead of making a second round trip to the userinfo endpoint.
+The keys are cached per process and refreshed every OIDC_JWKS_REFRESH_SECONDS,
+or sooner when a token names a key id we have not seen, which is how Google
+rotates keys. The registered OIDC client is also cached per process, so
+starting a login runs no query in steady state.
+
+`complete_login` is blocking. `acomplete_login` runs it in the thread pool
+for the async callback view, so network waits never hold the event loop.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Claims copied from the id_token into the session, the same fields the userinfo endpoint returns
+USER_INFO_CLAIMS = ('sub', 'email', 'email_verified', 'name', 'given_name', 'family_name', 'picture', 'locale')
+
+# Least time between JWKS refetches triggered by an unknown key id, so bad tokens cannot hammer Google
+UNKNOWN_KID_REFETCH_SECONDS = 60
+
+_lock = threading.Lock()
+_jwks = {'keys': {}, 'fetched_at': None}
+_client_config = {}
+
+
+class LoginError(Exception):
+    """
+    A login that cannot complete, with the HTTP status to answer.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_client_config():
+    """
+    Return the registered OIDC client's id and redirect URI, cached per process.
+
+    Raises:
+        Client.DoesNotExist: If no client is registered for OIDC_CLIENT_ID.
+    """
+    config = _client_config.get('config')
+    if config and time.monotonic() - _client_config['loaded_at'] < settings.OIDC_CLIENT_CACHE_SECONDS:
+        return config
+
+    client = Client.objects.get(client_id=settings.OIDC_CLIENT_ID)
+    config = {'client_id': client.client_id, 'redirect_uri': client.redirect_uris[0]}
+    _client_config.update(config=config, loaded_at=time.monotonic())
+    return config
+
+
+def clear_client_config():
+    _client_config.clear()
+
+
+def build_auth_url(state):
+    config = get_client_config()
+    return (
+        f"{settings.OIDC_AUTHORIZATION_ENDPOINT}?response_type=code"
+        f"&client_id={config['client_id']}"
+        f"&redirect_uri={config['redirect_uri']}"
+        f"&scope=openid email profile"
+        f"&state={state}"
+    )
+
+
+def _fetch_jwks():
+    response = outbound.request('google', 'GET', settings.OIDC_JWKS_ENDPOINT)
+    response.raise_for_status()
+    return {key.key_id: key.key for key in jwt.PyJWKSet.from_dict(response.json()).keys}
+
+
+def get_signing_key(kid):
+    """
+    Return Google's public key for a key id, refreshing the cached JWKS when needed.
+
+    Args:
+        kid (str): The `kid` header of the id_token.
+
+    Raises:
+        LoginError: If the key is unknown or the keys cannot be fetched.
+    """
+    now = time.monotonic()
+    fetched_at = _jwks['fetched_at']
+    stale = fetched_at is None or now - fetched_at > settings.OIDC_JWKS_REFRESH_SECONDS
+    unknown = kid not in _jwks['keys'] and (fetched_at is None or now - fetched_at > UNKNOWN_KID_REFETCH_SECONDS)
+
+    if stale or unknown:
+        with _lock:
+            # Another thread may have refreshed while this one waited
+            if _jwks['fetched_at'] == fetched_at:
+                try:
+                    _jwks['keys'] = _fetch_jwks()
+                    _jwks['fetched_at'] = time.monotonic()
+                except (requests.RequestException, ValueError, jwt.PyJWTError) as e:
+                    # Keep verifying with the keys we have until Google answers again
+                    logger.error("[OIDC_JWKS] %s", e)
+                    if not _jwks['keys']:
+                        raise LoginError("Could not load Google signing keys", status=502)
+
+    key = _jwks['keys'].get(kid)
+    if key is None:
+        raise LoginError("Unknown id_token signing key")
+    return key
+
+
+def clear_jwks():
+    with _lock:
+        _jwks.update(keys={}, fetched_at=None)
+
+
+def verify_id_token(id_token):
+    """
+    Verify a Google id_token's signature, audience, issuer and expiry.
+
+    Args:
+        id_token (str): The id_token from the token endpoint.
+
+    Returns:
+        dict: The token's claims.
+
+    Raises:
+        LoginError: If the token is not valid.
+    """
+    try:
+        kid = jwt.get_unverified_header(id_token).get('kid')
+        claims = jwt.decode(
+            id_token,
+            get_signing_key(kid),
+            algorithms=['RS256'],
+            audience=settings.OIDC_CLIENT_ID,
+            leeway=settings.OIDC_ID_TOKEN_LEEWAY,
+            options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']},
+        )
+    except jwt.PyJWTError as e:
+        raise LoginError(f"Invalid id_token: {e}")
+
+    if claims['iss'] not in settings.OIDC_ISSUERS:
+        raise LoginError("Invalid id_token: wrong issuer")
+    return claims
+
+
+def exchange_code(code):
+    """
+    Exchange an authorization code at Google's token endpoint.
+
+    Returns:
+        dict: The token response, with `access_token` and `id_token`.
+
+    Raises:
+        LoginError: If the request fails or Google answers with an error.
+    """
+    token_data = {
+        'code': code,
+        'client_id': settings.OIDC_CLIENT_ID,
+        'client_secret': settings.OIDC_CLIENT_SECRET,
+        'redirect_uri': settings.OIDC_PROVIDERS['google']['redirect_uris'][0],
+        'grant_type': 'authorization_code',
+    }
+    try:
+        response = outbound.request('google', 'POST', settings.OIDC_TOKEN_ENDPOINT, data=token_data)
+        response.raise_for_status()
+        tokens = response.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.error("[OIDC_TOKEN] %s", e)
+        raise LoginError("Token request failed")
+
+    if 'error' in tokens:
+        logger.error("[OIDC_TOKEN] Token endpoint error: %s", tokens['error'])
+        raise LoginError(tokens['error'])
+    if not tokens.get('access_token'):
+        raise LoginError("No access token found")
+    if not tokens.get('id_token'):
+        raise LoginError("No id_token found")
+    return tokens
+
+
+def complete_login(code):
+    """
+    Exchange a code and verify the returned id_token.
+
+    Returns:
+        tuple: (user_info, tokens) where user_info holds the profile claims.
+
+    Raises:
+        LoginError: If any step fails.
+    """
+    tokens = exchange_code(code)
+    claims = verify_id_token(tokens['id_token'])
+    user_info = {claim: claims[claim] for claim in USER_INFO_CLAIMS if claim in claims}
+    return user_info, tokens
+
+
+acomplete_login = sync_to_async(complete_login, thread_sensitive=False)
+
+
+def frontend_redirect_url(access_token, user_info):
+    return (
+        f"{settings.LOGIN_REDIRECT_URL}/api/loguser"
+        f"?session_token={access_token}&user_info={urllib.parse.quote_plus(json.dumps(user_info))}"
+    )
@@ -1,8 +1,9 @@
-import requests
 import os
 import logging
 import xml.etree.ElementTree as ET
 
+from api import outbound
+
 """
 Could have used
 import africastalking
@@ -30,7 +31,7 @@ def send_sms(recipient, message):
         "from": 70142,
     }
 
-    response = requests.post(AFRICASTALKING_ENDPOINT, headers=headers, data=data)
+    response = outbound.request('africastalking', 'POST', AFRICASTALKING_ENDPOINT, headers=headers, data=data)
     logger.debug("[AFT_POST_RESPONSE_STATUS_CODE] %s", response.status_code)
     logger.debug("[AFT_POST_RESPONSE_HEADERS] %s", response.headers)
     logger.debug("[AFT_POST_RESPONSE_CONTENT] %s", response.content)
@@ -0,0 +1,414 @@
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.http import Http404
+from rest_framework import serializers
+
+from api.models import Product, Order, OrderItem, Customer, NotificationOutbox
+from api.utils import get_product_details, email_notification, sms_notification
+from api.products.cache import bump_catalog_version
+from .rollups import record_created_orders
+from .inventory import stock_requirements, merge_requirements, reserve_stock, InsufficientStock, InvalidOrder
+
+"""
+Order write pipeline shared by the order endpoints.
+
+Everything here is set-based: products are loaded with one `in_bulk` query,
+stock is reserved with one conditional UPDATE, items are written with one
+`bulk_create` and the order total is computed in memory, so the number of
+queries does not grow with the size of the basket.
+Callers are expected to wrap these calls in `transaction.atomic()`.
+"""
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_EACH = 'each'
+NOTIFY_COALESCE = 'coalesce'
+NOTIFY_NONE = 'none'
+NOTIFY_CHOICES = (NOTIFY_EACH, NOTIFY_COALESCE, NOTIFY_NONE)
+
+BULK_BATCH_SIZE = 500
+
+_boolean = serializers.BooleanField()
+
+
+def parse_flag(data, field, default=False):
+    """
+    Read a boolean order field the way the serializers do, so JSON booleans and
+    form values such as "true", "false", "1" and "0" all mean what they say.
+
+    Args:
+        data (dict): The order payload.
+        field (str): The field to read, e.g. "is_paid".
+        default (bool): The value when the field is absent.
+
+    Raises:
+        InvalidOrder: If the value is not a boolean.
+    """
+    if field not in data:
+        return default
+    try:
+        return _boolean.to_internal_value(data[field])
+    except serializers.ValidationError:
+        raise InvalidOrder(f"{field} must be true or false")
+
+
+def load_products(store, order_items_data):
+    """
+    Fetch every product referenced by the order items in a single query.
+
+    Args:
+        store (Store): The store the products must belong to.
+        order_items_data (list): List of dictionaries containing order item data.
+
+    Returns:
+        dict: Products keyed by their UUID.
+
+    Raises:
+        Http404: If any referenced product does not exist in the store.
+    """
+    product_ids = {uuid.UUID(str(item_data.get('product'))) for item_data in order_items_data}
+    products = Product.objects.filter(store=store).in_bulk(product_ids)
+
+    missing = product_ids - products.keys()
+    if missing:
+        raise Http404(f"Products not found: {', '.join(sorted(str(pid) for pid in missing))}")
+    return products
+
+
+def build_order_items(order, order_items_data, products):
+    """
+    Build unsaved OrderItem rows for an order.
+
+    Args:
+        order (Order): The order the items belong to.
+        order_items_data (list): List of dictionaries containing order item data.
+        products (dict): Products keyed by UUID, as returned by `load_products`.
+
+    Returns:
+        list: Unsaved OrderItem instances.
+    """
+    return [
+        OrderItem(
+            order=order,
+            product=products[uuid.UUID(str(item_data.get('product')))],
+            quantity=item_data.get('quantity', 1),
+            price=item_data.get('price', 0.00),
+        )
+        for item_data in order_items_data
+    ]
+
+
+def calculate_total(order_items_data):
+    """
+    Sum the item prices of an order in memory, matching `Order.calculate_total_price`.
+
+    Args:
+        order_items_data (list): List of dictionaries containing order item data.
+
+    Returns:
+        Decimal: The order total.
+    """
+    return sum((Decimal(str(item_data.get('price', 0) or 0)) for item_data in order_items_data), Decimal('0'))
+
+
+def create_order(store, customer, data):
+    """
+    Create an order and its items with a constant number of queries.
+
+    Args:
+        store (Store): The store placing the order.
+        customer (Customer): The customer the order is for.
+        data (dict): Order payload with `orderItems` and the order fields.
+
+    Returns:
+        Order: The created order.
+        dict: The products referenced by the order, keyed by UUID.
+
+    Raises:
+        InvalidOrder: If a flag or an order item is malformed, see `validate_order_items`.
+        InsufficientStock: If any product is short, nothing is reserved.
+    """
+    is_paid, is_delivered = parse_flag(data, 'is_paid'), parse_flag(data, 'is_delivered')
+    order_items_data = data.get('orderItems', [])
+    requirements = validate_order_items(order_items_data)
+    products = load_products(store, order_items_data)
+    reserve_stock(requirements)
+    # Stock levels are part of the cached catalog
+    bump_catalog_version(store.id)
+
+    order = Order.objects.create(
+        store=store,
+        customer=customer,
+        is_paid=is_paid,
+        is_delivered=is_delivered,
+        phone=data.get('phone', ''),
+        address=data.get('address', ''),
+        delivery_date=data.get('delivery_date', None),
+        total_price=calculate_total(order_items_data),
+    )
+    items = OrderItem.objects.bulk_create(build_order_items(order, order_items_data, products))
+    record_created_orders([order], items)
+
+    return order, products
+
+
+def format_order_items(order_items_data, products):
+    """
+    Format the item lines and total shown in order confirmations.
+
+    Args:
+        order_items_data (list): List of dictionaries containing order item data.
+        products (dict): Products keyed by UUID, as returned by `load_products`.
+
+    Returns:
+        str: One line per item.
+        Decimal: Total price of the items.
+    """
+    product_details, total_price = get_product_details(order_items_data, products)
+    products_info = "\n".join(
+        [f"{item['quantity']} x {item['name']} @ {item['price']} each = {item['total']}" for item in product_details]
+    )
+    return products_info, total_price
+
+
+def build_order_message(store, order_items_data, products):
+    """
+    Format the confirmation text sent to the customer after an order is placed.
+
+    Args:
+        store (Store): The store the order was placed with.
+        order_items_data (list): List of dictionaries containing order item data.
+        products (dict): Products keyed by UUID, as returned by `load_products`.
+
+    Returns:
+        str: The message body used for both the email and the SMS.
+    """
+    products_info, total_price = format_order_items(order_items_data, products)
+    return (
+        f"Order received! \n"
+        f"Items: \n{products_info}\n"
+        f"Total: {total_price}\n"
+        f"Thank you for shopping with us at {store.name}\n"
+        f"Glace your Health care partner!"
+    )
+
+
+def build_orders_summary_message(store, orders_items_data, products):
+    """
+    Format a single confirmation covering several orders of one customer,
+    used when a batch sync coalesces notifications.
+
+    Args:
+        store (Store): The store the orders were placed with.
+        orders_items_data (list): The `orderItems` list of each order.
+        products (dict): Products keyed by UUID, as returned by `load_products`.
+
+    Returns:
+        str: The message body used for both the email and the SMS.
+    """
+    blocks = []
+    grand_total = 0
+    for number, order_items_data in enumerate(orders_items_data, start=1):
+        products_info, total_price = format_order_items(order_items_data, products)
+        grand_total += total_price
+        blocks.append(f"Order {number}: \n{products_info}\nTotal: {total_price}")
+    return (
+        f"{len(orders_items_data)} orders received! \n"
+        + "\n".join(blocks)
+        + f"\nGrand total: {grand_total}\n"
+        f"Thank you for shopping with us at {store.name}\n"
+        f"Glace your Health care partner!"
+    )
+
+
+def parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def validate_order_items(order_items_data):
+    """
+    Check an order's items before anything is read or written.
+
+    Args:
+        order_items_data (list): List of dictionaries containing order item data.
+
+    Returns:
+        dict: Quantity keyed by product UUID, see `stock_requirements`.
+
+    Raises:
+        InvalidOrder: If the items are not a list, or an item has no valid
+            product id, a non-numeric price or a quantity below 1.
+    """
+    if not isinstance(order_items_data, list):
+        raise InvalidOrder("orderItems must be a list")
+    if any(not isinstance(item_data, dict) or not parse_uuid(item_data.get('product'))
+           for item_data in order_items_data):
+        raise InvalidOrder("Every order item needs a valid product id")
+    try:
+        prices = [Decimal(str(item_data.get('price', 0) or 0)) for item_data in order_items_data]
+    except InvalidOperation:
+        prices = None
+    if prices is None or not all(price.is_finite() for price in prices):
+        raise InvalidOrder("Every order item needs a numeric price")
+    return stock_requirements(order_items_data)
+
+
+def create_orders(store, orders_data, notify=NOTIFY_EACH):
+    """
+    Create many orders for one store with a constant number of queries.
+
+    Customers and products referenced by the whole batch are validated with one
+    query each, valid orders and their items are inserted with `bulk_create`,
+    and notifications are either queued per order, coalesced per customer or
+    suppressed. Orders that fail validation are reported and skipped, they do
+    not prevent the rest of the batch from being created.
+
+    Args:
+        store (Store): The store placing the orders.
+        orders_data (list): Order payloads in the same shape `OrderView.post` accepts.
+        notify (str): One of NOTIFY_EACH, NOTIFY_COALESCE or NOTIFY_NONE.
+
+    Returns:
+        list: One result dictionary per input order, in input order.
+    """
+    results = []
+    parsed = []
+    customer_ids = set()
+    product_ids = set()
+    for index, data in enumerate(orders_data):
+        result = {'index': index}
+        if isinstance(data, dict) and data.get('clientRef') is not None:
+            result['clientRef'] = data['clientRef']
+        results.append(result)
+
+        if not isinstance(data, dict):
+            result.update(status='error', detail="Order must be an object")
+            continue
+
+        customer_id = parse_uuid(data.get('customerId'))
+        if not customer_id:
+            result.update(status='error', detail="Customer id is required")
+            continue
+        try:
+            data = {**data, 'is_paid': parse_flag(data, 'is_paid'), 'is_delivered': parse_flag(data, 'is_delivered')}
+            requirements = validate_order_items(data.get('orderItems', []))
+        except InvalidOrder as e:
+            result.update(status='error', detail=str(e))
+            continue
+
+        customer_ids.add(customer_id)
+        product_ids.update(requirements)
+        parsed.append((result, data, customer_id, requirements))
+
+    customers = Customer.objects.filter(store=store).in_bulk(customer_ids)
+    products = Product.objects.filter(store=store).in_bulk(product_ids)
+
+    valid = []
+    for result, data, customer_id, requirements in parsed:
+        if customer_id not in customers:
+            result.update(status='error', detail=f"Customer not found with id {customer_id}")
+            continue
+        missing = requirements.keys() - products.keys()
+        if missing:
+            result.update(status='error', detail=f"Products not found: {', '.join(sorted(str(pid) for pid in missing))}")
+            continue
+        valid.append((result, data, customers[customer_id], requirements))
+
+    orders = []
+    items = []
+    created = []
+    for result, data, customer in reserve_batch(valid):
+        order_items_data = data.get('orderItems', [])
+        order = Order(
+            store=store,
+            customer=customer,
+            is_paid=data.get('is_paid', False),
+            is_delivered=data.get('is_delivered', False),
+            phone=data.get('phone', ''),
+            address=data.get('address', ''),
+            delivery_date=data.get('delivery_date', None),
+            total_price=calculate_total(order_items_data),
+        )
+        orders.append(order)
+        items.extend(build_order_items(order, order_items_data, products))
+        created.append((order, order_items_data))
+        result.update(status='created', id=str(order.id))
+
+    if orders:
+        bump_catalog_version(store.id)
+    Order.objects.bulk_create(orders, batch_size=BULK_BATCH_SIZE)
+    OrderItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+    record_created_orders(orders, items)
+
+    notifications = build_batch_notifications(store, created, products, notify)
+    NotificationOutbox.objects.bulk_create(notifications, batch_size=BULK_BATCH_SIZE)
+
+    return results
+
+
+def reserve_batch(valid):
+    """
+    Reserve stock for a batch of validated orders.
+
+    The whole batch is reserved with a single statement. Only if that fails is
+    each order retried on its own, so one short order does not sink the rest.
+
+    Args:
+        valid (list): (result, data, customer, requirements) tuples.
+
+    Returns:
+        list: (result, data, customer) for the orders whose stock was reserved.
+    """
+    try:
+        reserve_stock(merge_requirements(*[requirements for *_, requirements in valid]))
+        return [(result, data, customer) for result, data, customer, _ in valid]
+    except InsufficientStock:
+        pass
+
+    reserved = []
+    for result, data, customer, requirements in valid:
+        try:
+            reserve_stock(requirements)
+        except InsufficientStock as e:
+            result.update(status='error', detail=str(e))
+            continue
+        reserved.append((result, data, customer))
+    return reserved
+
+
+def build_batch_notifications(store, created, products, notify):
+    """
+    Build the unsaved outbox rows for a batch of orders.
+
+    Args:
+        store (Store): The store the orders were placed with.
+        created (list): (order, order_items_data) pairs for the created orders.
+        products (dict): Products keyed by UUID.
+        notify (str): One of NOTIFY_EACH, NOTIFY_COALESCE or NOTIFY_NONE.
+
+    Returns:
+        list: Unsaved NotificationOutbox rows.
+    """
+    subject = "Order Received!"
+    notifications = []
+    if notify == NOTIFY_EACH:
+        for order, order_items_data in created:
+            message = build_order_message(store, order_items_data, products)
+            notifications.append(email_notification(message, subject, order.customer.email))
+            notifications.append(sms_notification(order.phone, message))
+    elif notify == NOTIFY_COALESCE:
+        by_customer = {}
+        for order, order_items_data in created:
+            by_customer.setdefault(order.customer_id, []).append((order, order_items_data))
+        for customer_orders in by_customer.values():
+            customer = customer_orders[0][0].customer
+            message = build_orders_summary_message(store, [items for _, items in customer_orders], products)
+            phone = next((order.phone for order, _ in customer_orders if order.phone), customer.phone_number)
+            notifications.append(email_notification(message, subject, customer.email))
+            notifications.append(sms_notification(phone, message))
+    return [notification for notification in notifications if notification]
@@ -0,0 +1,158 @@
+import logging
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F, Sum, IntegerField
+from django.utils import timezone
+
+from api.models import Product, Order, OrderItem
+from api.products.cache import bump_catalog_version
+
+"""
+Stock reservation for checkout.
+
+Stock is decremented with one conditional statement for the whole basket:
+
+    UPDATE product SET quantity = quantity - CASE id WHEN .. THEN n .. END
+    WHERE id IN (..) AND quantity >= CASE id WHEN .. THEN n .. END
+
+The database applies the check and the decrement atomically per row, so
+concurrent checkouts of the same product never read-modify-write and only hold
+the row lock for the duration of that one statement. If fewer rows were
+updated than requested, some line was short and the statement is rolled back
+to its savepoint.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(str(pid) for pid in product_ids)
+        super().__init__(f"Insufficient stock for products: {', '.join(self.product_ids)}")
+
+
+class InvalidOrder(ValueError):
+    pass
+
+
+class _Shortfall(Exception):
+    pass
+
+
+def stock_requirements(order_items_data):
+    """
+    Total quantity needed per product for a list of order items.
+
+    Args:
+        order_items_data (list): List of dictionaries containing order item data.
+
+    Returns:
+        dict: Quantity keyed by product UUID.
+
+    Raises:
+        InvalidOrder: If an item's quantity is not a whole number of at least 1.
+    """
+    requirements = defaultdict(int)
+    for item_data in order_items_data:
+        try:
+            quantity = int(item_data.get('quantity', 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            raise InvalidOrder("Every order item needs a quantity of at least 1")
+        requirements[uuid.UUID(str(item_data.get('product')))] += quantity
+    return dict(requirements)
+
+
+def merge_requirements(*requirements_list):
+    merged = defaultdict(int)
+    for requirements in requirements_list:
+        for product_id, quantity in requirements.items():
+            merged[product_id] += quantity
+    return dict(merged)
+
+
+def _per_product(requirements):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in requirements.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(requirements):
+    """
+    Decrement stock for every product in one conditional UPDATE.
+
+    Args:
+        requirements (dict): Quantity keyed by product UUID.
+
+    Raises:
+        InsufficientStock: If any product has less stock than required. No
+            product is decremented in that case.
+    """
+    if not requirements:
+        return
+
+    needed = _per_product(requirements)
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(id__in=requirements.keys(), quantity__gte=needed).update(
+                quantity=F('quantity') - needed,
+                updated_at=timezone.now(),
+            )
+            if updated != len(requirements):
+                raise _Shortfall()
+    except _Shortfall:
+        # The savepoint is rolled back, so this reads the stock the statement saw
+        short = Product.objects.filter(id__in=requirements.keys(), quantity__lt=needed).values_list('id', flat=True)
+        missing = set(requirements) - set(Product.objects.filter(id__in=requirements.keys()).values_list('id', flat=True))
+        raise InsufficientStock(set(short) | missing)
+
+
+def release_stock(requirements):
+    """
+    Return reserved stock, e.g. when an order is cancelled.
+
+    Args:
+        requirements (dict): Quantity keyed by product UUID.
+    """
+    if not requirements:
+        return
+
+    Product.objects.filter(id__in=requirements.keys()).update(
+        quantity=F('quantity') + _per_product(requirements),
+        updated_at=timezone.now(),
+    )
+
+
+def cancel_order(order):
+    """
+    Cancel an order and put its items back in stock. Cancelling is guarded by
+    a conditional update, so stock is restored exactly once even if two
+    cancellations race.
+
+    Args:
+        order (Order): The order to cancel.
+
+    Returns:
+        bool: False if the order was already cancelled.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        cancelled = Order.objects.filter(id=order.id, is_cancelled=False).update(is_cancelled=True, updated_at=now)
+        if not cancelled:
+            return False
+
+        quantities = (
+            OrderItem.objects.filter(order_id=order.id)
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+        )
+        release_stock({row['product_id']: row['total'] for row in quantities})
+        bump_catalog_version(order.store_id)
+
+    order.is_cancelled = True
+    order.updated_at = now
+    return True
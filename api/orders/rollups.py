@@ -0,0 +1,170 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q, Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import Order, OrderItem, StoreDailySales
+
+"""
+Incremental maintenance of the StoreDailySales rollup.
+
+The order write paths call into this module inside their own transaction, so
+a rollup row always moves together with the orders it counts. Rows are updated
+with F() increments rather than read-modify-write, which keeps concurrent
+checkouts for the same store and day from losing each other's updates.
+`rebuild_daily_sales` recomputes the table from scratch for backfills.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def sales_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def apply_deltas(store_id, day, deltas):
+    """
+    Add deltas to one store's daily row, creating the row on first use.
+
+    Args:
+        store_id (UUID): The store the row belongs to.
+        day (date): The sales day.
+        deltas (dict): Increment per rollup field, negative values decrement.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    updates['updated_at'] = timezone.now()
+    rows = StoreDailySales.objects.filter(store_id=store_id, date=day)
+    if rows.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            StoreDailySales.objects.create(store_id=store_id, date=day, **deltas)
+    except IntegrityError:
+        # Another transaction created the row between our update and insert
+        rows.update(**updates)
+
+
+def record_created_orders(orders, items):
+    """
+    Count newly created orders in the rollup.
+
+    Args:
+        orders (list): The created Order instances.
+        items (list): The created OrderItem instances of those orders.
+    """
+    items_sold = defaultdict(int)
+    for item in items:
+        items_sold[item.order_id] += int(item.quantity)
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for order in orders:
+        bucket = deltas[(order.store_id, sales_day(order))]
+        bucket['order_count'] += 1
+        bucket['paid_count'] += int(bool(order.is_paid))
+        bucket['delivered_count'] += int(bool(order.is_delivered))
+        bucket['revenue'] += Decimal(order.total_price or 0)
+        bucket['items_sold'] += items_sold[order.id]
+
+    for (store_id, day), bucket in deltas.items():
+        apply_deltas(store_id, day, bucket)
+
+
+def record_order_update(order, was_paid, was_delivered):
+    """
+    Move an updated order between the paid and delivered counts of its day.
+
+    Args:
+        order (Order): The order after the update has been saved.
+        was_paid (bool): Whether the order was paid before the update.
+        was_delivered (bool): Whether the order was delivered before the update.
+    """
+    apply_deltas(order.store_id, sales_day(order), {
+        'paid_count': int(bool(order.is_paid)) - int(bool(was_paid)),
+        'delivered_count': int(bool(order.is_delivered)) - int(bool(was_delivered)),
+    })
+
+
+def record_order_cancelled(order, was_paid, was_delivered):
+    """
+    Take a cancelled order out of the rollup of its day.
+
+    Args:
+        order (Order): The order that has just been cancelled.
+        was_paid (bool): Whether the order was counted as paid.
+        was_delivered (bool): Whether the order was counted as delivered.
+    """
+    items_sold = OrderItem.objects.filter(order_id=order.id).aggregate(total=Sum('quantity'))['total'] or 0
+    apply_deltas(order.store_id, sales_day(order), {
+        'order_count': -1,
+        'paid_count': -int(bool(was_paid)),
+        'delivered_count': -int(bool(was_delivered)),
+        'revenue': -Decimal(order.total_price or 0),
+        'items_sold': -int(items_sold),
+    })
+
+
+@transaction.atomic
+def rebuild_daily_sales(store_ids=None):
+    """
+    Recompute the rollup from the order tables, leaving out cancelled orders.
+    Orders written while a rebuild runs can be missed, so run it while the
+    affected stores are quiet.
+
+    Args:
+        store_ids (list): Only rebuild these stores, defaults to every store.
+
+    Returns:
+        int: Number of rollup rows written.
+    """
+    orders = Order.objects.filter(is_cancelled=False)
+    items = OrderItem.objects.filter(order__is_cancelled=False)
+    rollups = StoreDailySales.objects.all()
+    if store_ids is not None:
+        orders = orders.filter(store_id__in=store_ids)
+        items = items.filter(order__store_id__in=store_ids)
+        rollups = rollups.filter(store_id__in=store_ids)
+
+    totals = {}
+    order_totals = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('store_id', 'day')
+        .annotate(
+            order_count=Count('id'),
+            paid_count=Count('id', filter=Q(is_paid=True)),
+            delivered_count=Count('id', filter=Q(is_delivered=True)),
+            revenue=Sum('total_price'),
+        )
+    )
+    for row in order_totals:
+        totals[(row['store_id'], row['day'])] = StoreDailySales(
+            store_id=row['store_id'],
+            date=row['day'],
+            order_count=row['order_count'],
+            paid_count=row['paid_count'],
+            delivered_count=row['delivered_count'],
+            revenue=row['revenue'] or 0,
+        )
+
+    item_totals = (
+        items.annotate(day=TruncDate('order__created_at'))
+        .values('order__store_id', 'day')
+        .annotate(items_sold=Sum('quantity'))
+    )
+    for row in item_totals:
+        rollup = totals.get((row['order__store_id'], row['day']))
+        if rollup:
+            rollup.items_sold = row['items_sold'] or 0
+
+    rollups.delete()
+    StoreDailySales.objects.bulk_create(totals.values(), batch_size=1000)
+
+    return len(totals)
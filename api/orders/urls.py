@@ -1,10 +1,16 @@
 # urls.py
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+# Under ASGI these routes are served by async views, see api/async_views.py
+OrderView = views.AsyncOrderView if settings.SERVER_MODE == 'asgi' else views.OrderView
+
 urlpatterns = [
-    path('<uuid:store_id>/orders/', views.OrderView.as_view(), name='orders'),
+    path('<uuid:store_id>/orders/', OrderView.as_view(), name='orders'),
+    path('<uuid:store_id>/orders/batch/', views.OrderBatchView.as_view(), name='orders-batch'),
+    path('<uuid:store_id>/sales/daily/', views.StoreDailySalesView.as_view(), name='store-daily-sales'),
     path('<uuid:store_id>/orders/<uuid:order_id>/', views.OrderDetailUpdateView.as_view(), name='order-update'),
 ]
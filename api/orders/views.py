@@ -1,5 +1,10 @@
 
 from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from django.db import transaction
+from django.db.models import Prefetch
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -10,16 +15,23 @@ import logging
 
 
 from . import africastalking_api
-from api.utils import SendSMS, get_product_details, send_email
-from api.models import Store, Product, Order, OrderItem, Customer
+from api.utils import queue_email, queue_sms
+from .rollups import record_order_update, record_order_cancelled
+from .inventory import InsufficientStock, cancel_order
+from .checkout import create_order, create_orders, build_order_message, parse_flag, parse_uuid, InvalidOrder, NOTIFY_EACH, NOTIFY_CHOICES
+from api.models import Product, Order, OrderItem, Customer, StoreDailySales
+from api.async_views import AsyncAPIView
+from api.conditional import conditional_response, aconditional_response
+from api.permissions import StoreOwnerPermission
+from api.pagination import KeysetPaginator, InvalidCursor
 from api.serializers import (
-    OrderSerializer
+    OrderSerializer, StoreDailySalesSerializer
 )
 
 logger = logging.getLogger(__name__)
 
 class OrderView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
 
     def get(self, request, store_id):
         try:
@@ -27,20 +39,26 @@ class OrderView(APIView):
             if not user.id:
                 return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            
             # Retrieve the isPaid query parameter
             is_paid = request.query_params.get('isPaid')
             
-            # Filter orders based on isPaid if the parameter is provided
+            # Filter orders based on isPaid if the parameter is provided,
+            # (store, is_paid, created_at) serves both the filter and the sort
+            filters = {'store_id': store_id}
             if is_paid is not None:
-                is_paid = is_paid.lower() == 'true'  # Convert to boolean
-                orders = Order.objects.filter(store=store, is_paid=is_paid).order_by('-created_at')
-            else:
-                orders = Order.objects.filter(store=store).order_by('-created_at')
-            serializer = OrderSerializer(orders, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+                filters['is_paid'] = is_paid.lower() == 'true'  # Convert to boolean
+
+            orders = Order.objects.filter(**filters)
+            return conditional_response(
+                request,
+                lambda: self.list_orders(request, store_id, orders),
+                KeysetPaginator(request).get_page_queryset(orders),
+                'customer__updated_at',
+                window=True,
+            )
 
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error("[ORDERS_GET] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -51,62 +69,30 @@ class OrderView(APIView):
             if not user.id:
                 return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
     
-            store = get_object_or_404(Store, id=store_id, user=user)
-            data = request.data
-            data['store'] = store.id  # Ensure the store id is set
-    
-            customer_id = data.get('customerId')
-            customer = get_object_or_404(Customer, id=customer_id, store=store)
-    
-            # Create the order
-            order = Order.objects.create(
-                store=store,
-                customer=customer,
-                is_paid=data.get('is_paid', False),
-                is_delivered=data.get('is_delivered', False),
-                phone=data.get('phone', ''),
-                address=data.get('address', ''),
-                delivery_date=data.get('delivery_date', None)
-            )
+            with transaction.atomic():
+                store = request.store
+                data = request.data
+                data['store'] = store.id  # Ensure the store id is set
     
-            # Create order items
-            order_items_data = data.get('orderItems', [])
-            for item_data in order_items_data:
-                product_id = item_data.get('product')
-                product = get_object_or_404(Product, id=product_id)
-                
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=item_data.get('quantity', 1),
-                    price=item_data.get('price', 0.00)
-                )
+                customer_id = parse_uuid(data.get('customerId'))
+                if not customer_id:
+                    return Response({"detail": "Customer id is required"}, status=status.HTTP_400_BAD_REQUEST)
+                customer = get_object_or_404(Customer, id=customer_id, store=store)
     
-            # Calculate the total price
-            order.calculate_total_price()
+                # Create the order and its items, products are loaded once and reused below
+                order, products = create_order(store, customer, data)
     
-            # Serialize the created order with its items
-            serializer = OrderSerializer(order, context={'request': request})
+                # Serialize the created order with its items
+                serializer = OrderSerializer(order, context={'request': request})
     
-            # Get product details for SMS
-            product_details, total_price = get_product_details(order_items_data)
-            products_info = "\n".join(
-                [f"{item['quantity']} x {item['name']} @ {item['price']} each = {item['total']}" for item in product_details]
-            )
-            message = (
-                f"Order received! \n"
-                f"Items: \n{products_info}\n"
-                f"Total: {total_price}\n"
-                f"Thank you for shopping with us at {store.name}\n"
-                f"Glace your Health care partner!"
-            )
-            subject="Order Received!"
-            recipient=customer.email
-            send_email(message,subject,recipient)
-            
-            # Send SMS using vonage, has free tier for live testing purposes
-            sms_sender = SendSMS()
-            sms_sender.send_message(order.phone, message)
+                message = build_order_message(store, data.get('orderItems', []), products)
+                subject="Order Received!"
+                recipient=customer.email
+
+                # Notifications go to the outbox in the same transaction as the order and
+                # are delivered by the drain_outbox worker, off the request path.
+                queue_email(message, subject, recipient)
+                queue_sms(order.phone, message)
 
             #africa's talking function for sending sms, returns 101 - success
             # response = africastalking_api.send_sms(order.phone, message)
@@ -114,13 +100,113 @@ class OrderView(APIView):
     
             return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+        except InsufficientStock as e:
+            return Response({"detail": str(e), "products": e.product_ids}, status=status.HTTP_409_CONFLICT)
+        except InvalidOrder as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Http404 as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error("[ORDER_POST] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-#For integrity issues only update is_delivered,is_paid and delivery date.
+    def list_orders(self, request, store_id, orders):
+        orders = (
+            orders.select_related('customer')
+            .prefetch_related(Prefetch('order_items', queryset=OrderItem.objects.all()))
+        )
+        paginator = KeysetPaginator(request)
+        page = paginator.paginate_queryset(orders)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AsyncOrderView(AsyncAPIView):
+    """
+    The order list for ASGI deployments. Placing an order goes to OrderView,
+    since it is one transaction and Django's async ORM cannot hold one.
+    """
+    sync_view = OrderView
+
+    async def get(self, request, store_id):
+        try:
+            is_paid = request.query_params.get('isPaid')
+            filters = {'store_id': store_id}
+            if is_paid is not None:
+                filters['is_paid'] = is_paid.lower() == 'true'
+
+            orders = Order.objects.filter(**filters)
+            return await aconditional_response(
+                request,
+                lambda: self.list_orders(request, orders),
+                KeysetPaginator(request).get_page_queryset(orders),
+                'customer__updated_at',
+                window=True,
+            )
+
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[ORDERS_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def list_orders(self, request, orders):
+        orders = (
+            orders.select_related('customer')
+            .prefetch_related(Prefetch('order_items', queryset=OrderItem.objects.all()))
+        )
+        paginator = KeysetPaginator(request)
+        page = await paginator.apaginate_queryset(orders)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class OrderBatchView(APIView):
+    """
+    Create many orders for one store in a single request, used by POS tablets
+    replaying orders taken while offline. Accepts either a list of orders or
+    {"orders": [...], "notify": "each" | "coalesce" | "none"}.
+    """
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+
+    def post(self, request, store_id):
+        try:
+            user = request.user
+            if not user.id:
+                return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
+
+            data = request.data
+            if isinstance(data, list):
+                orders_data, notify = data, NOTIFY_EACH
+            else:
+                orders_data, notify = data.get('orders'), data.get('notify', NOTIFY_EACH)
+
+            if not isinstance(orders_data, list) or not orders_data:
+                return Response({"detail": "Orders are required"}, status=status.HTTP_400_BAD_REQUEST)
+            if len(orders_data) > settings.ORDER_BATCH_MAX_SIZE:
+                return Response({"detail": f"At most {settings.ORDER_BATCH_MAX_SIZE} orders per batch"}, status=status.HTTP_400_BAD_REQUEST)
+            if notify not in NOTIFY_CHOICES:
+                return Response({"detail": f"Notify must be one of {', '.join(NOTIFY_CHOICES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            store = request.store
+
+            with transaction.atomic():
+                results = create_orders(store, orders_data, notify)
+
+            created = sum(1 for result in results if result['status'] == 'created')
+            return Response({
+                "created": created,
+                "failed": len(results) - created,
+                "results": results,
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("[ORDERS_BATCH_POST] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+#For integrity issues only update is_delivered,is_paid, delivery date and cancel the order.
 class OrderDetailUpdateView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
 
     def get(self, request, store_id, order_id):
         try:
@@ -128,15 +214,17 @@ class OrderDetailUpdateView(APIView):
             if not user.id:
                 return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
 
-            # Retrieve the store
-            store = get_object_or_404(Store, id=store_id, user=user)
-
             # Retrieve the order belonging to the store
-            order = get_object_or_404(Order, id=order_id, store=store)
+            orders = Order.objects.filter(id=order_id, store_id=store_id)
 
             # Serialize the order data
-            serializer = OrderSerializer(order)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional_response(
+                request,
+                lambda: Response(OrderSerializer(get_object_or_404(orders)).data, status=status.HTTP_200_OK),
+                orders,
+                Customer.objects.filter(orders__in=orders),
+                detail=True,
+            )
 
         except Exception as e:
             logger.error("[ORDER_GET] %s", e)
@@ -148,25 +236,71 @@ class OrderDetailUpdateView(APIView):
             if not user.id:
                 return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
 
-            # Retrieve the store
-            store = get_object_or_404(Store, id=store_id, user=user)
+            data = request.data
+            try:
+                cancel = parse_flag(data, 'is_cancelled')
+            except InvalidOrder as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Retrieve the order belonging to the store
-            order = get_object_or_404(Order, id=order_id, store=store)
+            with transaction.atomic():
+                # Retrieve the order belonging to the store, locked so the rollup sees updates in order
+                order = get_object_or_404(Order.objects.select_for_update(), id=order_id, store_id=store_id)
+                if order.is_cancelled and 'is_cancelled' in data and not cancel:
+                    return Response({"detail": "Cancelled orders cannot be reopened"}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Update the order fields
+                try:
+                    is_delivered = parse_flag(data, 'is_delivered', order.is_delivered)
+                    is_paid = parse_flag(data, 'is_paid', order.is_paid)
+                except InvalidOrder as e:
+                    return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                was_cancelled, was_paid, was_delivered = order.is_cancelled, order.is_paid, order.is_delivered
+
+                order.is_delivered = is_delivered
+                order.delivery_date = data.get('delivery_date', order.delivery_date)
+                order.is_paid = is_paid
+                # Puts the order's items back in stock, only once
+                cancelled = cancel and cancel_order(order)
+                # Only the editable fields are written so a concurrent cancel is never undone
+                order.save(update_fields=['is_delivered', 'delivery_date', 'is_paid', 'updated_at'])
+                if cancelled:
+                    record_order_cancelled(order, was_paid, was_delivered)
+                elif not was_cancelled:
+                    record_order_update(order, was_paid, was_delivered)
 
-            # Update the order fields
-            data = request.data
-            is_delivered = data.get('is_delivered', order.is_delivered)
-            delivery_date = data.get('delivery_date', order.delivery_date)
-            is_paid = data.get('is_paid', order.is_paid)
-
-            order.is_delivered = is_delivered
-            order.delivery_date = delivery_date
-            order.is_paid = is_paid
-            order.save()
-                        
             return Response({"detail": "Order updated successfully"}, status=status.HTTP_200_OK)
 
         except Exception as e:
             logger.error("[ORDER_UPDATE] %s", e)
-            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class StoreDailySalesView(APIView):
+    """
+    Per-day order totals read from the StoreDailySales rollup, for dashboards.
+    Optional ?from= and ?to= (YYYY-MM-DD) bound the range, both inclusive.
+    """
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+
+    def get(self, request, store_id):
+        try:
+            user = request.user
+            if not user.id:
+                return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
+
+            filters = {'store_id': store_id}
+            for param, lookup in (('from', 'date__gte'), ('to', 'date__lte')):
+                value = request.query_params.get(param)
+                if value:
+                    day = parse_date(value)
+                    if not day:
+                        return Response({"detail": f"Invalid {param} date"}, status=status.HTTP_400_BAD_REQUEST)
+                    filters[lookup] = day
+
+            daily_sales = StoreDailySales.objects.filter(**filters).order_by('date')
+            serializer = StoreDailySalesSerializer(daily_sales, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("[DAILY_SALES_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+import vonage
+
+from . import instrumentation
+
+"""
+Shared outbound HTTP layer for third-party providers (Vonage, Africa's Talking, Google).
+
+Each provider gets one pooled `requests.Session` per process, so repeated calls
+reuse keep-alive TCP+TLS connections instead of opening a new one every time.
+Every call carries an explicit (connect, read) timeout so a slow provider can
+only hold a worker for a bounded time, and latency and error counters are kept
+per provider for monitoring. Calls made while handling a request also add to
+that request's metrics (see api/instrumentation.py).
+"""
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sessions = {}
+_stats = {}
+_vonage_client = None
+
+
+def get_timeout():
+    return (settings.OUTBOUND_CONNECT_TIMEOUT, settings.OUTBOUND_READ_TIMEOUT)
+
+
+def get_session(provider):
+    """
+    Return the process-wide pooled session for a provider, creating it on first use.
+
+    Args:
+        provider (str): Provider name, used as the pool and stats key.
+
+    Returns:
+        requests.Session: A session with a keep-alive connection pool.
+    """
+    session = _sessions.get(provider)
+    if session is None:
+        with _lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.OUTBOUND_POOL_CONNECTIONS,
+                    pool_maxsize=settings.OUTBOUND_POOL_MAXSIZE,
+                    max_retries=0,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[provider] = session
+    return session
+
+
+def record(provider, elapsed_ms, error=False):
+    """
+    Add one call to a provider's latency and error counters.
+    """
+    with _lock:
+        stats = _stats.setdefault(provider, {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['requests'] += 1
+        stats['errors'] += int(error)
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def get_stats():
+    """
+    Snapshot of the per-provider counters for this process.
+
+    Returns:
+        dict: Per provider, the request and error counts plus average and max latency in ms.
+    """
+    with _lock:
+        return {
+            provider: dict(stats, avg_ms=stats['total_ms'] / stats['requests'] if stats['requests'] else 0.0)
+            for provider, stats in _stats.items()
+        }
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+class _Call:
+    def __init__(self):
+        self.error = False
+
+    def failed(self):
+        self.error = True
+
+
+@contextmanager
+def track(provider):
+    """
+    Time a provider call made through a third-party SDK and count it in the stats.
+    Exceptions count as errors; callers can also flag a failed response with `call.failed()`.
+
+    Usage:
+        with track('vonage') as call:
+            response = client.send(...)
+            if not ok(response):
+                call.failed()
+    """
+    call = _Call()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.failed()
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        record(provider, elapsed_ms, call.error)
+        instrumentation.record_outbound(provider, elapsed_ms)
+
+
+def request(provider, method, url, **kwargs):
+    """
+    Make an HTTP request to a provider through its pooled session.
+
+    Args:
+        provider (str): Provider name, used as the pool and stats key.
+        method (str): HTTP method.
+        url (str): Request URL.
+        **kwargs: Passed to `requests.Session.request`; `timeout` defaults to the configured (connect, read) pair.
+
+    Returns:
+        requests.Response: The provider response. 5xx responses are counted as errors.
+
+    Raises:
+        requests.RequestException: On connection errors and timeouts.
+    """
+    kwargs.setdefault('timeout', get_timeout())
+    with track(provider) as call:
+        response = get_session(provider).request(method, url, **kwargs)
+        if response.status_code >= 500:
+            call.failed()
+    return response
+
+
+def get_vonage_client():
+    """
+    Return the process-wide Vonage client. The SDK keeps its own pooled session,
+    so sharing one client gives keep-alive connections across messages.
+    """
+    global _vonage_client
+    if _vonage_client is None:
+        with _lock:
+            if _vonage_client is None:
+                _vonage_client = vonage.Client(
+                    key=os.getenv("VONAGE_API_KEY"),
+                    secret=os.getenv("VONAGE_API_SECRET"),
+                    timeout=get_timeout(),
+                    pool_connections=settings.OUTBOUND_POOL_CONNECTIONS,
+                    pool_maxsize=settings.OUTBOUND_POOL_MAXSIZE,
+                    max_retries=0,
+                )
+    return _vonage_client
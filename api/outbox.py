@@ -0,0 +1,158 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .sms import dispatch_sms
+
+"""
+Delivery side of the notification outbox.
+
+Request handlers only insert NotificationOutbox rows (see `queue_email` and
+`queue_sms` in api/utils.py). This module claims due rows in small batches,
+hands them to the email/SMS providers outside of any database transaction and
+records the outcome, rescheduling failures with exponential backoff.
+
+A claimed row is leased for OUTBOX_LEASE_SECONDS, and the lease is renewed
+right before each message is sent, so a slow batch never lets another worker
+re-claim a row it has not reached yet. If the renewal finds the lease already
+taken over, the message is skipped rather than sent twice. Provider calls are
+bounded by EMAIL_TIMEOUT and the outbound timeouts, well inside the lease.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def get_backoff(attempts):
+    """
+    Delay before the next delivery attempt.
+
+    Args:
+        attempts (int): Number of attempts made so far (1 after the first failure).
+
+    Returns:
+        timedelta: Exponential delay capped at OUTBOX_BACKOFF_MAX_SECONDS.
+    """
+    delay = settings.OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size):
+    """
+    Lease a batch of due notifications to the calling worker.
+
+    Rows are locked with SKIP LOCKED so concurrent workers never claim the same
+    row, and their next_attempt_at is pushed past the lease window so a worker
+    that dies mid-batch only delays delivery instead of losing it.
+
+    Args:
+        batch_size (int): Maximum number of rows to claim.
+
+    Returns:
+        list: The claimed NotificationOutbox rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            NotificationOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=NotificationOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            lease = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            NotificationOutbox.objects.filter(id__in=[n.id for n in batch]).update(next_attempt_at=lease)
+            for notification in batch:
+                notification.next_attempt_at = lease
+    return batch
+
+
+def renew_lease(notification):
+    """
+    Extend the lease on a claimed notification just before it is sent.
+
+    Args:
+        notification (NotificationOutbox): A row returned by `claim_batch`.
+
+    Returns:
+        bool: False if the lease ran out and another worker has claimed the row since.
+    """
+    lease = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    renewed = NotificationOutbox.objects.filter(
+        id=notification.id,
+        status=NotificationOutbox.STATUS_PENDING,
+        next_attempt_at=notification.next_attempt_at,
+    ).update(next_attempt_at=lease)
+    if renewed:
+        notification.next_attempt_at = lease
+    return bool(renewed)
+
+
+def deliver(notification):
+    """
+    Send one notification through its provider, raising on failure.
+
+    Args:
+        notification (NotificationOutbox): The notification to deliver.
+    """
+    if notification.channel == NotificationOutbox.CHANNEL_EMAIL:
+        send_mail(
+            notification.subject,
+            notification.message,
+            os.getenv('EMAIL_HOST_USER'),
+            [notification.recipient],
+            fail_silently=False,
+        )
+    elif notification.channel == NotificationOutbox.CHANNEL_SMS:
+        provider = dispatch_sms(notification.recipient, notification.message)
+        logger.info("[OUTBOX_SMS] %s sent with %s", notification.id, provider)
+    else:
+        raise ValueError(f"Unknown channel {notification.channel}")
+
+
+def process_outbox(batch_size=None):
+    """
+    Claim and deliver one batch of due notifications.
+
+    Args:
+        batch_size (int): Maximum number of rows to process, defaults to OUTBOX_BATCH_SIZE.
+
+    Returns:
+        int: Number of notifications processed (sent or rescheduled).
+    """
+    batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0
+
+    processed = 0
+    for notification in batch:
+        if not renew_lease(notification):
+            logger.warning("[OUTBOX_LEASE_LOST] %s was claimed by another worker, skipping", notification.id)
+            continue
+        processed += 1
+        notification.attempts += 1
+        try:
+            deliver(notification)
+        except Exception as e:
+            notification.last_error = str(e)
+            if notification.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                notification.status = NotificationOutbox.STATUS_FAILED
+                logger.error("[OUTBOX_FAILED] %s after %s attempts: %s", notification.id, notification.attempts, e)
+            else:
+                notification.next_attempt_at = timezone.now() + get_backoff(notification.attempts)
+                logger.warning("[OUTBOX_RETRY] %s attempt %s: %s", notification.id, notification.attempts, e)
+        else:
+            notification.status = NotificationOutbox.STATUS_SENT
+            notification.sent_at = timezone.now()
+            notification.last_error = ""
+
+        notification.save(update_fields=[
+            'attempts', 'status', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at'
+        ])
+
+    return processed
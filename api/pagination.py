@@ -0,0 +1,181 @@
+import base64
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import status
+from rest_framework.response import Response
+
+"""
+Keyset (cursor) pagination for list endpoints ordered newest first.
+
+Pages are addressed by the (created_at, id) of the last row already seen, so
+fetching any page is an index range scan of `pageSize + 1` rows no matter how
+deep the client has scrolled. The response body keeps the plain list shape the
+frontend already consumes; the cursor for the next page is returned in the
+`X-Next-Cursor` header and as a `Link: <...>; rel="next"` header.
+"""
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor sent by the client.
+
+    Returns:
+        tuple: The (created_at, id) position of the last row of the previous page.
+
+    Raises:
+        InvalidCursor: If the cursor was not produced by this API.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        position = (parse_datetime(created_at), uuid.UUID(pk))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+    if position[0] is None:
+        raise InvalidCursor("Invalid cursor")
+    return position
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on (created_at, id), newest first.
+
+    Usage:
+        paginator = KeysetPaginator(request)
+        page = paginator.paginate_queryset(queryset)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'pageSize'
+
+    def __init__(self, request):
+        self.request = request
+        self.next_cursor = None
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.query_params.get(self.page_size_query_param, settings.API_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.API_PAGE_SIZE
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def get_page_queryset(self, queryset):
+        """
+        The unevaluated queryset of one page plus one row to detect a next page.
+
+        Raises:
+            InvalidCursor: If the request carries a malformed cursor.
+        """
+        cursor = self.request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return queryset.order_by('-created_at', '-id')[:self.get_page_size() + 1]
+
+    def finish_page(self, rows):
+        page_size = self.get_page_size()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+        return rows
+
+    def paginate_queryset(self, queryset):
+        """
+        Return one page of the queryset and remember the cursor for the next one.
+
+        Raises:
+            InvalidCursor: If the request carries a malformed cursor.
+        """
+        return self.finish_page(list(self.get_page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset):
+        """
+        `paginate_queryset` for async views, the page is fetched with async iteration.
+        """
+        return self.finish_page([row async for row in self.get_page_queryset(queryset)])
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        query = self.request.query_params.copy()
+        query[self.cursor_query_param] = self.next_cursor
+        return self.request.build_absolute_uri(f"{self.request.path}?{query.urlencode()}")
+
+    def get_paginated_response(self, data, status_code=status.HTTP_200_OK):
+        response = Response(data, status=status_code)
+        if self.next_cursor:
+            response['X-Next-Cursor'] = self.next_cursor
+            response['Link'] = f'<{self.get_next_link()}>; rel="next"'
+        return response
+
+
+class PagePaginator(KeysetPaginator):
+    """
+    Paginate an already ordered queryset by page number.
+
+    Used where the order is not (created_at, id), such as search results ranked
+    by relevance. Only `pageSize + 1` rows are fetched, so no COUNT is run; the
+    next page number is returned in `X-Next-Page` and the `Link` header.
+    """
+    page_query_param = 'page'
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.page = 1
+        self.next_page = None
+
+    def get_page_queryset(self, queryset):
+        """
+        The unevaluated slice of one page plus one row to detect a next page.
+
+        Raises:
+            InvalidCursor: If the page number is not a positive integer.
+        """
+        try:
+            self.page = int(self.request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise InvalidCursor("Invalid page")
+        if self.page < 1:
+            raise InvalidCursor("Invalid page")
+
+        page_size = self.get_page_size()
+        offset = (self.page - 1) * page_size
+        return queryset[offset:offset + page_size + 1]
+
+    def finish_page(self, rows):
+        page_size = self.get_page_size()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_page = self.page + 1
+        return rows
+
+    def get_next_link(self):
+        if not self.next_page:
+            return None
+        query = self.request.query_params.copy()
+        query[self.page_query_param] = self.next_page
+        return self.request.build_absolute_uri(f"{self.request.path}?{query.urlencode()}")
+
+    def get_paginated_response(self, data, status_code=status.HTTP_200_OK):
+        response = Response(data, status=status_code)
+        if self.next_page:
+            response['X-Next-Page'] = str(self.next_page)
+            response['Link'] = f'<{self.get_next_link()}>; rel="next"'
+        return response
@@ -0,0 +1,121 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import BasePermission
+
+from .models import Store
+
+"""
+Store tenancy checks for every view routed under a `store_id`.
+
+`StoreOwnerPermission` answers whether the requesting user owns the store in
+the URL, and attaches the store to the request as `request.store`. Who owns a
+store is cached as `store_id -> user_id`, so in steady state the check costs
+no query at all, and `request.store` is only loaded if the view actually uses
+the instance rather than its id. The cached owner is dropped when a store is
+saved or deleted (see api/signals.py).
+
+Both a missing store and someone else's store answer 404, so store ids cannot
+be probed. Views list the methods that any authenticated user may call in
+`store_owner_exempt_methods`; those still 404 for a store that does not exist.
+"""
+
+
+def owner_key(store_id):
+    return f"store:owner:{store_id}"
+
+
+def _forget(store_id):
+    cache.delete(owner_key(store_id))
+
+
+def forget_store_owner(store_id):
+    """
+    Drop the cached owner of a store. Call it after the store is saved or deleted.
+
+    Args:
+        store_id (UUID): The store that changed.
+    """
+    _forget(store_id)
+    # Dropping it again after commit stops a concurrent request from caching
+    # the owner of a store whose deletion was about to commit
+    transaction.on_commit(partial(_forget, store_id))
+
+
+def resolve_store(request, store_id):
+    """
+    Look up who owns a store and attach the store to the request as `request.store`.
+
+    On a cache hit `request.store` is a lazy object that loads the store on first
+    use. On a miss the store is loaded to fill the cache and attached as is.
+
+    Args:
+        request (Request): The incoming request.
+        store_id (UUID): The store in the URL.
+
+    Returns:
+        int: The owner's user id, or None when the store does not exist.
+    """
+    owner_id = cache.get(owner_key(store_id))
+    if owner_id is not None:
+        request.store = SimpleLazyObject(lambda: Store.objects.get(id=store_id))
+        return owner_id
+
+    store = Store.objects.filter(id=store_id).first()
+    if store is None:
+        return None
+    cache.set(owner_key(store_id), store.user_id, settings.STORE_OWNER_CACHE_TTL)
+    request.store = store
+    return store.user_id
+
+
+async def aresolve_store(request, store_id):
+    """
+    `resolve_store` for async views. On a cache hit `request.store` still loads
+    lazily, so async code should only use it from inside sync_to_async.
+    """
+    owner_id = await cache.aget(owner_key(store_id))
+    if owner_id is not None:
+        request.store = SimpleLazyObject(lambda: Store.objects.get(id=store_id))
+        return owner_id
+
+    store = await Store.objects.filter(id=store_id).afirst()
+    if store is None:
+        return None
+    await cache.aset(owner_key(store_id), store.user_id, settings.STORE_OWNER_CACHE_TTL)
+    request.store = store
+    return store.user_id
+
+
+class StoreOwnerPermission(BasePermission):
+    """
+    Allow a request on `store_id` only for the store's owner, answering 404 otherwise.
+    Views without a `store_id` URL argument are not checked.
+    """
+
+    def has_permission(self, request, view):
+        store_id = view.kwargs.get('store_id')
+        if store_id is None:
+            return True
+
+        return self.check_owner(request, view, resolve_store(request, store_id))
+
+    async def ahas_permission(self, request, view):
+        store_id = view.kwargs.get('store_id')
+        if store_id is None:
+            return True
+        return self.check_owner(request, view, await aresolve_store(request, store_id))
+
+    def check_owner(self, request, view, owner_id):
+        if owner_id is None:
+            raise NotFound("Store not found")
+        if request.method in getattr(view, 'store_owner_exempt_methods', ()):
+            return True
+        if owner_id != request.user.id:
+            raise NotFound("Store not found")
+        return True
@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.conditional import is_not_modified
+from api.db_router import use_primary
+
+"""
+Versioned response cache for the product catalog read endpoints.
+
+Every store has a catalog version in the cache, and categories, which are
+shared by all stores, have one global version. Cached responses are keyed by
+both versions plus the request path and query string, so a write never has
+to find and delete entries: bumping a version makes every response built
+from the old catalog unreachable, and the orphans age out through the TTL or
+the backend's eviction.
+
+The same key also serves as the ETag of product lists (`versioned_response`),
+so revalidating a list, like reading it from the cache, runs no query at all.
+
+Responses are built from the primary, never a read replica. A replica may
+still be behind the write that bumped the version, and a body built from it
+would be served under the new version to every client until the TTL ran out.
+
+Versions start from a nanosecond timestamp rather than 1, so a version key
+that was evicted comes back larger than any value used before it and can
+never resurrect a stale entry.
+"""
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_VERSION_KEY = 'catalog:version:categories'
+
+# Response headers that are part of a cached page (pagination links)
+CACHED_HEADERS = ('X-Next-Cursor', 'X-Next-Page', 'Link')
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def store_version_key(store_id):
+    return f"catalog:version:store:{store_id}"
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _bump_now_and_on_commit(key):
+    # Bumping again after commit stops a concurrent reader from caching the
+    # pre-commit catalog under the version bumped inside the transaction
+    _bump(key)
+    transaction.on_commit(partial(_bump, key))
+
+
+def bump_catalog_version(*store_ids):
+    """
+    Invalidate the cached catalog of the given stores. Call it from every
+    path that writes products, their images or their stock.
+
+    Args:
+        *store_ids (UUID): The stores whose catalog changed.
+    """
+    for store_id in set(store_ids):
+        _bump_now_and_on_commit(store_version_key(store_id))
+
+
+def bump_category_version():
+    """
+    Invalidate every store's cached catalog after a category write.
+    """
+    _bump_now_and_on_commit(CATEGORY_VERSION_KEY)
+
+
+def response_key(request, store_id):
+    query = sorted(request.query_params.lists())
+    digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return (
+        f"catalog:response:{store_id}:{_get_version(store_version_key(store_id))}"
+        f":{_get_version(CATEGORY_VERSION_KEY)}:{digest}"
+    )
+
+
+async def aresponse_key(request, store_id):
+    query = sorted(request.query_params.lists())
+    digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return (
+        f"catalog:response:{store_id}:{await _aget_version(store_version_key(store_id))}"
+        f":{await _aget_version(CATEGORY_VERSION_KEY)}:{digest}"
+    )
+
+
+def cached_response(request, store_id, build):
+    """
+    Serve a catalog response from the cache, building and storing it on a miss.
+    Only 200 responses are cached.
+
+    Args:
+        request (Request): The incoming request, its path and query string are part of the key.
+        store_id (UUID): The store whose catalog the response is built from.
+        build (callable): Builds the Response on a cache miss, reading from the primary.
+
+    Returns:
+        Response: The cached or freshly built response, marked with X-Cache: HIT or MISS.
+    """
+    return _cached_response(response_key(request, store_id), build)
+
+
+def _cached_response(key, build):
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return _cached(cached)
+
+    with use_primary():
+        response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, _cache_entry(response), settings.CATALOG_CACHE_TTL)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def acached_response(request, store_id, build):
+    """
+    `cached_response` for async views, `build` is a coroutine function.
+    """
+    return await _acached_response(await aresponse_key(request, store_id), build)
+
+
+async def _acached_response(key, build):
+    cache = get_cache()
+    cached = await cache.aget(key)
+    if cached is not None:
+        return _cached(cached)
+
+    with use_primary():
+        response = await build()
+    if response.status_code == status.HTTP_200_OK:
+        await cache.aset(key, _cache_entry(response), settings.CATALOG_CACHE_TTL)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def versioned_response(request, store_id, build):
+    """
+    `cached_response` with an ETag derived from the catalog versions instead of
+    the rows, answering 304 while the client's copy is current.
+
+    Returns:
+        Response: A 304 without a body, or the cached or built response carrying the ETag.
+    """
+    key = response_key(request, store_id)
+    etag = _etag(key)
+    if is_not_modified(request, etag, None):
+        return _not_modified(etag)
+    return _with_etag(_cached_response(key, build), etag)
+
+
+async def aversioned_response(request, store_id, build):
+    """
+    `versioned_response` for async views, `build` is a coroutine function.
+    """
+    key = await aresponse_key(request, store_id)
+    etag = _etag(key)
+    if is_not_modified(request, etag, None):
+        return _not_modified(etag)
+    return _with_etag(await _acached_response(key, build), etag)
+
+
+def _etag(key):
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def _not_modified(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+def _with_etag(response, etag):
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+    return response
+
+
+def _cache_entry(response):
+    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+    return response.data, headers
+
+
+def _cached(cached):
+    data, headers = cached
+    response = Response(data, status=status.HTTP_200_OK, headers=headers)
+    response['X-Cache'] = 'HIT'
+    return response
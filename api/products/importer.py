@@ -0,0 +1,262 @@
+import csv
+import io
+import json
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction, DatabaseError
+from django.db.models import Q
+
+from api.models import Category, Product
+from api.utils import sync_product_images
+from .cache import bump_catalog_version
+from .search import refresh_search_vector
+
+"""
+Bulk catalog import: upsert a store's products by SKU from CSV or JSON rows.
+
+Rows are validated up front, with categories resolved for the whole file in
+one query. Valid rows are then written in chunks of PRODUCT_IMPORT_CHUNK_SIZE,
+each in its own transaction: one INSERT .. ON CONFLICT (store, sku) DO UPDATE
+for the products, one read of the resulting ids, and one read, delete and
+insert for the images. A chunk that fails is rolled back and reported without
+stopping the rest of the import. The report lists every rejected row with its
+position in the input.
+
+Columns follow the product API (`categoryId`, `isArchived`) and the product
+export (`category_id`, `category_name`, `is_archived`), so an export can be
+edited and imported back. `images` is a list in JSON and `|`-separated URLs
+in CSV; a row without an `images` column keeps the product's images.
+"""
+
+logger = logging.getLogger(__name__)
+
+ALIASES = {
+    'categoryId': 'category_id',
+    'category': 'category_name',
+    'isArchived': 'is_archived',
+}
+
+UPDATE_FIELDS = ['category', 'name', 'price', 'quantity', 'rating', 'description', 'is_archived', 'updated_at']
+
+TRUE_VALUES = {'true', '1', 'yes', 'y'}
+
+# Column limits, checked per row so one oversized value cannot fail its whole chunk
+MAX_PRICE = Decimal('99999999.99')  # DecimalField(max_digits=10, decimal_places=2)
+MAX_INTEGER = 2 ** 31 - 1
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_csv(content):
+    """
+    Read CSV import rows.
+
+    Args:
+        content (str): The CSV text, with a header row.
+
+    Returns:
+        list: One dict per row, with `images` split into a list when present.
+    """
+    rows = []
+    for row in csv.DictReader(io.StringIO(content)):
+        if row.get('images') is not None:
+            row['images'] = [url.strip() for url in row['images'].split('|') if url.strip()]
+        rows.append(row)
+    return rows
+
+
+def parse_json(content):
+    """
+    Read JSON import rows, either a list or {"products": [...]}.
+
+    Raises:
+        RowError: If the document is not a list of objects.
+    """
+    data = json.loads(content) if isinstance(content, (str, bytes)) else content
+    if isinstance(data, dict):
+        data = data.get('products')
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise RowError("Expected a list of products")
+    return data
+
+
+def normalize(row):
+    return {ALIASES.get(key, key): value for key, value in row.items() if key is not None}
+
+
+def resolve_categories(rows):
+    """
+    Look up every category referenced by id or name in one query.
+
+    Returns:
+        dict: Category keyed by str(id) and by name.
+    """
+    ids, names = set(), set()
+    for row in rows:
+        if row.get('category_id'):
+            try:
+                ids.add(uuid.UUID(str(row['category_id'])))
+            except ValueError:
+                pass
+        elif row.get('category_name'):
+            names.add(row['category_name'])
+
+    categories = {}
+    for category in Category.objects.filter(Q(id__in=ids) | Q(name__in=names)):
+        categories[str(category.id)] = category
+        categories.setdefault(category.name, category)
+    return categories
+
+
+def _required(row, field):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        raise RowError(f"{field} is required")
+    return str(value).strip() if isinstance(value, str) else value
+
+
+def build_product(store, row, categories):
+    """
+    Validate one normalized row into an unsaved Product.
+
+    Raises:
+        RowError: Describing the first problem with the row.
+    """
+    sku = str(_required(row, 'sku'))
+    if len(sku) > 64:
+        raise RowError("sku is longer than 64 characters")
+
+    category_ref = row.get('category_id') or row.get('category_name')
+    if not category_ref:
+        raise RowError("categoryId or category is required")
+    category = categories.get(str(category_ref))
+    if category is None:
+        raise RowError(f"Category not found: {category_ref}")
+
+    try:
+        price = Decimal(str(_required(row, 'price')))
+        quantity = int(_required(row, 'quantity'))
+        rating = int(row.get('rating') or 0)
+    except (InvalidOperation, ValueError, TypeError):
+        raise RowError("price, quantity and rating must be numbers")
+    if not price.is_finite() or price < 0 or quantity < 0:
+        raise RowError("price and quantity cannot be negative")
+    if price > MAX_PRICE or price != price.quantize(Decimal('0.01')):
+        raise RowError(f"price must be at most {MAX_PRICE} with 2 decimal places")
+    if quantity > MAX_INTEGER or not -MAX_INTEGER <= rating <= MAX_INTEGER:
+        raise RowError("quantity or rating is too large")
+
+    name = str(_required(row, 'name'))
+    if len(name) > 255:
+        raise RowError("name is longer than 255 characters")
+
+    images = row.get('images')
+    if images is not None and (not isinstance(images, list) or not all(isinstance(url, str) for url in images)):
+        raise RowError("images must be a list of URLs")
+    if images and any(len(url) > 200 for url in images):
+        raise RowError("image URLs are longer than 200 characters")
+
+    is_archived = row.get('is_archived', False)
+    if isinstance(is_archived, str):
+        is_archived = is_archived.strip().lower() in TRUE_VALUES
+
+    return Product(
+        store=store,
+        category=category,
+        sku=sku,
+        name=name,
+        price=price,
+        quantity=quantity,
+        rating=rating,
+        description=str(row.get('description') or ''),
+        is_archived=bool(is_archived),
+    ), images
+
+
+def write_chunk(store, chunk):
+    """
+    Upsert one chunk of validated products and sync their images.
+
+    Args:
+        store (Store): The store being imported into.
+        chunk (list): (product, images) pairs with unique SKUs.
+
+    Returns:
+        int: How many of the chunk's SKUs already existed.
+    """
+    skus = [product.sku for product, _ in chunk]
+    with transaction.atomic():
+        existing = Product.objects.filter(store=store, sku__in=skus).count()
+        Product.objects.bulk_create(
+            [product for product, _ in chunk],
+            update_conflicts=True,
+            unique_fields=['store', 'sku'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # Conflicting rows keep their original id, so read back what the database holds
+        ids = dict(Product.objects.filter(store=store, sku__in=skus).values_list('sku', 'id'))
+        sync_product_images({
+            ids[product.sku]: images for product, images in chunk if images is not None
+        }, batch_size=settings.PRODUCT_IMPORT_CHUNK_SIZE)
+        refresh_search_vector(list(ids.values()))
+    return existing
+
+
+def import_products(store, rows, chunk_size=None):
+    """
+    Upsert a store's products from parsed import rows.
+
+    Args:
+        store (Store): The store to import into.
+        rows (list): Row dicts from `parse_csv` or `parse_json`.
+        chunk_size (int): Rows per transaction, defaults to PRODUCT_IMPORT_CHUNK_SIZE.
+
+    Returns:
+        dict: Counts of created, updated and failed rows plus an `errors`
+        list of {"row", "sku", "detail"} with 1-based row numbers.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_IMPORT_CHUNK_SIZE
+    rows = [normalize(row) for row in rows]
+    categories = resolve_categories(rows)
+
+    report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def fail(number, row, detail):
+        report['failed'] += 1
+        report['errors'].append({'row': number, 'sku': row.get('sku'), 'detail': detail})
+
+    valid = []
+    seen = {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            product, images = build_product(store, row, categories)
+        except RowError as e:
+            fail(number, row, str(e))
+            continue
+        if product.sku in seen:
+            fail(number, row, f"Duplicate sku, already on row {seen[product.sku]}")
+            continue
+        seen[product.sku] = number
+        valid.append((number, row, product, images))
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            existing = write_chunk(store, [(product, images) for _, _, product, images in chunk])
+        except DatabaseError as e:
+            logger.error("[PRODUCT_IMPORT] chunk at row %s failed: %s", chunk[0][0], e)
+            for number, row, _, _ in chunk:
+                fail(number, row, "Could not be saved, the rows in this chunk were rolled back")
+            continue
+        report['updated'] += existing
+        report['created'] += len(chunk) - existing
+
+    if report['created'] or report['updated']:
+        bump_catalog_version(store.id)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
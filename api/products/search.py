@@ -0,0 +1,81 @@
+import logging
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from api.models import Product
+
+"""
+Full-text product search within a store.
+
+On Postgres every product carries a weighted `search_vector` (name as A,
+description as B) covered by a GIN index, so a search is an index lookup of
+the matching rows followed by a rank sort of just those rows. The vector is
+written by `refresh_search_vector` from the product create, patch and import
+paths. Other databases, i.e. the SQLite test setup, fall back to a
+case-insensitive substring match ranked by whether terms hit the name or only
+the description.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_vector():
+    config = settings.PRODUCT_SEARCH_CONFIG
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+
+
+def refresh_search_vector(product_ids):
+    """
+    Recompute the search vector of the given products in one UPDATE.
+
+    Args:
+        product_ids (list): UUIDs of the products whose name or description changed.
+    """
+    if not product_ids or not is_postgres():
+        return
+    Product.objects.filter(id__in=product_ids).update(search_vector=build_search_vector())
+
+
+def _fallback_search(queryset, query):
+    terms = query.split()
+    matches = Q()
+    score = Value(0)
+    for term in terms:
+        matches &= Q(name__icontains=term) | Q(description__icontains=term)
+        score = score + Case(
+            When(name__icontains=term, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    return queryset.filter(matches).annotate(rank=score)
+
+
+def search_products(queryset, query):
+    """
+    Filter a product queryset to the rows matching a search query, best match first.
+
+    Args:
+        queryset (QuerySet): Products to search, already scoped to a store.
+        query (str): The user's search text; quotes, `or` and `-term` are honoured on Postgres.
+
+    Returns:
+        QuerySet: Matching products annotated with `rank` and ordered by it.
+    """
+    if is_postgres():
+        search_query = SearchQuery(query, search_type='websearch', config=settings.PRODUCT_SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        )
+    else:
+        queryset = _fallback_search(queryset, query)
+    return queryset.order_by('-rank', '-created_at', '-id')
@@ -1,10 +1,17 @@
 # urls.py
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+# Under ASGI these routes are served by async views, see api/async_views.py
+StoreProductView = views.AsyncStoreProductView if settings.SERVER_MODE == 'asgi' else views.StoreProductView
+StoreProductDetailView = views.AsyncStoreProductDetailView if settings.SERVER_MODE == 'asgi' else views.StoreProductDetailView
+
 urlpatterns = [
-    path('<uuid:store_id>/products/', views.StoreProductView.as_view(), name='store-products'),
-    path('<uuid:store_id>/products/<uuid:product_id>/', views.StoreProductDetailView.as_view(), name='store-product-detail'),
+    path('<uuid:store_id>/products/', StoreProductView.as_view(), name='store-products'),
+    path('<uuid:store_id>/products/search/', views.StoreProductSearchView.as_view(), name='store-product-search'),
+    path('<uuid:store_id>/products/import/', views.StoreProductImportView.as_view(), name='store-product-import'),
+    path('<uuid:store_id>/products/<uuid:product_id>/', StoreProductDetailView.as_view(), name='store-product-detail'),
 ]
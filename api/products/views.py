@@ -1,4 +1,7 @@
 
+import csv
+
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 
 from rest_framework.response import Response
@@ -8,13 +11,23 @@ from rest_framework.permissions import IsAuthenticated
 
 import logging
 
-from api.models import Store, Image,Product, Category
+from api.models import Image,Product, Category
 from api.serializers import (ProductSerializer)
+from api.async_views import AsyncAPIView
+from api.conditional import conditional_response, aconditional_response
+from api.permissions import StoreOwnerPermission
+from api.pagination import KeysetPaginator, PagePaginator, InvalidCursor
+from api.utils import sync_images
+from .cache import cached_response, acached_response, versioned_response, aversioned_response, bump_catalog_version
+from .search import search_products, refresh_search_vector
+from .importer import import_products, parse_csv, parse_json, RowError
 
 logger = logging.getLogger(__name__)
 
 class StoreProductView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    # Any signed-in user can browse a store's catalog
+    store_owner_exempt_methods = ('GET',)
 
     def post(self, request, store_id):
         try:
@@ -44,11 +57,10 @@ class StoreProductView(APIView):
             if not category_id:
                 return Response({"detail": "Category id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
             category = get_object_or_404(Category, id=category_id)
 
             product = Product.objects.create(
-                store=store,
+                store_id=store_id,
                 name=name,
                 price=price,
                 quantity=quantity,
@@ -60,6 +72,8 @@ class StoreProductView(APIView):
 
             for image_data in images:
                 Image.objects.create(product=product, url=image_data['url'])
+            refresh_search_vector([product.id])
+            bump_catalog_version(store_id)
 
             serializer = ProductSerializer(product)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -70,46 +84,145 @@ class StoreProductView(APIView):
 
     def get(self, request, store_id):
         try:
-            category_id = request.GET.get('categoryId', None)
+            # Revalidated against the catalog version, so a 304 or a cache hit runs no query
+            return versioned_response(request, store_id, lambda: self.list_products(request, store_id))
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[PRODUCTS_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+    def get_filters(self, request):
+        category_id = request.GET.get('categoryId', None)
+        is_archived = request.GET.get('isArchived', None)
+        filters = {}
+
+        if is_archived is not None:
+            filters['is_archived'] = is_archived.lower() == 'true'
+
+        if category_id:
+            filters['category_id'] = category_id
+
+        return filters
+
+    def list_products(self, request, store_id):
+        # (store, is_archived, category, created_at) serves the filters and the keyset order
+        products = (
+            Product.objects.filter(store_id=store_id, **self.get_filters(request))
+            .select_related('category')
+            .prefetch_related('images')
+        )
+        paginator = KeysetPaginator(request)
+        page = paginator.paginate_queryset(products)
+        serializer = ProductSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class StoreProductSearchView(APIView):
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    store_owner_exempt_methods = ('GET',)
+
+    def get(self, request, store_id):
+        """
+        Ranked full-text search over a store's products.
+
+        Query params:
+            q: The search text (required).
+            categoryId, isArchived: Same filters as the product list.
+            page, pageSize: Page through the ranked results.
+        """
+        try:
+            query = request.GET.get('q', '').strip()
+            if not query:
+                return Response({"detail": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+            products = Product.objects.filter(store_id=store_id)
+
             is_archived = request.GET.get('isArchived', None)
-            
-            store = get_object_or_404(Store, id=store_id)
-            filters = {
-                'store': store,
-                            }
-  
             if is_archived is not None:
-               filters['is_archived'] = is_archived.lower() == 'true'
+                products = products.filter(is_archived=is_archived.lower() == 'true')
+            category_id = request.GET.get('categoryId', None)
+            if category_id:
+                products = products.filter(category_id=category_id)
 
+            products = search_products(products, query).select_related('category').prefetch_related('images')
+            paginator = PagePaginator(request)
+            page = paginator.paginate_queryset(products)
+            serializer = ProductSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
-            if category_id:
-                filters['category_id'] = category_id
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[PRODUCTS_SEARCH] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            
-            products = Product.objects.filter(**filters).order_by('-created_at')
-            serializer = ProductSerializer(products, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+class StoreProductImportView(APIView):
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+
+    def post(self, request, store_id):
+        """
+        Upsert products by SKU from a CSV or JSON upload (multipart `file`) or a
+        JSON body, either a list of products or {"products": [...]}.
+
+        Returns:
+            Response: The import report with created/updated/failed counts and per-row errors.
+        """
+        try:
+            upload = request.FILES.get('file')
+            try:
+                if upload is None:
+                    rows = parse_json(request.data)
+                else:
+                    content = upload.read().decode('utf-8-sig')
+                    is_json = upload.name.lower().endswith('.json') or 'json' in (upload.content_type or '')
+                    rows = parse_json(content) if is_json else parse_csv(content)
+            except (RowError, ValueError, csv.Error) as e:
+                return Response({"detail": f"Could not read the import: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not rows:
+                return Response({"detail": "No products to import"}, status=status.HTTP_400_BAD_REQUEST)
+            if len(rows) > settings.PRODUCT_IMPORT_MAX_ROWS:
+                return Response({"detail": f"At most {settings.PRODUCT_IMPORT_MAX_ROWS} products can be imported at once"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            report = import_products(request.store, rows)
+            return Response(report, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error("[PRODUCTS_GET] %s", e)
+            logger.error("[PRODUCTS_IMPORT] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
+
 class StoreProductDetailView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    store_owner_exempt_methods = ('GET',)
 
     def get(self, request, store_id, product_id):
         try:
             if not product_id:
                 return Response({"detail": "Product id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            product = get_object_or_404(Product, id=product_id, store__id=store_id)
-            serializer = ProductSerializer(product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            products = Product.objects.filter(id=product_id, store_id=store_id)
+            return conditional_response(
+                request,
+                lambda: cached_response(request, store_id, lambda: self.retrieve_product(store_id, product_id)),
+                products,
+                Image.objects.filter(product__in=products),
+                Category.objects.filter(id__in=products.values('category_id')),
+                detail=True,
+            )
 
         except Exception as e:
             logger.error("[PRODUCT_GET] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def retrieve_product(self, store_id, product_id):
+        products = Product.objects.select_related('category').prefetch_related('images')
+        product = get_object_or_404(products, id=product_id, store__id=store_id)
+        serializer = ProductSerializer(product)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     def delete(self, request, store_id, product_id):
         try:
             user = request.user
@@ -119,9 +232,9 @@ class StoreProductDetailView(APIView):
             if not product_id:
                 return Response({"detail": "Product id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            product = get_object_or_404(Product, id=product_id, store=store)
+            product = get_object_or_404(Product, id=product_id, store_id=store_id)
             product.delete()
+            bump_catalog_version(store_id)
 
             return Response({"detail": "Product deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
@@ -140,8 +253,7 @@ class StoreProductDetailView(APIView):
             if not product_id:
                 return Response({"detail": "Product id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            product = get_object_or_404(Product, id=product_id, store=store)
+            product = get_object_or_404(Product, id=product_id, store_id=store_id)
 
             name = data.get('name')
             price = data.get('price')
@@ -175,11 +287,10 @@ class StoreProductDetailView(APIView):
             product.description = description
             product.is_archived = is_archived
             product.save()
+            refresh_search_vector([product.id])
 
-            # Delete existing images and create new ones
-            product.images.all().delete()
-            for image_data in images:
-                Image.objects.create(product=product, url=image_data['url'])
+            sync_images([image_data['url'] for image_data in images], product=product)
+            bump_catalog_version(store_id)
 
             serializer = ProductSerializer(product)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -187,3 +298,64 @@ class StoreProductDetailView(APIView):
         except Exception as e:
             logger.error("[PRODUCT_PATCH] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncStoreProductView(AsyncAPIView):
+    """
+    The product list for ASGI deployments, creating products goes to StoreProductView.
+    """
+    sync_view = StoreProductView
+    store_owner_exempt_methods = ('GET',)
+
+    async def get(self, request, store_id):
+        try:
+            filters = StoreProductView().get_filters(request)
+            return await aversioned_response(request, store_id, lambda: self.list_products(request, store_id, filters))
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[PRODUCTS_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def list_products(self, request, store_id, filters):
+        products = (
+            Product.objects.filter(store_id=store_id, **filters)
+            .select_related('category')
+            .prefetch_related('images')
+        )
+        paginator = KeysetPaginator(request)
+        page = await paginator.apaginate_queryset(products)
+        serializer = ProductSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AsyncStoreProductDetailView(AsyncAPIView):
+    """
+    Product detail for ASGI deployments, updates and deletes go to StoreProductDetailView.
+    """
+    sync_view = StoreProductDetailView
+    store_owner_exempt_methods = ('GET',)
+
+    async def get(self, request, store_id, product_id):
+        try:
+            products = Product.objects.filter(id=product_id, store_id=store_id)
+            return await aconditional_response(
+                request,
+                lambda: acached_response(request, store_id, lambda: self.retrieve_product(store_id, product_id)),
+                products,
+                Image.objects.filter(product__in=products),
+                Category.objects.filter(id__in=products.values('category_id')),
+                detail=True,
+            )
+
+        except Exception as e:
+            logger.error("[PRODUCT_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def retrieve_product(self, store_id, product_id):
+        products = Product.objects.select_related('category').prefetch_related('images')
+        product = await products.filter(id=product_id, store_id=store_id).afirst()
+        if product is None:
+            return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = ProductSerializer(product)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,131 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+
+from rest_framework.renderers import JSONRenderer
+
+from .conditional import is_not_modified
+from .db_router import use_primary
+
+"""
+Two-tier cache for small, rarely written reference tables (categories, counties).
+
+L1 is a dict in each worker process holding the rendered JSON bytes of a
+table together with the version they were built from. L2 is the shared Django
+cache, holding the same bytes under a versioned key plus the current version
+of each table. Writers bump the version in L2; every worker re-reads that
+version at most once per REFDATA_VERSION_CHECK_SECONDS, so in steady state a
+read is a dict lookup, and a write reaches every worker within that interval.
+A worker that sees a new version takes the bytes from L2 and only queries the
+database if no worker has built that version yet. That build reads from the
+primary, since a lagging replica would store an old table under the new version.
+"""
+
+_local = {}
+
+
+class _Entry:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.checked_at = time.monotonic()
+
+
+def version_key(name):
+    return f"refdata:version:{name}"
+
+
+def data_key(name, version):
+    return f"refdata:{name}:{version}"
+
+
+def get_version(name):
+    version = cache.get(version_key(name))
+    if version is None:
+        # Seeded from the clock so an evicted version never repeats an older one
+        cache.add(version_key(name), time.time_ns(), None)
+        version = cache.get(version_key(name))
+    return version
+
+
+def _bump(name):
+    try:
+        cache.incr(version_key(name))
+    except ValueError:
+        cache.add(version_key(name), time.time_ns(), None)
+    _local.pop(name, None)
+
+
+def bump(name):
+    """
+    Invalidate a reference table in every worker. Call it after any write to the table.
+
+    Args:
+        name (str): The table's cache name, e.g. "categories".
+    """
+    _bump(name)
+    transaction.on_commit(partial(_bump, name))
+
+
+def clear():
+    """
+    Drop this process's L1 entries, e.g. between tests.
+    """
+    _local.clear()
+
+
+def get_entry(name, build):
+    """
+    Return the current rendered bytes of a reference table.
+
+    Args:
+        name (str): The table's cache name.
+        build (callable): Returns the table's JSON-serializable data on a miss.
+
+    Returns:
+        _Entry: The entry with `version` and `body`.
+    """
+    entry = _local.get(name)
+    if entry and time.monotonic() - entry.checked_at < settings.REFDATA_VERSION_CHECK_SECONDS:
+        return entry
+
+    version = get_version(name)
+    if entry and entry.version == version:
+        entry.checked_at = time.monotonic()
+        return entry
+
+    body = cache.get(data_key(name, version))
+    if body is None:
+        with use_primary():
+            body = JSONRenderer().render(build())
+        cache.set(data_key(name, version), body, settings.REFDATA_CACHE_TTL)
+
+    entry = _local[name] = _Entry(version, body)
+    return entry
+
+
+def refdata_response(request, name, build):
+    """
+    Serve a reference table from the cache, with an ETag derived from its version.
+
+    Args:
+        request (Request): The incoming request.
+        name (str): The table's cache name.
+        build (callable): Returns the table's JSON-serializable data on a miss.
+
+    Returns:
+        HttpResponse: The JSON bytes, or a 304 when the client's ETag is current.
+    """
+    entry = get_entry(name, build)
+    etag = quote_etag(f"{name}-{entry.version}")
+    if is_not_modified(request, etag, None):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(entry.body, content_type='application/json')
+    response['ETag'] = etag
+    return response
@@ -1,19 +1,25 @@
 from rest_framework import serializers
 from django.shortcuts import get_object_or_404
-from .models import Store, Image, Product, Category, County,Order,OrderItem,Customer
+from .models import Store, Image, Product, Category, County,Order,OrderItem,Customer,StoreDailySales
+from .instrumentation import TimedSerializerMixin
 
-class CustomerSerializer(serializers.ModelSerializer):
+
+class TimedModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    pass
+
+
+class CustomerSerializer(TimedModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(TimedModelSerializer):
     class Meta:
         model = OrderItem
         fields = '__all__'
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)
     customer = CustomerSerializer(read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -39,31 +45,39 @@ class OrderSerializer(serializers.ModelSerializer):
         return order
 
 
-class ImageSerializer(serializers.ModelSerializer):
+class ImageSerializer(TimedModelSerializer):
     class Meta:
         model = Image
         fields = ['id', 'url']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'created_at', 'updated_at']
         
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedModelSerializer):
     images = ImageSerializer(many=True, read_only=True) 
     category = CategorySerializer()  
     class Meta:
         model = Product
-        fields = ['id', 'store', 'category', 'name', 'price', 'quantity', 'rating', 'description', 'is_archived', 'created_at', 'updated_at', 'images']
+        fields = ['id', 'store', 'category', 'sku', 'name', 'price', 'quantity', 'rating', 'description', 'is_archived', 'created_at', 'updated_at', 'images']
 
 
-class CountySerializer(serializers.ModelSerializer):
+class CountySerializer(TimedModelSerializer):
     class Meta:
         model = County
         fields = ['id', 'name', 'description', 'created_at', 'updated_at']
 
-class StoreSerializer(serializers.ModelSerializer):
+class StoreSerializer(TimedModelSerializer):
+    """
+    By default every relation is nested. Pass `expand` to get the summary
+    representation plus only the listed relations, and `fields` to keep only
+    the listed top-level fields (expanded relations are always kept). Callers
+    are responsible for prefetching the relations they expand.
+    """
+    EXPANDABLE_FIELDS = ('products', 'images', 'categories', 'counties')
+
     images = ImageSerializer(many=True, read_only=True)
     products = ProductSerializer(many=True, read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
@@ -73,11 +87,24 @@ class StoreSerializer(serializers.ModelSerializer):
         model = Store
         fields = ['id', 'name', 'description', 'created_at', 'updated_at', 'latitude', 'longitude', 'paybill', 'images', 'products', 'categories', 'counties']
 
+    def __init__(self, *args, expand=None, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            for name in set(self.EXPANDABLE_FIELDS) - set(expand):
+                self.fields.pop(name)
+        if fields:
+            for name in set(self.fields) - set(fields) - set(expand or ()):
+                self.fields.pop(name)
 
 
-class OrderUpdateSerializer(serializers.ModelSerializer):
+
+class OrderUpdateSerializer(TimedModelSerializer):
     class Meta:
         model = Order
         fields = ['is_delivered', 'delivery_date','is_paid']
 
-        
\ No newline at end of file
+
+class StoreDailySalesSerializer(TimedModelSerializer):
+    class Meta:
+        model = StoreDailySales
+        fields = ['date', 'order_count', 'paid_count', 'delivered_count', 'revenue', 'items_sold']
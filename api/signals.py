@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from oidc_provider.models import Client
+
+from . import oidc
+from .authentication import bump_user_version
+from .instrumentation import install_query_recorder
+from .models import Store
+from .permissions import forget_store_owner
+
+"""
+Cache invalidation hooked to model signals, and the request metrics query
+recorder hooked to new database connections. Connected in ApiConfig.ready().
+"""
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store_owner(sender, instance, **kwargs):
+    forget_store_owner(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def invalidate_oidc_client(sender, instance, **kwargs):
+    # Only this process's copy; other workers pick up the change within OIDC_CLIENT_CACHE_SECONDS
+    oidc.clear_client_config()
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    install_query_recorder(connection)
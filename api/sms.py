@@ -0,0 +1,135 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .orders import africastalking_api
+from .utils import SendSMS
+
+"""
+SMS dispatch across the Vonage and Africa's Talking integrations.
+
+Providers are tried in SMS_PROVIDERS order. Each one sits behind a circuit
+breaker whose state lives in the Django cache, so every worker process sees a
+provider trip at the same time. A provider opens after SMS_BREAKER_FAILURES
+failures within SMS_BREAKER_WINDOW seconds, where a call that succeeds but
+takes longer than SMS_LATENCY_BUDGET_MS also counts as a failure. While open
+it is skipped for SMS_BREAKER_COOLDOWN seconds, after which a single probe
+call is let through to decide whether it closes again.
+
+Providers are failed over one after another rather than hedged in parallel:
+an SMS send is not idempotent, so racing two providers would text the
+customer twice.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Africa's Talking recipient status codes for Processed, Sent and Queued
+AFRICASTALKING_SUCCESS_CODES = {100, 101, 102}
+
+
+class SMSDeliveryError(Exception):
+    pass
+
+
+def send_with_vonage(phone, message):
+    return SendSMS().send_message(phone, message)
+
+
+def send_with_africastalking(phone, message):
+    result = africastalking_api.send_sms(phone, message)
+    recipients = result.get('Recipients') or []
+    return any(recipient['statusCode'] in AFRICASTALKING_SUCCESS_CODES for recipient in recipients)
+
+
+PROVIDERS = {
+    'vonage': send_with_vonage,
+    'africastalking': send_with_africastalking,
+}
+
+
+class CircuitBreaker:
+    """
+    Failure counter and open/half-open state for one provider, shared through the cache.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.failures_key = f"sms:breaker:{name}:failures"
+        self.open_key = f"sms:breaker:{name}:open"
+        self.probe_key = f"sms:breaker:{name}:probe"
+
+    def is_open(self):
+        return cache.get(self.open_key) is not None
+
+    def allow(self):
+        """
+        Whether a call may be made now. After the cooldown only one caller across
+        all workers gets the probe slot until it reports back.
+        """
+        if self.is_open():
+            return False
+        if cache.get(self.failures_key, 0) >= settings.SMS_BREAKER_FAILURES:
+            return cache.add(self.probe_key, 1, settings.SMS_BREAKER_COOLDOWN)
+        return True
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.open_key, self.probe_key])
+
+    def record_failure(self):
+        cache.add(self.failures_key, 0, settings.SMS_BREAKER_WINDOW)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # The counter expired between add and incr
+            cache.set(self.failures_key, 1, settings.SMS_BREAKER_WINDOW)
+            failures = 1
+
+        if failures >= settings.SMS_BREAKER_FAILURES:
+            cache.set(self.open_key, 1, settings.SMS_BREAKER_COOLDOWN)
+            cache.delete(self.probe_key)
+            logger.warning("[SMS_BREAKER_OPEN] %s after %s failures", self.name, failures)
+
+
+def dispatch_sms(phone, message):
+    """
+    Send an SMS through the first healthy provider.
+
+    Args:
+        phone (str): The recipient's phone number.
+        message (str): The message to send.
+
+    Returns:
+        str: Name of the provider that accepted the message.
+
+    Raises:
+        SMSDeliveryError: If every provider is open-circuited or fails.
+    """
+    errors = []
+    for name in settings.SMS_PROVIDERS:
+        breaker = CircuitBreaker(name)
+        if not breaker.allow():
+            errors.append(f"{name}: circuit open")
+            continue
+
+        start = time.perf_counter()
+        try:
+            sent = PROVIDERS[name](phone, message)
+        except Exception as e:
+            sent = False
+            errors.append(f"{name}: {e}")
+        else:
+            if not sent:
+                errors.append(f"{name}: rejected")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if sent and elapsed_ms <= settings.SMS_LATENCY_BUDGET_MS:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+        if sent:
+            return name
+        logger.warning("[SMS_FAILOVER] %s failed after %.0fms", name, elapsed_ms)
+
+    raise SMSDeliveryError("; ".join(errors))
@@ -0,0 +1,59 @@
+from functools import reduce
+import operator
+
+from django.conf import settings
+from django.db.models import Q
+
+from api.geo import bounding_box, covering_cells, cell_range, haversine_km
+from api.models import Store
+
+"""
+Radius search over Store coordinates without PostGIS.
+
+The database does the coarse filtering: stores whose geohash lies in one of
+the few cells covering the query's bounding box (range scans on the geohash
+index) and whose coordinates fall inside that box. Only those candidates are
+pulled, as bare (id, latitude, longitude) tuples, and measured exactly with
+the haversine formula.
+"""
+
+
+def cell_filter(cell):
+    start, end = cell_range(cell)
+    if end is None:
+        return Q(geohash__gte=start)
+    return Q(geohash__gte=start, geohash__lt=end)
+
+
+def candidates(latitude, longitude, radius_km):
+    box = bounding_box(latitude, longitude, radius_km)
+    min_lat, max_lat, min_lng, max_lng = box
+    stores = Store.objects.filter(latitude__range=(min_lat, max_lat), longitude__isnull=False)
+    if min_lng is not None:
+        stores = stores.filter(longitude__range=(min_lng, max_lng))
+
+    cells = covering_cells(box, settings.STORE_GEOHASH_PRECISION)
+    if cells:
+        stores = stores.filter(reduce(operator.or_, [cell_filter(cell) for cell in cells]))
+    return stores.values_list('id', 'latitude', 'longitude')
+
+
+def find_nearby(latitude, longitude, radius_km):
+    """
+    Stores within a radius of a point, nearest first.
+
+    Args:
+        latitude (float): Latitude of the point in degrees.
+        longitude (float): Longitude of the point in degrees.
+        radius_km (float): Search radius in kilometres.
+
+    Returns:
+        list: (distance_km, store_id) tuples sorted by distance.
+    """
+    nearby = []
+    for store_id, store_lat, store_lng in candidates(latitude, longitude, radius_km):
+        distance = haversine_km(latitude, longitude, store_lat, store_lng)
+        if distance <= radius_km:
+            nearby.append((distance, store_id))
+    nearby.sort()
+    return nearby
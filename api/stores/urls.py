@@ -1,10 +1,15 @@
 # urls.py
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+# Under ASGI these routes are served by async views, see api/async_views.py
+StoreDetailView = views.AsyncStoreDetailView if settings.SERVER_MODE == 'asgi' else views.StoreDetailView
+
 urlpatterns = [
     path('stores/', views.StoreView.as_view(), name='store-list'),
-    path('stores/<uuid:store_id>/', views.StoreDetailView.as_view(), name='store-detail'),
+    path('stores/nearby/', views.StoreNearbyView.as_view(), name='store-nearby'),
+    path('stores/<uuid:store_id>/', StoreDetailView.as_view(), name='store-detail'),
 ]
@@ -1,6 +1,11 @@
 
+import math
+import uuid
+
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -9,22 +14,151 @@ from rest_framework.permissions import IsAuthenticated
 
 import logging
 
-from api.models import Store, Image, County, Category
+from api.models import Store, Image, County, Category, Product
+from api.utils import sync_images
+from api.async_views import AsyncAPIView
+from api.conditional import conditional_response, aconditional_response
+from api.permissions import StoreOwnerPermission
+from api.pagination import PagePaginator, InvalidCursor
+from api.products.cache import bump_catalog_version
+from .nearby import find_nearby
 from api.serializers import (
     StoreSerializer 
   )
 
 logger = logging.getLogger(__name__)
 
+# Prefetch backing each ?expand= option, so expanding a relation costs one query however many stores are listed
+EXPAND_PREFETCHES = {
+    'products': Prefetch('products', queryset=Product.objects.select_related('category').prefetch_related('images')),
+    'images': Prefetch('images'),
+    'categories': Prefetch('categories'),
+    'counties': Prefetch('counties'),
+}
+
+
+class InvalidQueryParam(ValueError):
+    pass
+
+
+def parse_list_param(request, name, allowed):
+    """
+    Parse a comma separated query parameter such as ?expand=products,images.
+
+    Returns:
+        list: The requested names, or None if the parameter is absent.
+
+    Raises:
+        InvalidQueryParam: If a name is not in `allowed`.
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    names = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = set(names) - set(allowed)
+    if unknown:
+        raise InvalidQueryParam(f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return names
+
+
+def parse_float_param(request, name, minimum, maximum, default=None):
+    """
+    Parse a numeric query parameter within bounds.
+
+    Raises:
+        InvalidQueryParam: If the parameter is missing without a default, not a number or out of bounds.
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        if default is None:
+            raise InvalidQueryParam(f"{name} is required")
+        return float(default)
+    try:
+        number = float(value)
+    except ValueError:
+        raise InvalidQueryParam(f"{name} must be a number")
+    if not math.isfinite(number) or not minimum <= number <= maximum:
+        raise InvalidQueryParam(f"{name} must be between {minimum} and {maximum}")
+    return number
+
+
+def load_by_ids(model, entries):
+    """
+    Fetch the objects referenced by a list of {"id": ...} payload entries in one query.
+
+    Args:
+        model (Model): The model the ids refer to.
+        entries (list): Payload entries, each with an "id" key.
+
+    Returns:
+        tuple: The found objects and a list of the ids that do not exist.
+    """
+    ids, missing = [], []
+    for entry in entries:
+        try:
+            ids.append(uuid.UUID(str(entry['id'])))
+        except (KeyError, TypeError, ValueError):
+            missing.append(str(entry.get('id') if isinstance(entry, dict) else entry))
+
+    found = model.objects.in_bulk(ids)
+    missing += [str(pk) for pk in dict.fromkeys(ids) if pk not in found]
+    return list(found.values()), missing
+
+
+def with_expansions(queryset, expand):
+    return queryset.prefetch_related(*[EXPAND_PREFETCHES[name] for name in expand])
+
+
+def expansion_validators(stores, expand):
+    """
+    Querysets of the related rows nested into a store payload, for its ETag.
+
+    Args:
+        stores (QuerySet): The stores in the response.
+        expand (list): The relations being expanded.
+
+    Returns:
+        list: One queryset per nested relation.
+    """
+    related = []
+    if 'products' in expand:
+        products = Product.objects.filter(store__in=stores)
+        related += [
+            products,
+            Image.objects.filter(product__in=products),
+            Category.objects.filter(id__in=products.values('category_id')),
+        ]
+    if 'images' in expand:
+        related.append(Image.objects.filter(store__in=stores))
+    if 'categories' in expand:
+        related.append(Category.objects.filter(stores__in=stores))
+    if 'counties' in expand:
+        related.append(County.objects.filter(stores__in=stores))
+    return related
+
+
 class StoreView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
             user = request.user
+            # Lists default to the summary representation, relations are opt-in with ?expand=
+            expand = parse_list_param(request, 'expand', StoreSerializer.EXPANDABLE_FIELDS) or []
+            fields = parse_list_param(request, 'fields', StoreSerializer.Meta.fields)
+
             stores = Store.objects.filter(user=user)
-            serializer = StoreSerializer(stores, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional_response(
+                request,
+                lambda: Response(
+                    StoreSerializer(with_expansions(stores, expand), many=True, expand=expand, fields=fields).data,
+                    status=status.HTTP_200_OK,
+                ),
+                stores,
+                *expansion_validators(stores, expand),
+            )
+        except InvalidQueryParam as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error("[STORES_GET] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -48,15 +182,61 @@ class StoreView(APIView):
             logger.error("[STORES_POST] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)   
 
-class StoreDetailView(APIView):
+class StoreNearbyView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def get(self, request):
+        """
+        Stores within ?radius= km of ?lat=/?lng=, nearest first, each with its
+        `distance` in km. Supports ?expand=, ?fields=, ?page= and ?pageSize=.
+        """
+        try:
+            latitude = parse_float_param(request, 'lat', -90, 90)
+            longitude = parse_float_param(request, 'lng', -180, 180)
+            radius = parse_float_param(request, 'radius', 0, settings.NEARBY_MAX_RADIUS_KM, settings.NEARBY_DEFAULT_RADIUS_KM)
+            expand = parse_list_param(request, 'expand', StoreSerializer.EXPANDABLE_FIELDS) or []
+            fields = parse_list_param(request, 'fields', StoreSerializer.Meta.fields)
+
+            paginator = PagePaginator(request)
+            page = paginator.paginate_queryset(find_nearby(latitude, longitude, radius))
+            stores = with_expansions(Store.objects.all(), expand).in_bulk([store_id for _, store_id in page])
+
+            data = []
+            for distance, store_id in page:
+                store = StoreSerializer(stores[store_id], expand=expand, fields=fields).data
+                store['distance'] = round(distance, 3)
+                data.append(store)
+            return paginator.get_paginated_response(data)
+        except (InvalidQueryParam, InvalidCursor) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[STORES_NEARBY_GET] %s", e)
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class StoreDetailView(APIView):
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+
     def get(self, request, store_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-            serializer = StoreSerializer(store)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # The detail view stays fully expanded unless ?expand= narrows it
+            expand = parse_list_param(request, 'expand', StoreSerializer.EXPANDABLE_FIELDS)
+            fields = parse_list_param(request, 'fields', StoreSerializer.Meta.fields)
+
+            expanded = StoreSerializer.EXPANDABLE_FIELDS if expand is None else expand
+            stores = Store.objects.filter(id=store_id)
+            return conditional_response(
+                request,
+                lambda: Response(
+                    StoreSerializer(get_object_or_404(with_expansions(stores, expanded)), expand=expand, fields=fields).data,
+                    status=status.HTTP_200_OK,
+                ),
+                stores,
+                *expansion_validators(stores, expanded),
+                detail=True,
+            )
+        except InvalidQueryParam as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error("[SPECIFIC_STORE_GET] %s", str(e))
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -80,7 +260,7 @@ class StoreDetailView(APIView):
             if not name:
                 return Response({"detail": "Name is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
+            store = request.store
 
             update_data = {
                 'name': name,
@@ -94,37 +274,34 @@ class StoreDetailView(APIView):
             if longitude is not None:
                 update_data['longitude'] = longitude
 
+            # Resolve every category and county up front so a bad id fails the whole patch
+            category_objects = county_objects = None
+            if categories:
+                category_objects, missing = load_by_ids(Category, categories)
+                if missing:
+                    logger.error("Categories not found with ids %s", missing)
+                    return Response({"detail": f"Category not found with id {', '.join(missing)}", "missing": missing},
+                                    status=status.HTTP_404_NOT_FOUND)
+            if counties:
+                county_objects, missing = load_by_ids(County, counties)
+                if missing:
+                    logger.error("Counties not found with ids %s", missing)
+                    return Response({"detail": f"County not found with id {', '.join(missing)}", "missing": missing},
+                                    status=status.HTTP_404_NOT_FOUND)
+
             serializer = StoreSerializer(store, data=update_data, partial=True)
             if serializer.is_valid():
-                serializer.save()
-
-                # Handle images separately
-                store.images.all().delete()
-                for image_data in images:
-                    Image.objects.create(store=store, **image_data)
-
-                # Handle categories and counties separately
-                if categories:
-                    try:
-                        store.categories.clear()  # Disconnect all existing categories
-                        for category_data in categories:
-                            category = get_object_or_404(Category, id=category_data['id'])
-                            store.categories.add(category)
-                    except Http404 as e:
-                        logger.error("Category not found with id %s", category_data['id'])
-                        return Response({"detail": f"Category not found with id {category_data['id']}"},
-                                        status=status.HTTP_404_NOT_FOUND)
-
-                if counties:
-                    try:
-                        store.counties.clear()  # Disconnect all existing counties
-                        for county_data in counties:
-                            county = get_object_or_404(County, id=county_data['id'])
-                            store.counties.add(county)
-                    except Http404 as e:
-                        logger.error("County not found with id %s", county_data['id'])
-                        return Response({"detail": f"County not found with id {county_data['id']}"},
-                                        status=status.HTTP_404_NOT_FOUND)
+                with transaction.atomic():
+                    serializer.save()
+
+                    # Handle images separately
+                    sync_images([image_data['url'] for image_data in images], store=store)
+
+                    # set() only writes the through-table rows that changed
+                    if category_objects is not None:
+                        store.categories.set(category_objects)
+                    if county_objects is not None:
+                        store.counties.set(county_objects)
 
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -134,10 +311,45 @@ class StoreDetailView(APIView):
     
     def delete(self, request, store_id):
         try:
-            user = request.user
-            store = get_object_or_404(Store, id=store_id, user=user)
-            store.delete()
+            with transaction.atomic():
+                request.store.delete()
+                # Drop the cached catalog now and again once the delete is visible
+                bump_catalog_version(store_id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             logger.error("[STORE_DELETE] %s", str(e))
-            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncStoreDetailView(AsyncAPIView):
+    """
+    Store detail for ASGI deployments, updates and deletes go to StoreDetailView.
+    """
+    sync_view = StoreDetailView
+
+    async def get(self, request, store_id):
+        try:
+            # The detail view stays fully expanded unless ?expand= narrows it
+            expand = parse_list_param(request, 'expand', StoreSerializer.EXPANDABLE_FIELDS)
+            fields = parse_list_param(request, 'fields', StoreSerializer.Meta.fields)
+
+            expanded = StoreSerializer.EXPANDABLE_FIELDS if expand is None else expand
+            stores = Store.objects.filter(id=store_id)
+            return await aconditional_response(
+                request,
+                lambda: self.retrieve_store(stores, expanded, expand, fields),
+                stores,
+                *expansion_validators(stores, expanded),
+                detail=True,
+            )
+        except InvalidQueryParam as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("[SPECIFIC_STORE_GET] %s", str(e))
+            return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def retrieve_store(self, stores, expanded, expand, fields):
+        store = await with_expansions(stores, expanded).afirst()
+        if store is None:
+            return Response({"detail": "Store not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StoreSerializer(store, expand=expand, fields=fields).data, status=status.HTTP_200_OK)
@@ -0,0 +1,130 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import User, Store, Product, Image, Category, Customer, Order
+from api.orders.views import AsyncOrderView
+from api.products.views import AsyncStoreProductView, AsyncStoreProductDetailView
+from api.stores.views import AsyncStoreDetailView
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with products and orders, and bearer tokens for its owner and another user.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.other_user = User.objects.create_user(username='otheruser', password='password')
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        for i in range(3):
+            product = Product.objects.create(store=self.store, category=self.category, name=f'Product {i}',
+                                             price=1, quantity=5, rating=5, description='Description')
+            Image.objects.create(product=product, url='https://example.com/product.png')
+        self.product = product
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer', email='customer@example.com')
+        for _ in range(2):
+            Order.objects.create(store=self.store, customer=self.customer)
+
+        self.token = f'Bearer {AccessToken.for_user(self.user)}'
+        self.other_token = f'Bearer {AccessToken.for_user(self.other_user)}'
+        self.factory = AsyncRequestFactory()
+        self.client.credentials(HTTP_AUTHORIZATION=self.token)
+
+    async def call(self, view, url, method='get', token=None, headers=None, data=None, **kwargs):
+        headers = {'Authorization': token or self.token, **(headers or {})}
+        if method == 'post':
+            request = self.factory.post(url, data, content_type='application/json', headers=headers)
+        else:
+            request = self.factory.get(url, headers=headers)
+        return await view.as_view()(request, **kwargs)
+
+    async def assert_same_as_sync(self, view, url_name, **kwargs):
+        url = reverse(url_name, kwargs={key: str(value) for key, value in kwargs.items()})
+        expected = await self.get_from_sync_view(url)
+        response = await self.call(view, url, **kwargs)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), expected)
+        self.assertTrue(response.has_header('ETag'))
+
+    async def get_from_sync_view(self, url):
+        response = await sync_to_async(self.client.get)(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    async def test_product_list_matches_sync_view(self):
+        """
+        The async product list answers with the same body as the sync view.
+        """
+        await self.assert_same_as_sync(AsyncStoreProductView, 'store-products', store_id=self.store.id)
+
+    async def test_product_detail_matches_sync_view(self):
+        """
+        The async product detail answers with the same body as the sync view.
+        """
+        await self.assert_same_as_sync(AsyncStoreProductDetailView, 'store-product-detail',
+                                       store_id=self.store.id, product_id=self.product.id)
+
+    async def test_store_detail_matches_sync_view(self):
+        """
+        The async store detail answers with the same body as the sync view.
+        """
+        await self.assert_same_as_sync(AsyncStoreDetailView, 'store-detail', store_id=self.store.id)
+
+    async def test_order_list_matches_sync_view(self):
+        """
+        The async order list answers with the same body as the sync view.
+        """
+        await self.assert_same_as_sync(AsyncOrderView, 'orders', store_id=self.store.id)
+
+    async def test_unchanged_list_answers_not_modified(self):
+        """
+        A request carrying the current ETag gets a 304 from the async view.
+        """
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        etag = (await self.call(AsyncOrderView, url, store_id=self.store.id))['ETag']
+        response = await self.call(AsyncOrderView, url, store_id=self.store.id, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_missing_token_is_rejected(self):
+        """
+        A request without credentials gets a 401 with a bearer challenge.
+        """
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        response = await AsyncOrderView.as_view()(self.factory.get(url), store_id=self.store.id)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response['WWW-Authenticate'].startswith('Bearer'))
+
+    async def test_other_users_store_is_not_found(self):
+        """
+        Someone else's orders answer 404, while their public product list stays readable.
+        """
+        orders_url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        response = await self.call(AsyncOrderView, orders_url, token=self.other_token, store_id=self.store.id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        products_url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+        response = await self.call(AsyncStoreProductView, products_url, token=self.other_token, store_id=self.store.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_order_create_falls_back_to_sync_view(self):
+        """
+        Placing an order goes through the sync view and its transaction.
+        """
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        data = {
+            'customerId': str(self.customer.id),
+            'phone': '0700000000',
+            'address': 'Nairobi',
+            'orderItems': [{'product': str(self.product.id), 'quantity': 1, 'price': 1}],
+        }
+        response = await self.call(AsyncOrderView, url, method='post', data=data, store_id=self.store.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Order.objects.filter(store=self.store).acount(), 3)
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import refcache
+from api.models import User, Store
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a user with a store and a bearer token, on an endpoint served from the reference cache.
+        """
+        cache.clear()
+        refcache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.url = reverse('counties', kwargs={'store_id': str(self.store.id)})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_is_loaded_once(self):
+        """
+        The first request loads the user, later requests authenticate without a query.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    def test_deactivation_takes_effect_immediately(self):
+        """
+        Deactivating a cached user rejects their token on the next request.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saving_the_user_refreshes_the_cache(self):
+        """
+        A saved user is reloaded, so requests see their current fields.
+        """
+        self.client.get(self.url)
+        self.user.first_name = 'Jane'
+        self.user.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertEqual(len(queries), 1)
+
+    def test_deleted_user_is_rejected(self):
+        """
+        Deleting a cached user rejects their token on the next request.
+        """
+        self.client.get(self.url)
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Order, OrderItem, Category
+
+
+class OrderCheckoutTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a customer and a handful of products.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer', email='customer@example.com')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.products = [
+            Product.objects.create(store=self.store, category=self.category, name=f'Product {i}', price=10, quantity=10, rating=5, description='Description')
+            for i in range(5)
+        ]
+        self.url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+
+    def post_order(self, products):
+        data = {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(p.id), 'quantity': 2, 'price': 20} for p in products],
+            'phone': '1234567890',
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, len(queries)
+
+    def test_query_count_is_independent_of_basket_size(self):
+        """
+        One item and five items cost the same number of queries.
+        """
+        self.post_order(self.products[:1])  # creates today's sales rollup row
+        _, single = self.post_order(self.products[:1])
+        _, many = self.post_order(self.products)
+        self.assertEqual(single, many)
+
+    def test_total_is_written_with_the_order(self):
+        """
+        The total is the sum of the item prices and is returned in the response.
+        """
+        response, _ = self.post_order(self.products[:3])
+        order = Order.objects.get(id=response.data['id'])
+        self.assertEqual(order.total_price, Decimal('60.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 3)
+
+    def test_product_from_another_store_rolls_back(self):
+        """
+        Items referencing a product outside the store fail without leaving a partial order.
+        """
+        other_store = Store.objects.create(user=self.user, name='Other Store')
+        foreign = Product.objects.create(store=other_store, category=self.category, name='Foreign', price=1, quantity=1, rating=1, description='Description')
+        data = {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(self.products[0].id), 'quantity': 1, 'price': 10},
+                           {'product': str(foreign.id), 'quantity': 1, 'price': 1}],
+        }
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn(str(foreign.id), response.data['detail'])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_malformed_orders_are_rejected(self):
+        """
+        Bad quantities, product ids, prices, item lists and customer ids answer 400 and write nothing.
+        """
+        product = str(self.products[0].id)
+        cases = [
+            [{'product': product, 'quantity': 0, 'price': 10}],
+            [{'product': product, 'quantity': 'abc', 'price': 10}],
+            [{'product': 'not-a-uuid', 'quantity': 1, 'price': 10}],
+            [{'product': product, 'quantity': 1, 'price': 'ten'}],
+            None,
+        ]
+        for order_items in cases:
+            with self.subTest(order_items=order_items):
+                data = {'customerId': str(self.customer.id), 'orderItems': order_items}
+                response = self.client.post(self.url, data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('detail', response.data)
+
+        data = {'customerId': 'nobody', 'orderItems': [{'product': product, 'quantity': 1, 'price': 10}]}
+        self.assertEqual(self.client.post(self.url, data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(id=product).quantity, 10)
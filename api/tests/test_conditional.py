@@ -0,0 +1,148 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Product, Image, Category, County, Customer, Order
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a product, an order and a county.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.county = County.objects.create(name='Nairobi', description='Nairobi county')
+        self.store.categories.add(self.category)
+        self.store.counties.add(self.county)
+        self.product = Product.objects.create(store=self.store, category=self.category, name='Cone', price=1,
+                                              quantity=5, rating=5, description='Description')
+        self.image = Image.objects.create(product=self.product, url='https://example.com/a.png')
+        customer = Customer.objects.create(store=self.store, first_name='Test Customer')
+        self.order = Order.objects.create(store=self.store, customer=customer)
+
+    def assertRevalidates(self, url, queries=1):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        if queries:
+            self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as captured:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(len(captured), queries)
+        return response['ETag']
+
+    def test_every_read_endpoint_revalidates(self):
+        """
+        Detail and list views answer 304 with at most one query when the ETag still matches.
+        """
+        store_id = str(self.store.id)
+        for url in [
+            reverse('store-list'),
+            reverse('store-detail', kwargs={'store_id': store_id}),
+            reverse('store-product-detail', kwargs={'store_id': store_id, 'product_id': str(self.product.id)}),
+            reverse('orders', kwargs={'store_id': store_id}),
+            reverse('order-update', kwargs={'store_id': store_id, 'order_id': str(self.order.id)}),
+            reverse('store-detail-categories', kwargs={'store_id': store_id, 'category_id': str(self.category.id)}),
+            reverse('county-detail', kwargs={'store_id': store_id, 'county_id': str(self.county.id)}),
+        ]:
+            with self.subTest(url=url):
+                self.assertRevalidates(url)
+
+        # Reference and product lists revalidate against the cached version without touching the database
+        for url in [
+            reverse('store-products', kwargs={'store_id': store_id}),
+            reverse('store-categories', kwargs={'store_id': store_id}),
+            reverse('counties', kwargs={'store_id': store_id}),
+        ]:
+            with self.subTest(url=url):
+                self.assertRevalidates(url, queries=0)
+
+    def test_nested_changes_change_the_etag(self):
+        """
+        Editing or deleting a nested row invalidates the parent's ETag.
+        """
+        url = reverse('store-detail', kwargs={'store_id': str(self.store.id)})
+        etag = self.assertRevalidates(url)
+
+        self.image.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get(url)['ETag']
+        self.category.name = 'Sorbets'
+        self.category.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """
+        If-Modified-Since is honoured when no ETag is sent.
+        """
+        url = reverse('store-product-detail', kwargs={'store_id': str(self.store.id), 'product_id': str(self.product.id)})
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, status.HTTP_200_OK)
+
+    def test_query_string_is_part_of_the_etag(self):
+        """
+        Different representations of the same rows get different ETags.
+        """
+        url = reverse('store-list')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'expand': 'products'})['ETag'])
+
+    def test_product_list_etag_follows_the_catalog_version(self):
+        """
+        A product write changes the product list's ETag.
+        """
+        url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+        etag = self.assertRevalidates(url, queries=0)
+
+        response = self.client.patch(reverse('store-product-detail', kwargs={'store_id': str(self.store.id), 'product_id': str(self.product.id)}),
+                                     {'name': 'Sorbet', 'price': 2, 'quantity': 5, 'rating': 5, 'description': 'Description',
+                                      'categoryId': str(self.category.id), 'images': [{'url': self.image.url}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['name'], 'Sorbet')
+
+    def test_order_list_etag_covers_only_its_page(self):
+        """
+        An order list page's ETag changes with the orders on it, not with older orders further down.
+        """
+        older = self.order
+        newer = [Order.objects.create(store=self.store, customer=older.customer) for _ in range(2)]
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        params = {'pageSize': 1}
+
+        etag = self.client.get(url, params)['ETag']
+        older.is_paid = True
+        older.save()
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Deleting the page's order moves the next one into the page
+        newer[-1].delete()
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_order_etags_follow_the_customer(self):
+        """
+        Editing a customer changes the ETags of the order list and detail that embed it.
+        """
+        list_url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        detail_url = reverse('order-update', kwargs={'store_id': str(self.store.id), 'order_id': str(self.order.id)})
+        etags = {url: self.client.get(url)['ETag'] for url in (list_url, detail_url)}
+
+        customer_url = reverse('customer-detail', kwargs={'store_id': str(self.store.id), 'customer_id': str(self.order.customer_id)})
+        response = self.client.patch(customer_url, {'first_name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['customer']['first_name'], 'Renamed')
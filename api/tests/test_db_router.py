@@ -0,0 +1,247 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import db_router, refcache
+from api.models import User, Store, Product
+from api.products.cache import cached_response
+
+
+def read_alias(request, write=False, user_id=None):
+    """
+    Run a request through ReplicaMiddleware and return where its reads went, and the response.
+    """
+    seen = {}
+
+    def view(request):
+        if user_id is not None:
+            db_router.identify(user_id)
+        if write:
+            router.db_for_write(Product)
+        seen['alias'] = router.db_for_read(Product)
+        return HttpResponse()
+
+    response = db_router.ReplicaMiddleware(view)(request)
+    return seen['alias'], response
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        """
+        Treat every replica as healthy unless a test says otherwise.
+        """
+        cache.clear()
+        self.factory = RequestFactory()
+        patcher = patch.object(db_router, 'is_healthy', return_value=True)
+        self.is_healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_safe_requests_read_from_a_replica(self):
+        """
+        GETs read from a replica, writes and code outside requests use the primary.
+        """
+        alias, _ = read_alias(self.factory.get('/'))
+        self.assertIn(alias, settings.DATABASE_REPLICAS)
+        self.assertEqual(read_alias(self.factory.post('/'))[0], 'default')
+        self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertEqual(router.db_for_write(Product), 'default')
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        """
+        A write pins its user, whose later reads go to the primary while other users keep the replicas.
+        """
+        self.assertIn(read_alias(self.factory.get('/'), user_id=1)[0], settings.DATABASE_REPLICAS)
+
+        alias, response = read_alias(self.factory.get('/'), write=True, user_id=1)
+        self.assertEqual(alias, 'default')
+        self.assertFalse(response.cookies)
+
+        self.assertEqual(read_alias(self.factory.get('/'), user_id=1)[0], 'default')
+        self.assertIn(read_alias(self.factory.get('/'), user_id=2)[0], settings.DATABASE_REPLICAS)
+        self.assertIn(read_alias(self.factory.get('/'))[0], settings.DATABASE_REPLICAS)
+
+    def test_anonymous_writes_pin_nobody(self):
+        """
+        Without an authenticated user a write leaves no pin behind.
+        """
+        read_alias(self.factory.post('/'), write=True)
+        self.assertIn(read_alias(self.factory.get('/'), user_id=1)[0], settings.DATABASE_REPLICAS)
+
+    def test_writes_pin_the_request_user(self):
+        """
+        A write by a user another authentication class put on the request pins that user.
+        """
+        request = self.factory.post('/')
+        request.user = User(pk=3)
+        read_alias(request, write=True)
+        self.assertEqual(read_alias(self.factory.get('/'), user_id=3)[0], 'default')
+
+    def test_unhealthy_replicas_are_skipped(self):
+        """
+        Reads avoid unhealthy replicas and fall back to the primary when none is left.
+        """
+        self.is_healthy.side_effect = lambda alias: alias == 'replica_2'
+        self.assertEqual(read_alias(self.factory.get('/'))[0], 'replica_2')
+
+        self.is_healthy.side_effect = lambda alias: False
+        self.assertEqual(read_alias(self.factory.get('/'))[0], 'default')
+
+    def test_use_primary(self):
+        """
+        use_primary() sends a safe request's reads to the primary while it is active.
+        """
+        def view(request):
+            with db_router.use_primary():
+                inside = router.db_for_read(Product)
+            return HttpResponse(f"{inside},{router.db_for_read(Product)}")
+
+        inside, after = db_router.ReplicaMiddleware(view)(self.factory.get('/')).content.decode().split(',')
+        self.assertEqual(inside, 'default')
+        self.assertIn(after, settings.DATABASE_REPLICAS)
+
+    def test_cached_builds_read_from_the_primary(self):
+        """
+        Responses built to fill a shared cache read from the primary, the rest of the request from a replica.
+        """
+        refcache.clear()
+        self.addCleanup(refcache.clear)
+
+        def view(request):
+            seen = []
+
+            def build():
+                seen.append(router.db_for_read(Product))
+                return Response({})
+
+            cached_response(Request(request), 'store', build)
+            refcache.get_entry('replica-test', lambda: seen.append(router.db_for_read(Product)) or [])
+            seen.append(router.db_for_read(Product))
+            return HttpResponse(','.join(seen))
+
+        catalog, refdata, after = db_router.ReplicaMiddleware(view)(self.factory.get('/')).content.decode().split(',')
+        self.assertEqual((catalog, refdata), ('default', 'default'))
+        self.assertIn(after, settings.DATABASE_REPLICAS)
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaPinTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store whose owner calls the API with a bearer token and no cookies,
+        with the primary standing in for a replica.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.url = reverse('store-detail', kwargs={'store_id': str(self.store.id)})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        patcher = patch.object(db_router, 'choose_replica', return_value='default')
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bearer_writes_pin_reads_to_the_primary(self):
+        """
+        After a PATCH the same user's GETs skip the replicas, without relying on a cookie.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.choose_replica.call_count, 1)
+
+        response = self.client.patch(self.url, {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.cookies)
+        self.client.cookies.clear()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertEqual(self.choose_replica.call_count, 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class SessionReplicaPinTests(TransactionTestCase):
+    def setUp(self):
+        """
+        Add a replica_1 alias, a second connection to the test database, and log a
+        store owner in with a session.
+        """
+        cache.clear()
+        db_router.reset_health()
+        connections.settings['replica_1'] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        self.addCleanup(self.remove_replica)
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.url = reverse('store-detail', kwargs={'store_id': str(self.store.id)})
+        self.client.force_login(self.user)
+
+    def remove_replica(self):
+        connections['replica_1'].close()
+        del connections['replica_1']
+        del connections.settings['replica_1']
+        db_router.reset_health()
+
+    def get(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(primary), len(replica)
+
+    def test_session_writes_pin_reads_to_the_primary(self):
+        """
+        A session user's GET reads from the replica until they write, then from the primary.
+        """
+        _, primary, replica = self.get()
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+        response = self.client.patch(self.url, {'name': 'Renamed'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response, primary, replica = self.get()
+        self.assertEqual(response.data['name'], 'Renamed')
+        self.assertGreater(primary, 0)
+        # Only the session itself is read before the user is known
+        self.assertLessEqual(replica, 1)
+
+
+class ReplicaHealthTests(TestCase):
+    def setUp(self):
+        """
+        Start every test without cached health results.
+        """
+        db_router.reset_health()
+
+    def test_lag_and_availability(self):
+        """
+        A reachable replica within the lag budget is healthy, a lagging or missing one is not.
+        """
+        self.assertTrue(db_router.is_healthy('default'))
+
+        with override_settings(REPLICA_MAX_LAG_SECONDS=5), patch.object(db_router, 'replica_lag', return_value=10.0):
+            db_router.reset_health()
+            self.assertFalse(db_router.is_healthy('default'))
+
+        self.assertFalse(db_router.is_healthy('missing'))
+        with override_settings(DATABASE_REPLICAS=['missing']):
+            self.assertEqual(db_router.choose_replica(), 'default')
+
+    def test_health_is_cached(self):
+        """
+        Each worker checks a replica at most once per REPLICA_HEALTH_CHECK_SECONDS.
+        """
+        with patch.object(db_router, 'replica_lag', return_value=0.0) as lag:
+            db_router.is_healthy('default')
+            db_router.is_healthy('default')
+        self.assertEqual(lag.call_count, 1)
@@ -0,0 +1,62 @@
+import csv
+import gzip
+import io
+import json
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Order
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a few customers and orders.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test', last_name='Customer', email='customer@example.com')
+        for _ in range(3):
+            Order.objects.create(store=self.store, customer=self.customer, total_price=10)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body.decode()
+
+    def test_orders_ndjson(self):
+        """
+        Orders stream as one flat JSON object per line.
+        """
+        url = reverse('export-orders', kwargs={'store_id': str(self.store.id)})
+        lines = self.read(self.client.get(url)).splitlines()
+        self.assertEqual(len(lines), 3)
+        row = json.loads(lines[0])
+        self.assertEqual(row['customer_email'], 'customer@example.com')
+        self.assertEqual(row['total_price'], '10.00')
+        self.assertIs(row['is_cancelled'], False)
+
+    def test_customers_csv_gzip(self):
+        """
+        CSV output is gzipped while streaming when the client accepts it.
+        """
+        url = reverse('export-customers', kwargs={'store_id': str(self.store.id)})
+        response = self.client.get(url, {'output': 'csv'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0], ['id', 'first_name', 'last_name', 'email', 'phone_number'])
+        self.assertEqual(rows[1][1:4], ['Test', 'Customer', 'customer@example.com'])
+
+    def test_unknown_output(self):
+        """
+        Only NDJSON and CSV are offered.
+        """
+        url = reverse('export-products', kwargs={'store_id': str(self.store.id)})
+        response = self.client.get(url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,122 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import outbound
+from api.instrumentation import RequestMetricsMiddleware, query_shape
+from api.models import User, Store, Product, Category
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1, REQUEST_METRICS_N_PLUS_ONE_THRESHOLD=5, REQUEST_METRICS_SERVER_TIMING=True)
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a few products.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        for i in range(6):
+            Product.objects.create(store=self.store, category=category, name=f'Product {i}',
+                                   price=1, quantity=1, rating=5, description='Description')
+        self.url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+        self.factory = RequestFactory()
+
+    def timings(self, response):
+        return {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+
+    def test_response_carries_server_timing(self):
+        """
+        A sampled response reports its total, database, serializer and outbound time.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'total', 'db', 'serializer', 'outbound'})
+        self.assertIn(f'desc="{len(queries)} queries"', timings['db'])
+
+    def test_metrics_are_logged_by_route(self):
+        """
+        Each sampled request logs one JSON record keyed by its URL route.
+        """
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            self.client.get(self.url)
+
+        record = json.loads(logs.records[-1].getMessage().split(' ', 1)[1])
+        self.assertEqual(record['route'], 'api/<uuid:store_id>/products/')
+        self.assertEqual(record['status'], status.HTTP_200_OK)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertEqual(record['repeated_queries'], 0)
+
+    def test_repeated_queries_are_flagged(self):
+        """
+        Loading related rows one by one is logged as a likely N+1.
+        """
+        def view(request):
+            for product in Product.objects.all():
+                product.category.name
+            return HttpResponse()
+
+        with self.assertLogs('api.instrumentation', 'WARNING') as logs:
+            RequestMetricsMiddleware(view)(self.factory.get('/'))
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('ran 6 times', logs.records[0].getMessage())
+        self.assertIn('api_category', logs.records[0].getMessage())
+
+    def test_outbound_calls_are_counted(self):
+        """
+        Provider calls made through outbound.track add to the request's outbound time.
+        """
+        def view(request):
+            with outbound.track('google'):
+                pass
+            return HttpResponse()
+
+        response = RequestMetricsMiddleware(view)(self.factory.get('/'))
+        self.assertIn('desc="1 calls"', self.timings(response)['outbound'])
+
+    def test_streamed_queries_are_counted_when_the_stream_ends(self):
+        """
+        Queries run while a streaming body is produced are logged once the stream is exhausted.
+        """
+        def view(request):
+            return StreamingHttpResponse(product.name for product in Product.objects.iterator(chunk_size=2))
+
+        response = RequestMetricsMiddleware(view)(self.factory.get('/'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            self.assertEqual(len(list(response)), 6)
+
+        record = logs.records[-1].request_metrics
+        self.assertTrue(record['streaming'])
+        self.assertGreater(record['db_queries'], 0)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        """
+        With sampling off responses carry no Server-Timing header.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_in_lists_share_a_shape(self):
+        """
+        Queries that differ only in the length of an IN list have the same shape.
+        """
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s)'),
+            query_shape('SELECT *  FROM t\nWHERE id IN (%s, %s, %s)'),
+        )
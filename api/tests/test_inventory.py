@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Order, Category
+from api.orders.inventory import reserve_stock, InsufficientStock
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a customer and two products with little stock.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer')
+        category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.plenty = Product.objects.create(store=self.store, category=category, name='Plenty', price=1, quantity=10, rating=5, description='Description')
+        self.scarce = Product.objects.create(store=self.store, category=category, name='Scarce', price=1, quantity=2, rating=5, description='Description')
+        self.url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+
+    def stock(self, product):
+        return Product.objects.get(id=product.id).quantity
+
+    def test_reservation_is_one_statement(self):
+        """
+        The whole basket is decremented with a single UPDATE.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            reserve_stock({self.plenty.id: 3, self.scarce.id: 2})
+        self.assertEqual(sum(1 for q in queries if q['sql'].startswith('UPDATE')), 1)
+        self.assertEqual(self.stock(self.plenty), 7)
+        self.assertEqual(self.stock(self.scarce), 0)
+
+    def test_short_line_rolls_back_every_line(self):
+        """
+        When one product is short nothing is decremented and the short product is named.
+        """
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock({self.plenty.id: 3, self.scarce.id: 3})
+        self.assertEqual(raised.exception.product_ids, [str(self.scarce.id)])
+        self.assertEqual(self.stock(self.plenty), 10)
+        self.assertEqual(self.stock(self.scarce), 2)
+
+    def test_checkout_conflict_and_cancel(self):
+        """
+        Checkout decrements stock, an oversold basket is refused and cancelling restores stock once.
+        """
+        data = {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(self.scarce.id), 'quantity': 1, 'price': 1},
+                           {'product': str(self.scarce.id), 'quantity': 1, 'price': 1}],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stock(self.scarce), 0)
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 1)
+
+        order = Order.objects.get()
+        url = reverse('order-update', kwargs={'store_id': str(self.store.id), 'order_id': str(order.id)})
+        self.client.patch(url, {'is_cancelled': True}, format='json')
+        self.client.patch(url, {'is_cancelled': True}, format='json')
+        self.assertEqual(self.stock(self.scarce), 2)
+        self.assertTrue(Order.objects.get().is_cancelled)
+
+        response = self.client.patch(url, {'is_cancelled': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_skips_only_short_orders(self):
+        """
+        In a batch, orders that do not fit in stock are reported and the rest are created.
+        """
+        order = {'customerId': str(self.customer.id), 'orderItems': [{'product': str(self.scarce.id), 'quantity': 1}]}
+        url = reverse('orders-batch', kwargs={'store_id': str(self.store.id)})
+
+        response = self.client.post(url, [order, order, order], format='json')
+
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'created', 'error'])
+        self.assertEqual(self.stock(self.scarce), 0)
@@ -0,0 +1,128 @@
+import json
+import time
+from unittest.mock import patch, Mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from oidc_provider.models import Client
+
+from api import oidc
+from api.models import User
+from api.views import AsyncGoogleCallbackView
+
+TOKEN_ENDPOINT = 'https://oauth2.example.com/token'
+JWKS_ENDPOINT = 'https://oauth2.example.com/certs'
+
+
+def make_key(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    jwk.update(kid=kid, alg='RS256', use='sig')
+    return key, jwk
+
+
+@override_settings(
+    OIDC_CLIENT_ID='glace-client',
+    OIDC_TOKEN_ENDPOINT=TOKEN_ENDPOINT,
+    OIDC_JWKS_ENDPOINT=JWKS_ENDPOINT,
+)
+class GoogleLoginTests(TestCase):
+    def setUp(self):
+        """
+        Set up a Google signing key and start from empty per-process caches.
+        """
+        oidc.clear_jwks()
+        oidc.clear_client_config()
+        self.key, jwk = make_key('key-1')
+        self.jwks = {'keys': [jwk]}
+
+    def id_token(self, key=None, kid='key-1', **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'glace-client', 'sub': 'google-123',
+            'iat': now, 'exp': now + 3600,
+            'email': 'jane@example.com', 'given_name': 'Jane', 'family_name': 'Doe',
+        }
+        payload.update(claims)
+        return jwt.encode(payload, key or self.key, algorithm='RS256', headers={'kid': kid})
+
+    def google(self, id_token):
+        """
+        A stand-in for outbound.request answering the token and JWKS endpoints.
+        """
+        def request(provider, method, url, **kwargs):
+            body = {'access_token': 'access', 'id_token': id_token} if url == TOKEN_ENDPOINT else self.jwks
+            return Mock(status_code=200, json=Mock(return_value=body), raise_for_status=Mock())
+        return patch.object(oidc.outbound, 'request', side_effect=request)
+
+    def test_callback_verifies_id_token_without_userinfo(self):
+        """
+        A login takes the token exchange and, once per process, the JWKS; userinfo is never called.
+        """
+        with self.google(self.id_token()) as mock_request:
+            response = self.client.get(reverse('google_callback'), {'code': 'abc'})
+            self.client.get(reverse('google_callback'), {'code': 'def'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('session_token=access', response['Location'])
+        urls = [call.args[2] for call in mock_request.call_args_list]
+        self.assertEqual(urls, [TOKEN_ENDPOINT, JWKS_ENDPOINT, TOKEN_ENDPOINT])
+
+        user = User.objects.get(email='jane@example.com')
+        self.assertEqual((user.username, user.first_name), ('google-123', 'Jane'))
+        self.assertEqual(self.client.session['user']['sub'], 'google-123')
+
+    def test_invalid_tokens_are_rejected(self):
+        """
+        A wrong audience, an expired token or a forged signature fails the login.
+        """
+        forged, _ = make_key('key-1')
+        for token in (self.id_token(aud='someone-else'), self.id_token(exp=int(time.time()) - 3600), self.id_token(key=forged)):
+            with self.google(token):
+                response = self.client.get(reverse('google_callback'), {'code': 'abc'})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+    def test_rotated_key_is_fetched(self):
+        """
+        A token signed with a key id we have not seen refreshes the cached JWKS.
+        """
+        with self.google(self.id_token()):
+            self.client.get(reverse('google_callback'), {'code': 'abc'})
+
+        new_key, jwk = make_key('key-2')
+        self.jwks = {'keys': [jwk]}
+        with patch.object(oidc, 'UNKNOWN_KID_REFETCH_SECONDS', 0), self.google(self.id_token(key=new_key, kid='key-2')):
+            response = self.client.get(reverse('google_callback'), {'code': 'abc'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_auth_url_uses_cached_client(self):
+        """
+        Starting a login reads the OIDC client once per process.
+        """
+        Client.objects.create(name='Glace', client_id='glace-client', _redirect_uris='https://example.com/callback')
+        self.client.post(reverse('initiate_google_login'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('initiate_google_login'))
+        self.assertEqual(len(queries), 0)
+        self.assertIn('client_id=glace-client', response.json()['authUrl'])
+        self.assertIn('redirect_uri=https://example.com/callback', response.json()['authUrl'])
+
+    async def test_async_callback(self):
+        """
+        The ASGI callback completes the same login without blocking the event loop.
+        """
+        request = RequestFactory().get('/api/openid/callback/', {'code': 'abc'})
+        request.session = SessionStore()
+        with self.google(self.id_token()):
+            response = await AsyncGoogleCallbackView.as_view()(request)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(await User.objects.filter(email='jane@example.com').aexists())
+        self.assertEqual(request.session['id_token'].count('.'), 2)
@@ -0,0 +1,106 @@
+import uuid
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Order, OrderItem, Category, NotificationOutbox
+
+
+class OrderBatchTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with two customers and two products.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='First', email='first@example.com')
+        self.other_customer = Customer.objects.create(store=self.store, first_name='Second', email='second@example.com')
+        category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.product = Product.objects.create(store=self.store, category=category, name='Product 1', price=10, quantity=100, rating=5, description='Description')
+        self.url = reverse('orders-batch', kwargs={'store_id': str(self.store.id)})
+
+    def order(self, customer, **extra):
+        return dict({
+            'customerId': str(customer.id),
+            'orderItems': [{'product': str(self.product.id), 'quantity': 1, 'price': 10}],
+            'phone': '1234567890',
+        }, **extra)
+
+    def test_reports_each_order(self):
+        """
+        Valid orders are created and invalid ones are reported without blocking the batch.
+        """
+        data = {'orders': [
+            self.order(self.customer, clientRef='a'),
+            self.order(self.customer, customerId=str(uuid.uuid4())),
+            self.order(self.customer, orderItems=[{'product': str(uuid.uuid4()), 'quantity': 1}]),
+        ]}
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 2)
+        results = response.data['results']
+        self.assertEqual(results[0]['clientRef'], 'a')
+        self.assertTrue(Order.objects.filter(id=results[0]['id']).exists())
+        self.assertEqual([r['status'] for r in results], ['created', 'error', 'error'])
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+    def test_malformed_orders_do_not_fail_the_batch(self):
+        """
+        A non-numeric price or a missing item list only fails its own order.
+        """
+        data = [
+            self.order(self.customer),
+            self.order(self.customer, orderItems=[{'product': str(self.product.id), 'quantity': 1, 'price': 'ten'}]),
+            self.order(self.customer, orderItems=[{'product': str(self.product.id), 'quantity': 1, 'price': 'NaN'}]),
+            self.order(self.customer, orderItems=None),
+            self.order(self.other_customer),
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'error', 'error', 'error', 'created'])
+        self.assertEqual(response.data['results'][3]['detail'], "orderItems must be a list")
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_query_count_is_independent_of_batch_size(self):
+        """
+        Ten orders cost the same number of queries as two.
+        """
+        self.client.post(self.url, [self.order(self.customer)], format='json')  # creates today's sales rollup row
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, [self.order(self.customer)] * 2, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, [self.order(self.customer)] * 10, format='json')
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Order.objects.count(), 13)
+
+    def test_coalesced_notifications(self):
+        """
+        Coalescing sends one email and one SMS per customer.
+        """
+        data = {'notify': 'coalesce', 'orders': [
+            self.order(self.customer), self.order(self.customer), self.order(self.other_customer),
+        ]}
+
+        self.client.post(self.url, data, format='json')
+
+        self.assertEqual(NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_EMAIL).count(), 2)
+        self.assertEqual(NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_SMS).count(), 2)
+        first = NotificationOutbox.objects.get(recipient='first@example.com')
+        self.assertIn('2 orders received!', first.message)
+
+    def test_suppressed_notifications(self):
+        """
+        notify=none creates the orders without queueing anything.
+        """
+        self.client.post(self.url, {'notify': 'none', 'orders': [self.order(self.customer)]}, format='json')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
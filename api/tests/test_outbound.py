@@ -0,0 +1,47 @@
+from unittest.mock import patch, Mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from api import outbound
+from api.orders import africastalking_api
+
+
+@override_settings(OUTBOUND_CONNECT_TIMEOUT=1, OUTBOUND_READ_TIMEOUT=2)
+class OutboundTests(SimpleTestCase):
+    def setUp(self):
+        outbound.reset_stats()
+
+    def test_sessions_are_reused_per_provider(self):
+        """
+        Each provider keeps one pooled session for the process.
+        """
+        self.assertIs(outbound.get_session('google'), outbound.get_session('google'))
+        self.assertIsNot(outbound.get_session('google'), outbound.get_session('africastalking'))
+
+    def test_request_sets_timeout_and_counts(self):
+        """
+        Calls get the configured (connect, read) timeout and are counted per provider.
+        """
+        session = outbound.get_session('google')
+        with patch.object(session, 'request', return_value=Mock(status_code=200)) as mock_request:
+            outbound.request('google', 'GET', 'https://example.com')
+        self.assertEqual(mock_request.call_args.kwargs['timeout'], (1, 2))
+
+        with patch.object(session, 'request', return_value=Mock(status_code=503)):
+            outbound.request('google', 'GET', 'https://example.com')
+        with patch.object(session, 'request', side_effect=requests.Timeout):
+            with self.assertRaises(requests.RequestException):
+                outbound.request('google', 'GET', 'https://example.com')
+
+        stats = outbound.get_stats()['google']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['errors'], 2)
+
+    def test_africastalking_uses_pooled_session(self):
+        """
+        The SMS fallback goes through the shared layer.
+        """
+        with patch.object(outbound, 'request', return_value=Mock(status_code=201, content=b'<bad')) as mock_request:
+            africastalking_api.send_sms('+254700000000', 'Hello')
+        self.assertEqual(mock_request.call_args.args[:2], ('africastalking', 'POST'))
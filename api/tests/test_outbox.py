@@ -0,0 +1,140 @@
+from datetime import timedelta
+import uuid
+from unittest.mock import patch
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Category, NotificationOutbox
+from api.outbox import process_outbox, claim_batch
+from api.sms import SMSDeliveryError
+
+
+class OrderOutboxTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a customer and a product to order.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer', email='customer@example.com')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.product = Product.objects.create(store=self.store, category=self.category, name='Product 1', price=10.99, quantity=10, rating=5, description='Product 1 description')
+
+    @patch('api.utils.SendSMS')
+    @patch('api.utils.send_mail')
+    def test_create_order_queues_notifications(self, mock_send_mail, mock_send_sms):
+        """
+        Creating an order writes the email and SMS to the outbox without calling the providers.
+        """
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        data = {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(self.product.id), 'quantity': 1, 'price': 10.99}],
+            'phone': '1234567890',
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_send_mail.assert_not_called()
+        mock_send_sms.assert_not_called()
+        queued = NotificationOutbox.objects.order_by('channel')
+        self.assertEqual([n.channel for n in queued], [NotificationOutbox.CHANNEL_EMAIL, NotificationOutbox.CHANNEL_SMS])
+        self.assertEqual(queued[0].recipient, 'customer@example.com')
+        self.assertEqual(queued[1].recipient, '1234567890')
+
+    def test_failed_order_queues_nothing(self):
+        """
+        Notifications are rolled back together with an order that fails to save.
+        """
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        data = {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(uuid.uuid4()), 'quantity': 1}],
+            'phone': '1234567890',
+        }
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_BACKOFF_SECONDS=30)
+class ProcessOutboxTests(TestCase):
+    def test_sends_due_email(self):
+        """
+        Due emails are delivered and marked as sent.
+        """
+        notification = NotificationOutbox.objects.create(
+            channel=NotificationOutbox.CHANNEL_EMAIL, recipient='customer@example.com',
+            subject='Order Received!', message='Thanks',
+        )
+
+        self.assertEqual(process_outbox(), 1)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, NotificationOutbox.STATUS_SENT)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['customer@example.com'])
+
+    def test_skips_notifications_not_yet_due(self):
+        """
+        Rows scheduled in the future are left alone.
+        """
+        NotificationOutbox.objects.create(
+            channel=NotificationOutbox.CHANNEL_EMAIL, recipient='customer@example.com',
+            message='Thanks', next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        self.assertEqual(process_outbox(), 0)
+
+    @patch('api.outbox.dispatch_sms')
+    def test_failed_sms_is_retried_then_given_up(self, mock_dispatch_sms):
+        """
+        A rejected SMS is rescheduled with backoff and marked failed after the last attempt.
+        """
+        mock_dispatch_sms.side_effect = SMSDeliveryError("vonage: rejected")
+        notification = NotificationOutbox.objects.create(
+            channel=NotificationOutbox.CHANNEL_SMS, recipient='1234567890', message='Thanks',
+        )
+
+        process_outbox()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        NotificationOutbox.objects.filter(id=notification.id).update(next_attempt_at=timezone.now())
+        process_outbox()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, NotificationOutbox.STATUS_FAILED)
+        self.assertEqual(notification.attempts, 2)
+
+    @patch('api.outbox.claim_batch')
+    def test_row_reclaimed_after_its_lease_is_not_sent_twice(self, mock_claim_batch):
+        """
+        A row whose lease ran out mid-batch and was claimed by another worker is skipped.
+        """
+        NotificationOutbox.objects.create(
+            channel=NotificationOutbox.CHANNEL_EMAIL, recipient='customer@example.com', message='Thanks',
+        )
+        batch = claim_batch(10)
+        mock_claim_batch.return_value = batch
+        # Another worker re-claims the row with a lease of its own
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=10))
+
+        self.assertEqual(process_outbox(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.get().attempts, 0)
+
+        # The worker that holds the lease renews it and sends
+        mock_claim_batch.return_value = list(NotificationOutbox.objects.all())
+        self.assertEqual(process_outbox(), 1)
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Order, OrderItem, Category
+
+
+class OrderListPaginationTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a few orders, some of them paid.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer')
+        category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        product = Product.objects.create(store=self.store, category=category, name='Product 1', price=10, quantity=10, rating=5, description='Description')
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(store=self.store, customer=self.customer, is_paid=i % 2 == 0)
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=10)
+            self.orders.append(order)
+        self.url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+
+    def walk(self, params):
+        seen = []
+        cursor = None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(order['id'] for order in response.data)
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return seen
+
+    def test_pages_cover_every_order_once(self):
+        """
+        Following the cursor returns every order exactly once, newest first.
+        """
+        seen = self.walk({'pageSize': 2})
+        expected = Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_is_paid_filter_is_kept_across_pages(self):
+        """
+        The isPaid filter applies to every page.
+        """
+        seen = self.walk({'pageSize': 1, 'isPaid': 'true'})
+        self.assertEqual(len(seen), 3)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """
+        Customers and items are loaded with joins and prefetches, not per order.
+        """
+        # The first request also caches the store's owner
+        self.client.get(self.url, {'pageSize': 2})
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'pageSize': 1})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'pageSize': 5})
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_cursor(self):
+        """
+        A cursor that was not issued by the API is rejected.
+        """
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
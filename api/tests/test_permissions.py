@@ -0,0 +1,130 @@
+import uuid
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Category, County, Customer, Product
+
+
+class StoreOwnerPermissionTests(APITestCase):
+    def setUp(self):
+        """
+        Set up an owner with a store and one customer, and a second user.
+        """
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Category', description='Description')
+        Customer.objects.create(store=self.store, first_name='Jane', last_name='Doe', email='jane@example.com', phone_number='123')
+        self.url = reverse('customer-create', kwargs={'store_id': str(self.store.id)})
+
+    def test_owner_check_is_cached(self):
+        """
+        Once the owner is cached, listing customers costs only the customers query.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(queries), 1)
+
+    def test_other_users_get_404(self):
+        """
+        Someone else's store answers 404, exactly like a store that does not exist.
+        """
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        missing = reverse('customer-create', kwargs={'store_id': str(uuid.uuid4())})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deleted_store_is_forgotten(self):
+        """
+        Deleting a store drops its cached owner, so its URLs 404 right away.
+        """
+        self.client.get(self.url)
+        detail = reverse('store-detail', kwargs={'store_id': str(self.store.id)})
+        self.assertEqual(self.client.delete(detail).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_exempt_methods(self):
+        """
+        Any signed-in user can browse a store's products, only the owner can add one.
+        """
+        self.client.force_authenticate(user=self.other)
+        url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        data = {
+            'name': 'Product', 'price': 10, 'quantity': 1, 'rating': 5, 'description': 'Description',
+            'categoryId': str(self.category.id), 'images': [{'url': 'https://example.com/a.png'}],
+        }
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+        missing = reverse('store-products', kwargs={'store_id': str(uuid.uuid4())})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SharedReferenceDataTests(APITestCase):
+    def setUp(self):
+        """
+        Set up two stores that both link one category and one county, with a product of the second store in the category.
+        """
+        self.user = User.objects.create_user(username='owner', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.other_store = Store.objects.create(user=self.other, name='Other Store')
+        self.category = Category.objects.create(name='Category', image_url='https://example.com/c.png', description='Description')
+        self.county = County.objects.create(name='Nairobi', description='Description')
+        for store in (self.store, self.other_store):
+            store.categories.add(self.category)
+            store.counties.add(self.county)
+        Product.objects.create(store=self.other_store, category=self.category, name='Cone', price=1,
+                               quantity=5, rating=5, description='Description')
+        self.category_url = reverse('store-detail-categories', kwargs={'store_id': str(self.store.id), 'category_id': str(self.category.id)})
+        self.county_url = reverse('county-detail', kwargs={'store_id': str(self.store.id), 'county_id': str(self.county.id)})
+
+    def test_delete_only_unlinks_shared_rows(self):
+        """
+        Deleting a shared category or county removes it from this store and leaves the other store's data alone.
+        """
+        self.assertEqual(self.client.delete(self.category_url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(self.county_url).status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertFalse(self.store.categories.exists())
+        self.assertFalse(self.store.counties.exists())
+        self.assertEqual(list(self.other_store.categories.all()), [self.category])
+        self.assertEqual(list(self.other_store.counties.all()), [self.county])
+        self.assertEqual(Product.objects.filter(store=self.other_store).count(), 1)
+
+    def test_unused_rows_are_deleted(self):
+        """
+        Once no other store or product uses them, deleting removes the rows themselves.
+        """
+        self.other_store.delete()
+        self.client.delete(self.category_url)
+        self.client.delete(self.county_url)
+        self.assertFalse(Category.objects.filter(id=self.category.id).exists())
+        self.assertFalse(County.objects.filter(id=self.county.id).exists())
+
+    def test_only_staff_edit_shared_rows(self):
+        """
+        A store owner cannot rename a category or county another store uses, staff can.
+        """
+        category = {'name': 'Renamed', 'description': 'Description', 'imageUrl': 'https://example.com/c.png'}
+        self.assertEqual(self.client.patch(self.category_url, category, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.patch(self.county_url, {'name': 'Renamed'}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Category.objects.get(id=self.category.id).name, 'Category')
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.patch(self.category_url, category, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.patch(self.county_url, {'name': 'Renamed'}, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(County.objects.get(id=self.county.id).name, 'Renamed')
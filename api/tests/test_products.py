@@ -0,0 +1,371 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Product, Image, Category, Customer
+from api.products.cache import get_cache, store_version_key
+from api.products.importer import import_products
+from api.utils import sync_images
+
+
+class ProductCatalogTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with archived and active products in two categories.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.other_category = Category.objects.create(name='Other Category', image_url='https://example.com/other.png', description='Other Category description')
+        for i in range(6):
+            product = Product.objects.create(store=self.store, category=self.category if i % 2 else self.other_category,
+                                             name=f'Product {i}', price=1, quantity=1, rating=5,
+                                             description='Description', is_archived=i == 0)
+            Image.objects.create(product=product, url='https://example.com/product.png')
+        self.url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+
+    def test_pages_follow_the_cursor(self):
+        """
+        Active products are paged newest first without gaps or repeats.
+        """
+        seen = []
+        params = {'isArchived': 'false', 'pageSize': 2}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(product['id'] for product in response.data)
+            if not response.get('X-Next-Cursor'):
+                break
+            params['cursor'] = response['X-Next-Cursor']
+
+        expected = Product.objects.filter(is_archived=False).order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_category_filter(self):
+        """
+        The categoryId filter still applies.
+        """
+        response = self.client.get(self.url, {'categoryId': str(self.category.id)})
+        self.assertEqual(len(response.data), 3)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """
+        Categories are joined and images prefetched instead of queried per product.
+        """
+        # The first request also caches the store's owner
+        self.client.get(self.url, {'pageSize': 2})
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'pageSize': 1})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'pageSize': 6})
+        self.assertEqual(len(small), len(large))
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        """
+        Set up two stores whose catalogs share some words.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.other_store = Store.objects.create(user=self.user, name='Other Store')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.cone = self.create_product(self.store, 'Vanilla Cone', 'A crisp wafer cone')
+        self.tub = self.create_product(self.store, 'Chocolate Tub', 'Rich tub with vanilla swirls')
+        self.create_product(self.store, 'Mango Sorbet', 'Dairy free')
+        self.create_product(self.other_store, 'Vanilla Pint', 'Another store')
+        self.url = reverse('store-product-search', kwargs={'store_id': str(self.store.id)})
+
+    def create_product(self, store, name, description):
+        return Product.objects.create(store=store, category=self.category, name=name, price=1,
+                                      quantity=1, rating=5, description=description)
+
+    def test_name_matches_rank_first(self):
+        """
+        Only the store's matching products are returned, name matches before description matches.
+        """
+        response = self.client.get(self.url, {'q': 'vanilla'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in response.data], [str(self.cone.id), str(self.tub.id)])
+
+    def test_every_term_must_match(self):
+        """
+        Multi-word queries only match products containing all the words.
+        """
+        response = self.client.get(self.url, {'q': 'vanilla tub'})
+        self.assertEqual([product['id'] for product in response.data], [str(self.tub.id)])
+
+    def test_results_are_paginated(self):
+        """
+        pageSize limits the page and the next page is announced in X-Next-Page.
+        """
+        response = self.client.get(self.url, {'q': 'vanilla', 'pageSize': 1})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response['X-Next-Page'], '2')
+
+        response = self.client.get(self.url, {'q': 'vanilla', 'pageSize': 1, 'page': 2})
+        self.assertEqual([product['id'] for product in response.data], [str(self.tub.id)])
+        self.assertNotIn('X-Next-Page', response)
+
+    def test_query_is_required(self):
+        """
+        An empty query or a bad page number is a 400.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'vanilla', 'page': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImageSyncTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a product with two images.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.product = Product.objects.create(store=self.store, category=self.category, name='Cone', price=1,
+                                              quantity=1, rating=5, description='Description')
+        self.kept = Image.objects.create(product=self.product, url='https://example.com/a.png')
+        self.removed = Image.objects.create(product=self.product, url='https://example.com/b.png')
+        self.url = reverse('store-product-detail', kwargs={'store_id': str(self.store.id), 'product_id': str(self.product.id)})
+
+    def patch(self, urls):
+        return self.client.patch(self.url, {
+            'name': 'Cone', 'price': 1, 'quantity': 1, 'rating': 5, 'description': 'Description',
+            'categoryId': str(self.category.id), 'images': [{'url': url} for url in urls],
+        }, format='json')
+
+    def test_only_changed_images_are_written(self):
+        """
+        Kept images keep their rows, removed ones are deleted and new ones added.
+        """
+        response = self.patch(['https://example.com/a.png', 'https://example.com/c.png'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        images = dict(Image.objects.filter(product=self.product).values_list('url', 'id'))
+        self.assertEqual(set(images), {'https://example.com/a.png', 'https://example.com/c.png'})
+        self.assertEqual(images['https://example.com/a.png'], self.kept.id)
+        self.assertFalse(Image.objects.filter(id=self.removed.id).exists())
+
+    def test_unchanged_images_cost_one_read(self):
+        """
+        Syncing an unchanged set only reads the existing rows.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_images(['https://example.com/b.png', 'https://example.com/a.png'], product=self.product)
+        self.assertEqual(result, (0, 0))
+        self.assertEqual(len(queries), 1)
+
+    def test_duplicate_urls_are_kept(self):
+        """
+        A URL sent twice ends up as two rows.
+        """
+        self.assertEqual(sync_images(['https://example.com/a.png'] * 2, product=self.product), (1, 1))
+        self.assertEqual(Image.objects.filter(product=self.product, url='https://example.com/a.png').count(), 2)
+
+    def test_store_images(self):
+        """
+        Store patches sync the store's images the same way.
+        """
+        Image.objects.create(store=self.store, url='https://example.com/store.png')
+        response = self.client.patch(reverse('store-detail', kwargs={'store_id': str(self.store.id)}),
+                                     {'name': 'Test Store', 'images': [{'url': 'https://example.com/new.png'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(Image.objects.filter(store=self.store).values_list('url', flat=True)), ['https://example.com/new.png'])
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with one product and a customer who can order it.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.store.categories.add(Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description'))
+        self.category = self.store.categories.get()
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer')
+        self.product = Product.objects.create(store=self.store, category=self.category, name='Cone', price=1,
+                                              quantity=5, rating=5, description='Description')
+        Image.objects.create(product=self.product, url='https://example.com/a.png')
+        self.list_url = reverse('store-products', kwargs={'store_id': str(self.store.id)})
+        self.detail_url = reverse('store-product-detail', kwargs={'store_id': str(self.store.id), 'product_id': str(self.product.id)})
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """
+        The second read of a page is a hit that runs no queries and keeps the pagination headers.
+        """
+        Product.objects.create(store=self.store, category=self.category, name='Tub', price=1, quantity=5, rating=5, description='Description')
+        first = self.client.get(self.list_url, {'pageSize': 1})
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.list_url, {'pageSize': 1})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['X-Next-Cursor'], first['X-Next-Cursor'])
+
+    def test_product_write_invalidates(self):
+        """
+        Patching a product is visible on the next read of the list and the detail.
+        """
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        response = self.client.patch(self.detail_url, {
+            'name': 'Waffle Cone', 'price': 1, 'quantity': 5, 'rating': 5, 'description': 'Description',
+            'categoryId': str(self.category.id), 'images': [{'url': 'https://example.com/a.png'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(self.list_url).data[0]['name'], 'Waffle Cone')
+        self.assertEqual(self.client.get(self.detail_url).data['name'], 'Waffle Cone')
+
+    def test_category_write_invalidates(self):
+        """
+        Renaming a category is visible in the nested product category.
+        """
+        self.client.get(self.detail_url)
+        url = reverse('store-detail-categories', kwargs={'store_id': str(self.store.id), 'category_id': str(self.category.id)})
+        response = self.client.patch(url, {'name': 'Sorbets', 'description': 'Sorbets', 'imageUrl': 'https://example.com/c.png'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.detail_url).data['category']['name'], 'Sorbets')
+
+    def test_checkout_invalidates_stock(self):
+        """
+        Stock reserved at checkout is reflected in the cached catalog.
+        """
+        self.client.get(self.detail_url)
+        response = self.client.post(reverse('orders', kwargs={'store_id': str(self.store.id)}), {
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(self.product.id), 'quantity': 2, 'price': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(self.detail_url).data['quantity'], 3)
+
+    def test_store_delete_invalidates(self):
+        """
+        Deleting a store bumps its catalog version, leaving its cached pages unreachable.
+        """
+        self.client.get(self.list_url)
+        version = get_cache().get(store_version_key(self.store.id))
+        response = self.client.delete(reverse('store-detail', kwargs={'store_id': str(self.store.id)}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertGreater(get_cache().get(store_version_key(self.store.id)), version)
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductImportTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with one product that the import will update.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.category = Category.objects.create(name='Cones', image_url='https://example.com/category.png', description='Cones')
+        self.existing = Product.objects.create(store=self.store, category=self.category, sku='CONE-1', name='Cone',
+                                               price=1, quantity=1, rating=5, description='Description')
+        Image.objects.create(product=self.existing, url='https://example.com/old.png')
+        self.url = reverse('store-product-import', kwargs={'store_id': str(self.store.id)})
+
+    def row(self, sku, **overrides):
+        row = {'sku': sku, 'name': f'Product {sku}', 'price': '2.50', 'quantity': 10,
+               'categoryId': str(self.category.id), 'description': 'Imported',
+               'images': [f'https://example.com/{sku}.png']}
+        row.update(overrides)
+        return row
+
+    def test_json_upsert(self):
+        """
+        New SKUs are created, existing ones updated in place with their images synced.
+        """
+        response = self.client.post(self.url, [self.row('CONE-1', name='Waffle Cone'), self.row('TUB-1')], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 0))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Waffle Cone')
+        self.assertEqual(list(self.existing.images.values_list('url', flat=True)), ['https://example.com/CONE-1.png'])
+        self.assertEqual(Product.objects.get(store=self.store, sku='TUB-1').images.count(), 1)
+
+    def test_row_errors_are_reported(self):
+        """
+        Bad rows are reported by position and the good rows still import.
+        """
+        response = self.client.post(self.url, {'products': [
+            self.row('A'),
+            self.row('B', price='free'),
+            self.row('C', categoryId=None, category='Missing'),
+            self.row('A'),
+            {'name': 'No sku'},
+        ]}, format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([(error['row'], error['sku']) for error in response.data['errors']],
+                         [(2, 'B'), (3, 'C'), (4, 'A'), (5, None)])
+
+    def test_oversized_values_are_row_errors(self):
+        """
+        Values beyond the column limits are rejected per row instead of failing the chunk.
+        """
+        response = self.client.post(self.url, {'products': [
+            self.row('A'),
+            self.row('B', name='x' * 256),
+            self.row('C', price='123456789'),
+            self.row('D', price='1.005'),
+            self.row('E', quantity=2 ** 31),
+            self.row('F', images=['https://example.com/' + 'x' * 200]),
+            self.row('G', price='10.50'),
+        ]}, format='json')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['sku'] for error in response.data['errors']], ['B', 'C', 'D', 'E', 'F'])
+
+    def test_csv_upload(self):
+        """
+        CSV uploads resolve categories by name and split images on |.
+        """
+        upload = SimpleUploadedFile('products.csv', (
+            'sku,name,price,quantity,category,isArchived,images\n'
+            'CSV-1,Sorbet,3,4,Cones,true,https://example.com/a.png|https://example.com/b.png\n'
+        ).encode(), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 1)
+
+        product = Product.objects.get(store=self.store, sku='CSV-1')
+        self.assertTrue(product.is_archived)
+        self.assertEqual(product.category, self.category)
+        self.assertEqual(product.images.count(), 2)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """
+        A chunk costs the same number of queries for 5 rows as for 50.
+        """
+        with CaptureQueriesContext(connection) as few:
+            import_products(self.store, [self.row(f'F{i}') for i in range(5)])
+        with CaptureQueriesContext(connection) as many:
+            import_products(self.store, [self.row(f'M{i}') for i in range(50)])
+        self.assertEqual(len(few), len(many))
+
+    def test_management_command(self):
+        """
+        The import_products command imports a JSON file and prints the counts.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump([self.row('CMD-1')], f)
+        out = StringIO()
+        call_command('import_products', str(self.store.id), f.name, stdout=out)
+        os.unlink(f.name)
+        self.assertIn('Created 1, updated 0, failed 0', out.getvalue())
+        self.assertTrue(Product.objects.filter(store=self.store, sku='CMD-1').exists())
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import refcache
+from api.models import User, Store, Category, County
+
+
+class ReferenceCacheTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with one county and one category, starting from a cold L1.
+        """
+        refcache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.county = County.objects.create(name='Nairobi', description='Nairobi county')
+        self.store.counties.add(self.county)
+        refcache.bump('counties')
+        refcache.bump('categories')
+        self.counties_url = reverse('counties', kwargs={'store_id': str(self.store.id)})
+        self.categories_url = reverse('store-categories', kwargs={'store_id': str(self.store.id)})
+
+    def test_steady_state_reads_skip_the_database(self):
+        """
+        After the first read, the list is served from memory without queries.
+        """
+        first = self.client.get(self.counties_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([county['name'] for county in first.json()], ['Nairobi'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.counties_url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+
+    def test_writes_invalidate(self):
+        """
+        Creating, patching and deleting through the API is visible on the next read.
+        """
+        self.client.get(self.counties_url)
+        self.client.post(self.counties_url, {'name': 'Mombasa', 'description': 'Coast'}, format='json')
+        self.assertEqual(sorted(county['name'] for county in self.client.get(self.counties_url).json()), ['Mombasa', 'Nairobi'])
+
+        url = reverse('county-detail', kwargs={'store_id': str(self.store.id), 'county_id': str(self.county.id)})
+        self.client.patch(url, {'name': 'Nairobi City'}, format='json')
+        self.assertIn('Nairobi City', [county['name'] for county in self.client.get(self.counties_url).json()])
+
+        self.client.delete(url)
+        self.assertEqual([county['name'] for county in self.client.get(self.counties_url).json()], ['Mombasa'])
+
+        self.client.get(self.categories_url)
+        self.client.post(self.categories_url, {'name': 'Cones', 'imageUrl': 'https://example.com/c.png', 'description': 'Cones'}, format='json')
+        self.assertIn('Cones', [category['name'] for category in self.client.get(self.categories_url).json()])
+
+    def test_other_workers_pick_up_new_versions(self):
+        """
+        A version bumped elsewhere is noticed once the check interval has passed.
+        """
+        self.client.get(self.counties_url)
+        County.objects.create(name='Kisumu', description='Lake')
+        entry = refcache._local['counties']
+
+        # Simulate another worker's bump: the shared version moves, this L1 does not
+        refcache.cache.incr(refcache.version_key('counties'))
+        self.assertEqual(len(self.client.get(self.counties_url).json()), 1)
+
+        entry.checked_at -= 60
+        self.assertEqual(len(self.client.get(self.counties_url).json()), 2)
@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import User, Store, Customer, Product, Category, Order, StoreDailySales
+from api.orders.rollups import rebuild_daily_sales
+
+
+class StoreDailySalesTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store with a customer and a product.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.customer = Customer.objects.create(store=self.store, first_name='Test Customer')
+        category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.product = Product.objects.create(store=self.store, category=category, name='Product 1', price=10, quantity=100, rating=5, description='Description')
+
+    def create_order(self, **extra):
+        url = reverse('orders', kwargs={'store_id': str(self.store.id)})
+        data = dict({
+            'customerId': str(self.customer.id),
+            'orderItems': [{'product': str(self.product.id), 'quantity': 3, 'price': 30}],
+        }, **extra)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def rollup(self):
+        return StoreDailySales.objects.get(store=self.store)
+
+    def test_create_and_update_maintain_rollup(self):
+        """
+        Order creation and payment/delivery updates are reflected in the day's row.
+        """
+        order_id = self.create_order()
+        self.create_order(is_paid=True)
+
+        rollup = self.rollup()
+        self.assertEqual(rollup.order_count, 2)
+        self.assertEqual(rollup.paid_count, 1)
+        self.assertEqual(rollup.revenue, Decimal('60.00'))
+        self.assertEqual(rollup.items_sold, 6)
+
+        url = reverse('order-update', kwargs={'store_id': str(self.store.id), 'order_id': order_id})
+        self.client.patch(url, {'is_paid': True, 'is_delivered': True}, format='json')
+        self.client.patch(url, {'is_paid': True}, format='json')
+
+        rollup = self.rollup()
+        self.assertEqual(rollup.paid_count, 2)
+        self.assertEqual(rollup.delivered_count, 1)
+
+    def test_string_flags_are_parsed(self):
+        """
+        Form-encoded "false" and "0" leave an order unpaid in both the row and the rollup.
+        """
+        order_id = self.create_order(is_paid='false', is_delivered='0')
+        url = reverse('order-update', kwargs={'store_id': str(self.store.id), 'order_id': order_id})
+        response = self.client.patch(url, {'is_paid': 'false', 'is_delivered': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        order = Order.objects.get(id=order_id)
+        self.assertFalse(order.is_paid)
+        self.assertTrue(order.is_delivered)
+        rollup = self.rollup()
+        self.assertEqual((rollup.paid_count, rollup.delivered_count), (0, 1))
+
+        response = self.client.patch(url, {'is_paid': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        batch = self.client.post(reverse('orders-batch', kwargs={'store_id': str(self.store.id)}), [
+            {'customerId': str(self.customer.id), 'is_paid': 'no', 'orderItems': [{'product': str(self.product.id), 'quantity': 1, 'price': 10}]},
+            {'customerId': str(self.customer.id), 'is_paid': 'maybe', 'orderItems': [{'product': str(self.product.id), 'quantity': 1, 'price': 10}]},
+        ], format='json')
+        self.assertEqual([result['status'] for result in batch.data['results']], ['created', 'error'])
+        self.assertEqual(self.rollup().paid_count, 0)
+
+        StoreDailySales.objects.all().delete()
+        rebuild_daily_sales()
+        self.assertEqual((self.rollup().paid_count, self.rollup().delivered_count), (0, 1))
+
+    def test_cancelling_takes_the_order_out_of_the_rollup(self):
+        """
+        A cancelled order no longer counts, and a form-encoded "false" does not cancel.
+        """
+        self.create_order()
+        order_id = self.create_order(is_paid=True)
+        url = reverse('order-update', kwargs={'store_id': str(self.store.id), 'order_id': order_id})
+
+        response = self.client.patch(url, {'is_cancelled': 'false'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Order.objects.get(id=order_id).is_cancelled)
+        response = self.client.patch(url, {'is_cancelled': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.patch(url, {'is_cancelled': True, 'is_delivered': True}, format='json')
+        self.client.patch(url, {'is_cancelled': True}, format='json')
+        self.client.patch(url, {'is_paid': False}, format='json')
+        self.assertTrue(Order.objects.get(id=order_id).is_cancelled)
+
+        rollup = self.rollup()
+        self.assertEqual((rollup.order_count, rollup.paid_count, rollup.delivered_count), (1, 0, 0))
+        self.assertEqual((rollup.revenue, rollup.items_sold), (Decimal('30.00'), 3))
+
+        StoreDailySales.objects.all().delete()
+        rebuild_daily_sales()
+        rebuilt = self.rollup()
+        self.assertEqual(
+            (rebuilt.order_count, rebuilt.paid_count, rebuilt.delivered_count, rebuilt.revenue, rebuilt.items_sold),
+            (rollup.order_count, rollup.paid_count, rollup.delivered_count, rollup.revenue, rollup.items_sold),
+        )
+
+    def test_rebuild_matches_incremental_rollup(self):
+        """
+        Rebuilding from scratch produces the same row the write paths maintained.
+        """
+        self.create_order(is_paid=True)
+        self.create_order(is_delivered=True)
+        before = self.rollup()
+
+        StoreDailySales.objects.all().delete()
+        self.assertEqual(rebuild_daily_sales(), 1)
+
+        after = self.rollup()
+        for field in ('date', 'order_count', 'paid_count', 'delivered_count', 'revenue', 'items_sold'):
+            self.assertEqual(getattr(after, field), getattr(before, field))
+
+    def test_daily_sales_endpoint(self):
+        """
+        The dashboard endpoint reads the rollup rows.
+        """
+        self.create_order()
+        url = reverse('store-daily-sales', kwargs={'store_id': str(self.store.id)})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['order_count'], 1)
+        self.assertEqual(self.client.get(url, {'from': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
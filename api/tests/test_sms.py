@@ -0,0 +1,69 @@
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api import sms
+
+
+@override_settings(SMS_PROVIDERS=['vonage', 'africastalking'], SMS_BREAKER_FAILURES=2,
+                   SMS_BREAKER_WINDOW=60, SMS_BREAKER_COOLDOWN=30, SMS_LATENCY_BUDGET_MS=2000)
+class DispatchSMSTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.vonage = Mock(return_value=True)
+        self.africastalking = Mock(return_value=True)
+        patcher = patch.dict(sms.PROVIDERS, {'vonage': self.vonage, 'africastalking': self.africastalking})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_primary_is_used_when_healthy(self):
+        """
+        Vonage handles the message and the fallback is never called.
+        """
+        self.assertEqual(sms.dispatch_sms('+254700000000', 'Hello'), 'vonage')
+        self.africastalking.assert_not_called()
+
+    def test_failover_and_breaker_opens(self):
+        """
+        Primary failures fail over immediately and open the breaker after the threshold.
+        """
+        self.vonage.side_effect = ConnectionError("down")
+
+        self.assertEqual(sms.dispatch_sms('+254700000000', 'Hello'), 'africastalking')
+        self.assertEqual(sms.dispatch_sms('+254700000000', 'Hello'), 'africastalking')
+        self.assertTrue(sms.CircuitBreaker('vonage').is_open())
+
+        self.vonage.reset_mock()
+        self.assertEqual(sms.dispatch_sms('+254700000000', 'Hello'), 'africastalking')
+        self.vonage.assert_not_called()
+
+    @override_settings(SMS_LATENCY_BUDGET_MS=-1)
+    def test_slow_success_counts_against_breaker(self):
+        """
+        A send that blows the latency budget still delivers but is counted as a failure.
+        """
+        sms.dispatch_sms('+254700000000', 'Hello')
+        sms.dispatch_sms('+254700000000', 'Hello')
+        self.assertTrue(sms.CircuitBreaker('vonage').is_open())
+
+    def test_half_open_probe_closes_breaker(self):
+        """
+        After the cooldown a single successful probe closes the breaker.
+        """
+        breaker = sms.CircuitBreaker('vonage')
+        breaker.record_failure()
+        breaker.record_failure()
+        cache.delete(breaker.open_key)  # cooldown elapsed
+
+        self.assertEqual(sms.dispatch_sms('+254700000000', 'Hello'), 'vonage')
+        self.assertEqual(cache.get(breaker.failures_key), None)
+
+    def test_all_providers_failing_raises(self):
+        """
+        The caller gets an error it can retry later.
+        """
+        self.vonage.return_value = False
+        self.africastalking.side_effect = ConnectionError("down")
+        with self.assertRaises(sms.SMSDeliveryError):
+            sms.dispatch_sms('+254700000000', 'Hello')
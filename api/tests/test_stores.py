@@ -0,0 +1,190 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.geo import encode_geohash, haversine_km
+from api.models import User, Store, Product, Image, Category, County
+
+
+class StoreRepresentationTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a user with two stores, each with products, images, categories and counties.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.county = County.objects.create(name='Nairobi', description='Nairobi county')
+        self.stores = [self.create_store(f'Store {i}') for i in range(2)]
+
+    def create_store(self, name, products=2):
+        store = Store.objects.create(user=self.user, name=name)
+        store.categories.add(self.category)
+        store.counties.add(self.county)
+        Image.objects.create(store=store, url='https://example.com/store.png')
+        for i in range(products):
+            product = Product.objects.create(store=store, category=self.category, name=f'Product {i}', price=1, quantity=1, rating=5, description='Description')
+            Image.objects.create(product=product, url='https://example.com/product.png')
+        return store
+
+    def test_list_defaults_to_summary(self):
+        """
+        Listing stores returns no nested relations unless asked to.
+        """
+        response = self.client.get(reverse('store-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('products', response.data[0])
+        self.assertNotIn('counties', response.data[0])
+        self.assertIn('paybill', response.data[0])
+
+    def test_expand_and_fields(self):
+        """
+        ?expand= adds relations and ?fields= trims the top-level fields.
+        """
+        response = self.client.get(reverse('store-list'), {'expand': 'products,counties', 'fields': 'id,name'})
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'products', 'counties'})
+        self.assertEqual(len(response.data[0]['products']), 2)
+        self.assertEqual(response.data[0]['products'][0]['category']['name'], 'Test Category')
+
+    def test_expansion_query_count_is_fixed(self):
+        """
+        Expanding every relation costs the same number of queries for more stores and products.
+        """
+        params = {'expand': 'products,images,categories,counties'}
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('store-list'), params)
+        self.create_store('Store 3', products=5)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(reverse('store-list'), params)
+        self.assertEqual(len(before), len(after))
+
+    def test_detail_stays_expanded(self):
+        """
+        The detail view keeps the full representation by default.
+        """
+        response = self.client.get(reverse('store-detail', kwargs={'store_id': str(self.stores[0].id)}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['products']), 2)
+        self.assertEqual(len(response.data['images']), 1)
+
+    def test_unknown_expansion(self):
+        """
+        Unknown relations are rejected.
+        """
+        response = self.client.get(reverse('store-list'), {'expand': 'orders'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StoreRelationPatchTests(APITestCase):
+    def setUp(self):
+        """
+        Set up a store serving a few of many counties.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.store = Store.objects.create(user=self.user, name='Test Store')
+        self.counties = [County.objects.create(name=f'County {i}', description='County') for i in range(47)]
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.store.counties.add(*self.counties[:3])
+        self.url = reverse('store-detail', kwargs={'store_id': str(self.store.id)})
+
+    def patch(self, counties, categories=None):
+        return self.client.patch(self.url, {
+            'name': 'Test Store',
+            'counties': [{'id': str(county_id)} for county_id in counties],
+            'categories': [{'id': str(category_id)} for category_id in categories or []],
+        }, format='json')
+
+    def test_counties_are_replaced(self):
+        """
+        The store ends up with exactly the counties in the payload.
+        """
+        wanted = [county.id for county in self.counties[2:10]]
+        response = self.patch(wanted, [self.category.id])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(self.store.counties.values_list('id', flat=True)), set(wanted))
+        self.assertEqual(list(self.store.categories.all()), [self.category])
+
+    def test_query_count_does_not_grow_with_counties(self):
+        """
+        Assigning all 47 counties costs as many queries as assigning a few.
+        """
+        with CaptureQueriesContext(connection) as few:
+            self.patch([county.id for county in self.counties[:5]])
+        self.store.counties.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.patch([county.id for county in self.counties])
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(self.store.counties.count(), 47)
+
+    def test_every_missing_id_is_reported(self):
+        """
+        All unknown ids are listed in one 404 and nothing is changed.
+        """
+        unknown = ['00000000-0000-0000-0000-000000000001', 'not-a-uuid']
+        response = self.patch([self.counties[10].id] + unknown)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(sorted(response.data['missing']), sorted(unknown))
+        self.assertEqual(self.store.counties.count(), 3)
+
+
+class StoreNearbyTests(APITestCase):
+    def setUp(self):
+        """
+        Set up stores around Nairobi, one in Mombasa and one without coordinates.
+        """
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.cbd = Store.objects.create(user=self.user, name='CBD', latitude=-1.2864, longitude=36.8172)
+        self.westlands = Store.objects.create(user=self.user, name='Westlands', latitude=-1.2676, longitude=36.8108)
+        self.karen = Store.objects.create(user=self.user, name='Karen', latitude=-1.3197, longitude=36.7076)
+        self.mombasa = Store.objects.create(user=self.user, name='Mombasa', latitude=-4.0435, longitude=39.6682)
+        Store.objects.create(user=self.user, name='Online')
+        self.url = reverse('store-nearby')
+
+    def test_geohash_follows_coordinates(self):
+        """
+        Saving a store keeps its geohash in step with its coordinates.
+        """
+        self.assertEqual(self.cbd.geohash, encode_geohash(-1.2864, 36.8172, 9))
+        self.cbd.latitude, self.cbd.longitude = None, None
+        self.cbd.save(update_fields=['latitude', 'longitude'])
+        self.cbd.refresh_from_db()
+        self.assertIsNone(self.cbd.geohash)
+
+    def test_stores_within_radius_nearest_first(self):
+        """
+        Only stores inside the radius are returned, sorted by distance.
+        """
+        response = self.client.get(self.url, {'lat': -1.2833, 'lng': 36.8167, 'radius': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([store['name'] for store in response.data], ['CBD', 'Westlands'])
+        self.assertLess(response.data[0]['distance'], response.data[1]['distance'])
+
+        response = self.client.get(self.url, {'lat': -1.2833, 'lng': 36.8167, 'radius': 20, 'pageSize': 2})
+        self.assertEqual([store['name'] for store in response.data], ['CBD', 'Westlands'])
+        self.assertEqual(response['X-Next-Page'], '2')
+
+    def test_matches_brute_force(self):
+        """
+        The prefiltered result agrees with measuring every store.
+        """
+        for radius in (1, 12, 60, 100):
+            response = self.client.get(self.url, {'lat': -1.30, 'lng': 36.80, 'radius': radius})
+            expected = sorted(
+                (haversine_km(-1.30, 36.80, store.latitude, store.longitude), store.name)
+                for store in Store.objects.exclude(latitude=None)
+                if haversine_km(-1.30, 36.80, store.latitude, store.longitude) <= radius
+            )
+            self.assertEqual([store['name'] for store in response.data], [name for _, name in expected])
+
+    def test_invalid_parameters(self):
+        """
+        Missing or out of range coordinates and radii are rejected.
+        """
+        for params in ({'lng': 36.8}, {'lat': 91, 'lng': 36.8}, {'lat': 'x', 'lng': 36.8}, {'lat': 0, 'lng': 0, 'radius': 1000}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
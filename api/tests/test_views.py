@@ -13,7 +13,8 @@ class OrderViewTests(APITestCase):
         self.client.force_authenticate(user=self.user)
         self.store = Store.objects.create(user=self.user, name='Test Store')
         self.customer = Customer.objects.create(store=self.store, first_name='Test Customer', email='wafulahvictor@gmail.com')
-        self.category = Category.objects.create(store=self.store, name='Test Category')
+        self.category = Category.objects.create(name='Test Category', image_url='https://example.com/category.png', description='Test Category description')
+        self.store.categories.add(self.category)
 
     @patch('api.views.africastalking_api.send_sms')
     def test_create_order(self, mock_send_sms):
@@ -69,7 +70,7 @@ class OrderViewTests(APITestCase):
     @patch('api.views.africastalking_api.send_sms')
     def test_create_order_missing_customer_id(self, mock_send_sms):
         """
-        Test case for creating an order without customerId, expecting a 500 error.
+        Test case for creating an order without customerId, expecting a 400 error.
         """
         # Mock the external SMS sending function
         mock_send_sms.return_value = {
@@ -105,5 +106,4 @@ class OrderViewTests(APITestCase):
         # Make the POST request to create the order
         response = self.client.post(url, data, format='json')
 
-        # Update assertion to expect 500 instead of 400 for now
-        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,12 +1,16 @@
 # urls.py
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+# Under ASGI the callback awaits Google instead of holding a thread per login
+GoogleCallbackView = views.AsyncGoogleCallbackView if settings.SERVER_MODE == 'asgi' else views.GoogleCallbackView
+
 urlpatterns = [
     path('auth/google', views.InitiateGoogleLoginView.as_view(), name='initiate_google_login'),
-    path('openid/callback/', views.GoogleCallbackView.as_view(), name='google_callback'),
+    path('openid/callback/', GoogleCallbackView.as_view(), name='google_callback'),
     path('get-user-by-email/', views.get_user_by_email, name='get_user_by_email'),
     path('get-user-by-id/', views.get_user_by_id, name='get_user_by_id'),
     path('<uuid:store_id>/categories/', views.CategoryView.as_view(), name='store-categories'),
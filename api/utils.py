@@ -1,21 +1,24 @@
 import logging
 import os
+import uuid
+from collections import Counter, defaultdict
 
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
-from django.shortcuts import get_object_or_404
 import vonage
 
-from .models import Product
+from .models import NotificationOutbox, Image
+from .outbound import get_vonage_client, track
 
 logger = logging.getLogger(__name__)
 
-def get_product_details(order_items_data):
+def get_product_details(order_items_data, products):
     """
     Format data to send to the customer after an order is successfully placed.
     
     Args:
         order_items_data (list): List of dictionaries containing order item data.
+        products (dict): The order's products keyed by UUID, already loaded by the caller.
         
     Returns:
         list: Formatted product details.
@@ -24,8 +27,7 @@ def get_product_details(order_items_data):
     product_details = []
     total_price = 0
     for item_data in order_items_data:
-        product_id = item_data.get('product')
-        product = get_object_or_404(Product, id=product_id)
+        product = products[uuid.UUID(str(item_data.get('product')))]
         quantity = item_data.get('quantity', 1)
         price = product.price
         product_total_price = quantity * price
@@ -70,7 +72,7 @@ def create_or_update_user(user_info):
             f"Your username is: {sub}\n"
             f"Glace, your Health care partner!"
         )
-        send_email(message, subject, email)
+        queue_email(message, subject, email)
     return user
 
 class SendSMS:
@@ -78,9 +80,8 @@ class SendSMS:
     Use Vonage to send SMS messages. Ensure the service is configured correctly.
     """
     def __init__(self):
-        api_key = os.getenv("VONAGE_API_KEY")
-        api_secret = os.getenv("VONAGE_API_SECRET")
-        self.client = vonage.Client(key=api_key, secret=api_secret)
+        # The client is shared per process so its connection pool is reused
+        self.client = get_vonage_client()
         self.sms = vonage.Sms(self.client)
 
     def send_message(self, phone, message):
@@ -90,17 +91,25 @@ class SendSMS:
         Args:
             phone (str): The recipient's phone number.
             message (str): The message to send.
+
+        Returns:
+            bool: True if Vonage accepted the message.
         """
-        response_data = self.sms.send_message({
-            "from": "Vonage APIs",
-            "to": phone,
-            "text": message,
-        })
+        with track('vonage') as call:
+            response_data = self.sms.send_message({
+                "from": "Vonage APIs",
+                "to": phone,
+                "text": message,
+            })
+            if response_data["messages"][0]["status"] != "0":
+                call.failed()
 
         if response_data["messages"][0]["status"] == "0":
             logger.info("Message sent successfully.")
-        else:
-            logger.error("Message failed with error: %s", response_data["messages"][0]["error-text"])
+            return True
+
+        logger.error("Message failed with error: %s", response_data["messages"][0]["error-text"])
+        return False
 
 def send_email(message, subject, recipient):
     """
@@ -120,4 +129,160 @@ def send_email(message, subject, recipient):
         send_mail(subject, message, from_email, recipient_list)
         logger.info("Email sent successfully to %s", recipient)
     except Exception as e:
-        logger.error("Failed to send email to %s: %s", recipient, e)
\ No newline at end of file
+        logger.error("Failed to send email to %s: %s", recipient, e)
+
+def email_notification(message, subject, recipient):
+    """
+    Build an unsaved outbox row for an email, so callers can bulk insert many at once.
+
+    Args:
+        message (str): The email message content.
+        subject (str): The email subject.
+        recipient (str): The recipient's email address.
+
+    Returns:
+        NotificationOutbox: The unsaved notification, or None if there is no recipient.
+    """
+    if not recipient:
+        logger.info("Skipping email '%s': no recipient", subject)
+        return None
+
+    return NotificationOutbox(
+        channel=NotificationOutbox.CHANNEL_EMAIL,
+        recipient=recipient,
+        subject=subject,
+        message=message,
+    )
+
+def sms_notification(phone, message):
+    """
+    Build an unsaved outbox row for an SMS, so callers can bulk insert many at once.
+
+    Args:
+        phone (str): The recipient's phone number.
+        message (str): The message to send.
+
+    Returns:
+        NotificationOutbox: The unsaved notification, or None if there is no phone number.
+    """
+    if not phone:
+        logger.info("Skipping SMS: no phone number")
+        return None
+
+    return NotificationOutbox(
+        channel=NotificationOutbox.CHANNEL_SMS,
+        recipient=phone,
+        message=message,
+    )
+
+def queue_email(message, subject, recipient):
+    """
+    Queue an email in the notification outbox instead of sending it inline.
+    The row is written on the caller's connection, so it commits or rolls back
+    together with the surrounding transaction. Delivery is done by the
+    `drain_outbox` management command.
+
+    Args:
+        message (str): The email message content.
+        subject (str): The email subject.
+        recipient (str): The recipient's email address.
+
+    Returns:
+        NotificationOutbox: The queued notification, or None if there is no recipient.
+    """
+    notification = email_notification(message, subject, recipient)
+    if notification:
+        notification.save()
+    return notification
+
+def queue_sms(phone, message):
+    """
+    Queue an SMS in the notification outbox instead of sending it inline.
+
+    Args:
+        phone (str): The recipient's phone number.
+        message (str): The message to send.
+
+    Returns:
+        NotificationOutbox: The queued notification, or None if there is no phone number.
+    """
+    notification = sms_notification(phone, message)
+    if notification:
+        notification.save()
+    return notification
+
+def diff_images(existing, urls):
+    """
+    Match existing image rows to wanted URLs one for one.
+
+    Args:
+        existing (list): (id, url) tuples of the current rows.
+        urls (list): The URLs that should remain, duplicates included.
+
+    Returns:
+        tuple: Ids of the rows to delete and the URLs to insert.
+    """
+    wanted = Counter(urls)
+    stale = []
+    for pk, url in existing:
+        if wanted[url]:
+            wanted[url] -= 1
+        else:
+            stale.append(pk)
+
+    new_urls = []
+    for url in urls:
+        if wanted[url]:
+            wanted[url] -= 1
+            new_urls.append(url)
+    return stale, new_urls
+
+def sync_images(urls, **owner):
+    """
+    Make an owner's images match a list of URLs, touching only what changed.
+    Existing rows are matched to incoming URLs one for one, so duplicates are
+    kept as often as they are sent. An unchanged set costs a single read.
+
+    Args:
+        urls (list): The image URLs the owner should end up with.
+        **owner: The owning relation, e.g. product=product or store=store.
+
+    Returns:
+        tuple: Number of images (created, deleted).
+    """
+    stale, new_urls = diff_images(Image.objects.filter(**owner).values_list('id', 'url'), urls)
+    if stale:
+        Image.objects.filter(id__in=stale).delete()
+    if new_urls:
+        Image.objects.bulk_create([Image(url=url, **owner) for url in new_urls])
+    return len(new_urls), len(stale)
+
+def sync_product_images(urls_by_product, batch_size=None):
+    """
+    `sync_images` for many products at once: one read, one delete and one
+    bulk insert however many products are synced.
+
+    Args:
+        urls_by_product (dict): Wanted image URLs keyed by product UUID.
+        batch_size (int): Insert batch size passed to bulk_create.
+
+    Returns:
+        tuple: Number of images (created, deleted).
+    """
+    existing = defaultdict(list)
+    rows = Image.objects.filter(product_id__in=urls_by_product.keys()).values_list('product_id', 'id', 'url')
+    for product_id, pk, url in rows:
+        existing[product_id].append((pk, url))
+
+    stale = []
+    new_images = []
+    for product_id, urls in urls_by_product.items():
+        product_stale, new_urls = diff_images(existing[product_id], urls)
+        stale.extend(product_stale)
+        new_images.extend(Image(product_id=product_id, url=url) for url in new_urls)
+
+    if stale:
+        Image.objects.filter(id__in=stale).delete()
+    if new_images:
+        Image.objects.bulk_create(new_images, batch_size=batch_size)
+    return len(new_images), len(stale)
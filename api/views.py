@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect, get_object_or_404
 from django.views import View
 from django.conf import settings
@@ -5,6 +6,7 @@ from django.http import JsonResponse, HttpResponseRedirect,Http404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.views.decorators.http import require_http_methods
 
 from oidc_provider.models import Client
@@ -17,11 +19,14 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 
-import requests
-import json
 import logging
 import urllib.parse
 
+from . import oidc, refcache
+from .conditional import conditional_response
+from .permissions import StoreOwnerPermission
+from .products.cache import bump_category_version
+from .refcache import refdata_response
 from .orders import africastalking_api
 from .utils import create_or_update_user, SendSMS, get_product_details, send_email
 from .models import Store, Image, County, Product, Category, Order, OrderItem, Customer
@@ -40,16 +45,8 @@ class InitiateGoogleLoginView(APIView):
         callback_url = request.data.get('callbackUrl', settings.LOGIN_REDIRECT_URL)
         frontend_redirect_url = settings.LOGIN_REDIRECT_URL + '/settings'
         try:
-            client = Client.objects.get(client_id=settings.OIDC_CLIENT_ID)
-            logger.info(f"Client found: {client}")
-
-            auth_url = (
-                f"{settings.OIDC_AUTHORIZATION_ENDPOINT}?response_type=code"
-                f"&client_id={client.client_id}"
-                f"&redirect_uri={client.redirect_uris[0]}"
-                f"&scope=openid email profile"
-                f"&state={frontend_redirect_url}"
-            )
+            # The client config is cached per process, so this runs no query in steady state
+            auth_url = oidc.build_auth_url(frontend_redirect_url)
             logger.info(f"Generated auth URL: {auth_url}")
 
             return Response({'authUrl': auth_url})
@@ -58,6 +55,13 @@ class InitiateGoogleLoginView(APIView):
             return JsonResponse({'error': 'OIDC Client not found'}, status=400)
 
 
+def store_login_session(request, user_info, tokens):
+    request.session['user'] = user_info
+    request.session['session_token'] = tokens['access_token']
+    # Used as the id_token_hint when logging out
+    request.session['id_token'] = tokens['id_token']
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class GoogleCallbackView(View):
     def get(self, request, *args, **kwargs):
@@ -68,46 +72,11 @@ class GoogleCallbackView(View):
         if not code:
             return JsonResponse({'error': 'No code provided'}, status=400)
 
-        token_data = {
-            'code': code,
-            'client_id': settings.OIDC_CLIENT_ID,
-            'client_secret': settings.OIDC_CLIENT_SECRET,
-            'redirect_uri': settings.OIDC_PROVIDERS['google']['redirect_uris'][0],
-            'grant_type': 'authorization_code',
-        }
-        logger.info(f"Token data: {token_data}")
-
-        # Exchange authorization code for access token
-        try:
-            token_response = requests.post(settings.OIDC_TOKEN_ENDPOINT, data=token_data)
-            token_response.raise_for_status()
-            token_response_data = token_response.json()
-            logger.info(f"Token response: {token_response_data}")
-        except requests.RequestException as e:
-            logger.error(f"Token request failed: {e}")
-            return JsonResponse({'error': 'Token request failed'}, status=400)
-
-        if 'error' in token_response_data:
-            logger.error(f"Token endpoint error: {token_response_data['error']}")
-            return JsonResponse({'error': token_response_data['error']}, status=400)
-
-        access_token = token_response_data.get('access_token')
-        if not access_token:
-            logger.error("No access token found in the response")
-            return JsonResponse({'error': 'No access token found'}, status=400)
-
-        # Retrieve user info using access token
+        # Exchange the code and verify the id_token locally, no userinfo round trip
         try:
-            user_info_response = requests.get(
-                settings.OIDC_USERINFO_ENDPOINT,
-                headers={'Authorization': f"Bearer {access_token}"}
-            )
-            user_info_response.raise_for_status()
-            user_info = user_info_response.json()
-            logger.info(f"User info: {user_info}")
-        except requests.RequestException as e:
-            logger.error(f"User info request failed: {e}")
-            return JsonResponse({'error': 'User info request failed'}, status=400)
+            user_info, tokens = oidc.complete_login(code)
+        except oidc.LoginError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
 
         # Create or update the user in your database
         try:
@@ -118,12 +87,41 @@ class GoogleCallbackView(View):
             return JsonResponse({'error': 'Error creating/updating user'}, status=500)
 
         # Manage session here
-        request.session['user'] = user_info
-        request.session['session_token'] = access_token 
+        store_login_session(request, user_info, tokens)
         # Redirect to the frontend with the user info or session token
-        frontend_redirect_url = f"{settings.LOGIN_REDIRECT_URL}/api/loguser"
-        redirect_url_with_params = f"{frontend_redirect_url}?session_token={access_token}&user_info={urllib.parse.quote_plus(json.dumps(user_info))}"
-        return HttpResponseRedirect(redirect_url_with_params)
+        return HttpResponseRedirect(oidc.frontend_redirect_url(tokens['access_token'], user_info))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncGoogleCallbackView(View):
+    """
+    The Google callback for ASGI deployments. The code exchange and key
+    lookups run in the thread pool and the database work in sync_to_async, so
+    a worker's event loop keeps serving other callbacks while Google answers.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        code = request.GET.get('code')
+        logger.info(f"Received code: {code}")
+
+        if not code:
+            return JsonResponse({'error': 'No code provided'}, status=400)
+
+        try:
+            user_info, tokens = await oidc.acomplete_login(code)
+        except oidc.LoginError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+
+        try:
+            user = await sync_to_async(create_or_update_user)(user_info)
+            logger.info(f"User created/updated: {user}")
+        except Exception as e:
+            logger.error(f"Error creating/updating user: {e}")
+            return JsonResponse({'error': 'Error creating/updating user'}, status=500)
+
+        # Django 5.0 sessions load from the database on first access
+        await sync_to_async(store_login_session)(request, user_info, tokens)
+        return HttpResponseRedirect(oidc.frontend_redirect_url(tokens['access_token'], user_info))
 
     
 def logout_view(request):
@@ -207,17 +205,37 @@ def get_user_by_id(request):
         return JsonResponse({"error": "Method not allowed"}, status=405)
 
 
+def shared_with_other_stores(reference, store_id):
+    """
+    Whether a category or county is used by stores other than `store_id`.
+    Categories and counties are shared reference data, so only staff may
+    edit one that another store links or, for a category, sells products in.
+
+    Args:
+        reference (Category | County): The row to check.
+        store_id (UUID): The store making the change.
+    """
+    if reference.stores.exclude(id=store_id).exists():
+        return True
+    return isinstance(reference, Category) and reference.products.exclude(store_id=store_id).exists()
+
+
 class CategoryDetailView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    store_owner_exempt_methods = ('GET',)
 
     def get(self, request, store_id, category_id):
         try:
             if not category_id:
                 return Response({"detail": "Category id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            category = get_object_or_404(Category, id=category_id, store__id=store_id)
-            serializer = CategorySerializer(category)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            categories = Category.objects.filter(id=category_id, stores__id=store_id)
+            return conditional_response(
+                request,
+                lambda: Response(CategorySerializer(get_object_or_404(categories)).data, status=status.HTTP_200_OK),
+                categories,
+                detail=True,
+            )
 
         except Exception as e:
             logger.error("[CATEGORY_GET] %s", e)
@@ -233,9 +251,14 @@ class CategoryDetailView(APIView):
             if not category_id:
                 return Response({"detail": "Category id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            category = get_object_or_404(Category, id=category_id, store=store)
-            category.delete()
+            category = get_object_or_404(Category, id=category_id, stores__id=store_id)
+            with transaction.atomic():
+                # Only unlink the category, it is deleted once no store or product uses it
+                request.store.categories.remove(category)
+                if not category.stores.exists() and not category.products.exists():
+                    category.delete()
+            bump_category_version()
+            refcache.bump('categories')
 
             return Response({"detail": "Category deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
@@ -254,8 +277,9 @@ class CategoryDetailView(APIView):
             if not category_id:
                 return Response({"detail": "Category id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            category = get_object_or_404(Category, id=category_id, store=store)
+            category = get_object_or_404(Category, id=category_id, stores__id=store_id)
+            if not user.is_staff and shared_with_other_stores(category, store_id):
+                return Response({"detail": "Category is shared with other stores"}, status=status.HTTP_403_FORBIDDEN)
 
             name = data.get('name')
             description = data.get('description')
@@ -271,6 +295,8 @@ class CategoryDetailView(APIView):
             category.description = description
             category.image_url = image_url
             category.save()
+            bump_category_version()
+            refcache.bump('categories')
 
             serializer = CategorySerializer(category)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -281,20 +307,19 @@ class CategoryDetailView(APIView):
 
 
 class CategoryView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    # Categories are shared reference data, any signed-in user can list them
+    store_owner_exempt_methods = ('GET',)
 
     def get(self, request, store_id):
         try:
-            categories = Category.objects.all()
-            serializer = CategorySerializer(categories, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return refdata_response(request, 'categories', lambda: CategorySerializer(Category.objects.all(), many=True).data)
         except Exception as e:
             logger.error("[CATEGORY_GET] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def post(self, request, store_id):
         try:
-            user = request.user
             name = request.data.get('name')
             image_url = request.data.get('imageUrl')
             description = request.data.get('description')
@@ -302,14 +327,14 @@ class CategoryView(APIView):
             if not name or not image_url:
                 return Response({"detail": "Name and Image URL are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-
             category = Category.objects.create(
                 name=name,
                 image_url=image_url,
                 description=description,
-                store=store,
             )
+            request.store.categories.add(category)
+            bump_category_version()
+            refcache.bump('categories')
 
             serializer = CategorySerializer(category)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -320,7 +345,8 @@ class CategoryView(APIView):
 
 
 class CountyView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
+    store_owner_exempt_methods = ('GET',)
 
     def post(self, request, store_id):
         try:
@@ -338,13 +364,12 @@ class CountyView(APIView):
             if not store_id:
                 return Response({"detail": "Store id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-
             county = County.objects.create(
                 name=name,
                 description=description,
-                store=store
             )
+            request.store.counties.add(county)
+            refcache.bump('counties')
 
             serializer = CountySerializer(county)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -355,16 +380,14 @@ class CountyView(APIView):
 
     def get(self, request,store_id):
         try:
-            counties = County.objects.all()
-            serializer = CountySerializer(counties, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return refdata_response(request, 'counties', lambda: CountySerializer(County.objects.all(), many=True).data)
 
         except Exception as e:
             logger.error("[ALL_COUNTIES_GET] %s", e)
             return Response({"detail": "Internal error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CountyDetailView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, StoreOwnerPermission]
 
     def get(self, request, store_id, county_id):
         try:
@@ -375,10 +398,13 @@ class CountyDetailView(APIView):
             if not user.id:
                 return Response({"detail": "Unauthenticated"}, status=status.HTTP_403_FORBIDDEN)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            county = get_object_or_404(County, id=county_id, store=store)
-            serializer = CountySerializer(county)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            counties = County.objects.filter(id=county_id, stores__id=store_id)
+            return conditional_response(
+                request,
+                lambda: Response(CountySerializer(get_object_or_404(counties)).data, status=status.HTTP_200_OK),
+                counties,
+                detail=True,
+            )
 
         except Exception as e:
             logger.error("[COUNTY_GET] %s", e)
@@ -393,9 +419,13 @@ class CountyDetailView(APIView):
             if not county_id:
                 return Response({"detail": "County id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            county = get_object_or_404(County, id=county_id, store=store)
-            county.delete()
+            county = get_object_or_404(County, id=county_id, stores__id=store_id)
+            with transaction.atomic():
+                # Only unlink the county, it is deleted once no store uses it
+                request.store.counties.remove(county)
+                if not county.stores.exists():
+                    county.delete()
+            refcache.bump('counties')
 
             return Response({"detail": "County deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
@@ -412,12 +442,14 @@ class CountyDetailView(APIView):
             if not county_id:
                 return Response({"detail": "County id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            store = get_object_or_404(Store, id=store_id, user=user)
-            county = get_object_or_404(County, id=county_id, store=store)
-            
+            county = get_object_or_404(County, id=county_id, stores__id=store_id)
+            if not user.is_staff and shared_with_other_stores(county, store_id):
+                return Response({"detail": "County is shared with other stores"}, status=status.HTTP_403_FORBIDDEN)
+
             serializer = CountySerializer(county, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                refcache.bump('counties')
                 return Response(serializer.data, status=status.HTTP_200_OK)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
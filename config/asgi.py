@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Lets the URLconf pick async views where they exist
+os.environ.setdefault('GLACE_SERVER_MODE', 'asgi')
 
 application = get_asgi_application()
@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.RequestMetricsMiddleware',
+    'api.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,13 +59,42 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
        
     ],
 }
 
+# Seconds a JWT's user stays cached; saving or deleting the user invalidates it immediately
+AUTH_USER_CACHE_TTL = int(getenv('AUTH_USER_CACHE_TTL', 60))
+
+# Seconds a store's owner stays cached for StoreOwnerPermission; saving or deleting the store invalidates it
+STORE_OWNER_CACHE_TTL = int(getenv('STORE_OWNER_CACHE_TTL', 300))
+
+# Page size for keyset-paginated list endpoints, clients may ask for up to the max with ?pageSize=
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Nearby-store lookup: stored geohash length (9 is about 5m) and the ?radius= default and cap in km
+STORE_GEOHASH_PRECISION = 9
+NEARBY_DEFAULT_RADIUS_KM = 10
+NEARBY_MAX_RADIUS_KM = 100
+
+# Text search configuration used to build and query Product.search_vector on Postgres
+PRODUCT_SEARCH_CONFIG = getenv('PRODUCT_SEARCH_CONFIG', 'english')
+
+# Bulk exports: rows fetched per database round trip and bytes buffered per streamed chunk
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+# Catalog imports: rows written per transaction and the most rows accepted by one upload
+PRODUCT_IMPORT_CHUNK_SIZE = 1000
+PRODUCT_IMPORT_MAX_ROWS = 50000
+
+# Largest number of orders accepted by one POST to /orders/batch/
+ORDER_BATCH_MAX_SIZE = 1000
+
 JWT_AUTH = {
     'JWT_EXPIRATION_DELTA': datetime.timedelta(days=7),
     'JWT_ALLOW_REFRESH': True,
@@ -88,6 +119,7 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 CORS_ORIGIN_WHITELIST = ['http://localhost:3000','https://glace-store.vercel.app']
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'X-Next-Page', 'Link']
 
 
 
@@ -103,6 +135,27 @@ DATABASES = {
   }
 }
 
+# Read replicas: comma-separated hosts of streaming replicas of the primary. Each becomes a
+# `replica_<n>` alias that safe-method requests read from, see api/db_router.py
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, getenv('PGREPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': {'connect_timeout': 3},
+        # Tests read the replicas through the test primary
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
+# Replica routing: seconds a user reads from the primary after a write, the replay lag above which
+# a replica is skipped, and how often each worker re-checks replica health
+REPLICA_PIN_SECONDS = int(getenv('REPLICA_PIN_SECONDS', 15))
+REPLICA_MAX_LAG_SECONDS = float(getenv('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_HEALTH_CHECK_SECONDS = float(getenv('REPLICA_HEALTH_CHECK_SECONDS', 10))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -136,6 +189,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SITE_ID = 1
 
+# 'asgi' when served through config/asgi.py, which routes the Google callback and the hot read endpoints to async views
+SERVER_MODE = getenv('GLACE_SERVER_MODE', 'wsgi')
+
 # Custom settings
 LOGIN_REDIRECT_URL = 'https://glace-store.vercel.app'
 # LOGIN_URL will be set in urls.py
@@ -148,6 +204,14 @@ OIDC_CLIENT_ID = getenv('OIDC_CLIENT_ID')
 OIDC_CLIENT_SECRET = getenv('OIDC_CLIENT_SECRET')
 OIDC_ENDPOINT_DECORATOR = 'oidc_provider.decorators.protected_resource'
 
+# Google id_tokens are verified locally against these signing keys and issuers
+OIDC_JWKS_ENDPOINT = 'https://www.googleapis.com/oauth2/v3/certs'
+OIDC_ISSUERS = ('https://accounts.google.com', 'accounts.google.com')
+OIDC_ID_TOKEN_LEEWAY = 60
+# Per-process cache lifetimes in seconds for Google's signing keys and the registered OIDC client
+OIDC_JWKS_REFRESH_SECONDS = int(getenv('OIDC_JWKS_REFRESH_SECONDS', 3600))
+OIDC_CLIENT_CACHE_SECONDS = int(getenv('OIDC_CLIENT_CACHE_SECONDS', 300))
+
 OIDC_PROVIDERS = {
     'google': {
         'issuer': 'https://accounts.google.com',
@@ -164,3 +228,60 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = getenv('EMAIL_HOST_PASSWORD')
+# SMTP socket timeout in seconds, well inside OUTBOX_LEASE_SECONDS so a hung send cannot outlive its lease
+EMAIL_TIMEOUT = int(getenv('EMAIL_TIMEOUT', 10))
+
+# Category/county reference cache: how often each worker re-checks the shared version, and the L2 entry TTL, in seconds
+REFDATA_VERSION_CHECK_SECONDS = float(getenv('REFDATA_VERSION_CHECK_SECONDS', 1))
+REFDATA_CACHE_TTL = int(getenv('REFDATA_CACHE_TTL', 3600))
+
+# Product catalog response cache: entry TTL in seconds and, for the locmem backend, the entry cap before culling
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TTL = int(getenv('CATALOG_CACHE_TTL', 300))
+CATALOG_CACHE_MAX_ENTRIES = int(getenv('CATALOG_CACHE_MAX_ENTRIES', 5000))
+
+# Shared cache, used for cross-worker state such as the SMS circuit breakers.
+# Production should point CACHE_BACKEND/CACHE_LOCATION at a shared backend (Redis, Memcached),
+# locmem is per process and only suitable for development and tests.
+CACHES = {
+    'default': {
+        'BACKEND': getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': getenv('CACHE_LOCATION', 'glace'),
+    },
+    'catalog': {
+        'BACKEND': getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': getenv('CATALOG_CACHE_LOCATION', getenv('CACHE_LOCATION', 'glace-catalog')),
+        'KEY_PREFIX': 'catalog',
+        'TIMEOUT': CATALOG_CACHE_TTL,
+    },
+}
+
+# Redis and Memcached evict by their own policy (e.g. maxmemory-policy allkeys-lru)
+if CACHES['catalog']['BACKEND'].endswith('LocMemCache'):
+    CACHES['catalog']['OPTIONS'] = {'MAX_ENTRIES': CATALOG_CACHE_MAX_ENTRIES}
+
+# Outbound provider HTTP calls: (connect, read) timeouts in seconds and keep-alive pool sizes per process
+OUTBOUND_CONNECT_TIMEOUT = 3.05
+OUTBOUND_READ_TIMEOUT = 10
+OUTBOUND_POOL_CONNECTIONS = 4
+OUTBOUND_POOL_MAXSIZE = 10
+
+# SMS dispatch: providers in failover order and per-provider circuit breaker tuning
+SMS_PROVIDERS = ['vonage', 'africastalking']
+SMS_LATENCY_BUDGET_MS = 2000
+SMS_BREAKER_FAILURES = 5
+SMS_BREAKER_WINDOW = 60
+SMS_BREAKER_COOLDOWN = 30
+
+# Request metrics: share of requests measured, repeats of one SQL shape per request logged as a
+# likely N+1, and whether measured responses carry a Server-Timing header, see api/instrumentation.py
+REQUEST_METRICS_SAMPLE_RATE = float(getenv('REQUEST_METRICS_SAMPLE_RATE', 0.1))
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = int(getenv('REQUEST_METRICS_N_PLUS_ONE_THRESHOLD', 5))
+REQUEST_METRICS_SERVER_TIMING = getenv('REQUEST_METRICS_SERVER_TIMING', 'true').lower() == 'true'
+
+# Notification outbox, drained by `python manage.py drain_outbox`
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
@@ -17,6 +17,7 @@ urlpatterns = [
     path('api/', include('api.products.urls')),
     path('api/', include('api.orders.urls')),
     path('api/', include('api.stores.urls')),
+    path('api/', include('api.exports.urls')),
 ]
 
 LOGIN_URL = '/oidc/authorize/' 